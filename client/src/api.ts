@@ -4,6 +4,8 @@ import type { paths } from "./schema";
 
 const fetchClient = createFetchClient<paths>({
     baseUrl: "http://localhost:8000/",
+    // Sends the cookie that keeps reads on the primary right after a write.
+    credentials: "include",
     headers: {
         "Content-Type": "application/json"
     }
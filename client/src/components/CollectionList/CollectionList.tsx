@@ -41,7 +41,7 @@ function CollectionList() {
     useEffect(() => {
         if (data) {
             setStatus(Status.Success)
-            setCollections(data);
+            setCollections(data.items);
         }
     }, [data])
 
@@ -134,7 +134,7 @@ function Group(props: GroupProps) {
 
     useEffect(() => {
         if (collectionResponse) {
-            setCollections(collectionResponse);
+            setCollections(collectionResponse.items);
         }
     }, [collectionResponse]);
 
@@ -42,7 +42,7 @@ function GroupList() {
     useEffect(() => {
         if (data) {
             setStatus(Status.Success)
-            setGroups(data);
+            setGroups(data.items);
         }
     }, [data])
 
@@ -41,7 +41,7 @@ function OrgList() {
     useEffect(() => {
         if (data) {
             setStatus(Status.Success)
-            setOrgs(data);
+            setOrgs(data.items);
         }
     }, [data])
 
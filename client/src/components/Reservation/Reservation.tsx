@@ -279,7 +279,7 @@ function Reservation(props: ReservationProps) {
 
     useEffect(() => {
         if (userResponse) {
-            setUsers(userResponse);
+            setUsers(userResponse.items);
         }
     }, [userResponse]);
 
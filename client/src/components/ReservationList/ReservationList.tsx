@@ -45,7 +45,7 @@ function ReservationList() {
     useEffect(() => {
         if (data) {
             setStatus(Status.Success)
-            setReservations(data);
+            setReservations(data.items);
         }
     }, [data])
 
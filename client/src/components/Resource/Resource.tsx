@@ -146,15 +146,15 @@ function Resource(props: ResourceProps) {
 
     useEffect(() => {
         if (groupResponse) {
-            setGroups(groupResponse);
-            setGroup(Math.min(...groupResponse.map(group => group.id)));
+            setGroups(groupResponse.items);
+            setGroup(Math.min(...groupResponse.items.map(group => group.id)));
         }
     }, [groupResponse]);
 
     useEffect(() => {
         if (resourceTypeResponse) {
-            setResourceTypes(resourceTypeResponse);
-            setResourceType(Math.min(...resourceTypeResponse.map(resourceType => resourceType.id)));
+            setResourceTypes(resourceTypeResponse.items);
+            setResourceType(Math.min(...resourceTypeResponse.items.map(resourceType => resourceType.id)));
         }
     }, [resourceTypeResponse])
 
@@ -43,7 +43,7 @@ function ResourceList() {
     useEffect(() => {
         if (data) {
             setStatus(Status.Success)
-            setResources(data);
+            setResources(data.items);
         }
     }, [data])
 
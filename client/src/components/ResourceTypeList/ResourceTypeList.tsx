@@ -41,7 +41,7 @@ function ResourceTypeList() {
     useEffect(() => {
         if (data) {
             setStatus(Status.Success)
-            setResourceTypes(data);
+            setResourceTypes(data.items);
         }
     }, [data])
 
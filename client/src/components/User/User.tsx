@@ -135,7 +135,7 @@ function User(props: UserProps) {
 
     useEffect(() => {
         if (orgResponse) {
-            setOrgs(orgResponse);
+            setOrgs(orgResponse.items);
         }
     }, [orgResponse]);
 
@@ -42,7 +42,7 @@ function UserList() {
     useEffect(() => {
         if (data) {
             setStatus(Status.Success)
-            setUsers(data);
+            setUsers(data.items);
         }
     }, [data])
 
@@ -431,22 +431,6 @@ export interface components {
             /** Org Id */
             org_id: number;
         };
-        /** DBResource */
-        DBResource: {
-            /** Name */
-            name?: string;
-            /** Id */
-            id?: number | null;
-            /** Group Id */
-            group_id?: number | null;
-            /** Resource Type Id */
-            resource_type_id?: number | null;
-            /**
-             * Active
-             * @default true
-             */
-            active: boolean;
-        };
         /** HTTPValidationError */
         HTTPValidationError: {
             /** Detail */
@@ -546,7 +530,7 @@ export interface components {
             reservation_id?: number;
             /** Id */
             id: number;
-            resource: components["schemas"]["DBResource"];
+            resource: components["schemas"]["PublicResource"];
         };
         /** PublicReservationTime */
         PublicReservationTime: {
@@ -633,6 +617,105 @@ export interface components {
             id: number;
             org: components["schemas"]["PublicOrg"] | null;
         };
+        /** Response[PublicCollectionWithGroups] */
+        Response_PublicCollectionWithGroups_: {
+            /** Status */
+            status: boolean;
+            /** More Available */
+            more_available: boolean;
+            /** Next Cursor */
+            next_cursor?: string | null;
+            /** Items */
+            items: components["schemas"]["PublicCollectionWithGroups"][];
+        };
+        /** Response[PublicGroupWithCollection] */
+        Response_PublicGroupWithCollection_: {
+            /** Status */
+            status: boolean;
+            /** More Available */
+            more_available: boolean;
+            /** Next Cursor */
+            next_cursor?: string | null;
+            /** Items */
+            items: components["schemas"]["PublicGroupWithCollection"][];
+        };
+        /** Response[PublicOrg] */
+        Response_PublicOrg_: {
+            /** Status */
+            status: boolean;
+            /** More Available */
+            more_available: boolean;
+            /** Next Cursor */
+            next_cursor?: string | null;
+            /** Items */
+            items: components["schemas"]["PublicOrg"][];
+        };
+        /** Response[PublicReservationResource] */
+        Response_PublicReservationResource_: {
+            /** Status */
+            status: boolean;
+            /** More Available */
+            more_available: boolean;
+            /** Next Cursor */
+            next_cursor?: string | null;
+            /** Items */
+            items: components["schemas"]["PublicReservationResource"][];
+        };
+        /** Response[PublicReservationTime] */
+        Response_PublicReservationTime_: {
+            /** Status */
+            status: boolean;
+            /** More Available */
+            more_available: boolean;
+            /** Next Cursor */
+            next_cursor?: string | null;
+            /** Items */
+            items: components["schemas"]["PublicReservationTime"][];
+        };
+        /** Response[PublicReservationWithUserAndTimesAndResources] */
+        Response_PublicReservationWithUserAndTimesAndResources_: {
+            /** Status */
+            status: boolean;
+            /** More Available */
+            more_available: boolean;
+            /** Next Cursor */
+            next_cursor?: string | null;
+            /** Items */
+            items: components["schemas"]["PublicReservationWithUserAndTimesAndResources"][];
+        };
+        /** Response[PublicResourceType] */
+        Response_PublicResourceType_: {
+            /** Status */
+            status: boolean;
+            /** More Available */
+            more_available: boolean;
+            /** Next Cursor */
+            next_cursor?: string | null;
+            /** Items */
+            items: components["schemas"]["PublicResourceType"][];
+        };
+        /** Response[PublicResourceWithGroupAndResourceType] */
+        Response_PublicResourceWithGroupAndResourceType_: {
+            /** Status */
+            status: boolean;
+            /** More Available */
+            more_available: boolean;
+            /** Next Cursor */
+            next_cursor?: string | null;
+            /** Items */
+            items: components["schemas"]["PublicResourceWithGroupAndResourceType"][];
+        };
+        /** Response[PublicUserWithOrg] */
+        Response_PublicUserWithOrg_: {
+            /** Status */
+            status: boolean;
+            /** More Available */
+            more_available: boolean;
+            /** Next Cursor */
+            next_cursor?: string | null;
+            /** Items */
+            items: components["schemas"]["PublicUserWithOrg"][];
+        };
         /** UpdateCollection */
         UpdateCollection: {
             /** Name */
@@ -748,7 +831,7 @@ export interface operations {
         parameters: {
             query?: {
                 org?: number | null;
-                offset?: number;
+                cursor?: string | null;
                 limit?: number;
             };
             header?: never;
@@ -763,7 +846,7 @@ export interface operations {
                     [name: string]: unknown;
                 };
                 content: {
-                    "application/json": components["schemas"]["PublicUserWithOrg"][];
+                    "application/json": components["schemas"]["Response_PublicUserWithOrg_"];
                 };
             };
             /** @description Validation Error */
@@ -910,10 +993,12 @@ export interface operations {
     read_orgs_orgs__get: {
         parameters: {
             query?: {
-                offset?: number;
+                cursor?: string | null;
                 limit?: number;
             };
-            header?: never;
+            header?: {
+                "if-none-match"?: string | null;
+            };
             path?: never;
             cookie?: never;
         };
@@ -925,7 +1010,7 @@ export interface operations {
                     [name: string]: unknown;
                 };
                 content: {
-                    "application/json": components["schemas"]["PublicOrg"][];
+                    "application/json": components["schemas"]["Response_PublicOrg_"];
                 };
             };
             /** @description Validation Error */
@@ -1072,10 +1157,16 @@ export interface operations {
     read_collections_collections__get: {
         parameters: {
             query?: {
-                offset?: number;
+                /** @description Comma separated relations to include, all when not given */
+                expand?: string | null;
+                /** @description Comma separated fields to include besides the id */
+                fields?: string | null;
+                cursor?: string | null;
                 limit?: number;
             };
-            header?: never;
+            header?: {
+                "if-none-match"?: string | null;
+            };
             path?: never;
             cookie?: never;
         };
@@ -1087,7 +1178,7 @@ export interface operations {
                     [name: string]: unknown;
                 };
                 content: {
-                    "application/json": components["schemas"]["PublicCollectionWithGroups"][];
+                    "application/json": components["schemas"]["Response_PublicCollectionWithGroups_"];
                 };
             };
             /** @description Validation Error */
@@ -1137,7 +1228,9 @@ export interface operations {
     get_one_collection_collections__collection_id__get: {
         parameters: {
             query?: never;
-            header?: never;
+            header?: {
+                "if-none-match"?: string | null;
+            };
             path: {
                 collection_id: number;
             };
@@ -1234,7 +1327,7 @@ export interface operations {
     read_groups_groups__get: {
         parameters: {
             query?: {
-                offset?: number;
+                cursor?: string | null;
                 limit?: number;
             };
             header?: never;
@@ -1249,7 +1342,7 @@ export interface operations {
                     [name: string]: unknown;
                 };
                 content: {
-                    "application/json": components["schemas"]["PublicGroupWithCollection"][];
+                    "application/json": components["schemas"]["Response_PublicGroupWithCollection_"];
                 };
             };
             /** @description Validation Error */
@@ -1395,8 +1488,13 @@ export interface operations {
     };
     read_resources_resources__get: {
         parameters: {
-            query?: never;
-            header?: never;
+            query?: {
+                cursor?: string | null;
+                limit?: number;
+            };
+            header?: {
+                "if-none-match"?: string | null;
+            };
             path?: never;
             cookie?: never;
         };
@@ -1408,7 +1506,16 @@ export interface operations {
                     [name: string]: unknown;
                 };
                 content: {
-                    "application/json": components["schemas"]["PublicResourceWithGroupAndResourceType"][];
+                    "application/json": components["schemas"]["Response_PublicResourceWithGroupAndResourceType_"];
+                };
+            };
+            /** @description Validation Error */
+            422: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["HTTPValidationError"];
                 };
             };
         };
@@ -1546,10 +1653,12 @@ export interface operations {
     read_resourceTypes_resourcetypes__get: {
         parameters: {
             query?: {
-                offset?: number;
+                cursor?: string | null;
                 limit?: number;
             };
-            header?: never;
+            header?: {
+                "if-none-match"?: string | null;
+            };
             path?: never;
             cookie?: never;
         };
@@ -1561,7 +1670,7 @@ export interface operations {
                     [name: string]: unknown;
                 };
                 content: {
-                    "application/json": components["schemas"]["PublicResourceType"][];
+                    "application/json": components["schemas"]["Response_PublicResourceType_"];
                 };
             };
             /** @description Validation Error */
@@ -1708,7 +1817,15 @@ export interface operations {
     read_reservations_reservations__get: {
         parameters: {
             query?: {
-                offset?: number;
+                from?: string | null;
+                to?: string | null;
+                resource_id?: number | null;
+                collection_id?: number | null;
+                /** @description Comma separated relations to include, all when not given */
+                expand?: string | null;
+                /** @description Comma separated fields to include besides the id */
+                fields?: string | null;
+                cursor?: string | null;
                 limit?: number;
             };
             header?: never;
@@ -1723,7 +1840,7 @@ export interface operations {
                     [name: string]: unknown;
                 };
                 content: {
-                    "application/json": components["schemas"]["PublicReservationWithUserAndTimesAndResources"][];
+                    "application/json": components["schemas"]["Response_PublicReservationWithUserAndTimesAndResources_"];
                 };
             };
             /** @description Validation Error */
@@ -1870,7 +1987,11 @@ export interface operations {
     read_reservationTimes_reservationTimes__get: {
         parameters: {
             query?: {
-                offset?: number;
+                from?: string | null;
+                to?: string | null;
+                resource_id?: number | null;
+                collection_id?: number | null;
+                cursor?: string | null;
                 limit?: number;
             };
             header?: never;
@@ -1885,7 +2006,7 @@ export interface operations {
                     [name: string]: unknown;
                 };
                 content: {
-                    "application/json": components["schemas"]["PublicReservationTime"][];
+                    "application/json": components["schemas"]["Response_PublicReservationTime_"];
                 };
             };
             /** @description Validation Error */
@@ -2032,7 +2153,7 @@ export interface operations {
     read_reservationResources_reservationResources__get: {
         parameters: {
             query?: {
-                offset?: number;
+                cursor?: string | null;
                 limit?: number;
             };
             header?: never;
@@ -2047,7 +2168,7 @@ export interface operations {
                     [name: string]: unknown;
                 };
                 content: {
-                    "application/json": components["schemas"]["PublicReservationResource"][];
+                    "application/json": components["schemas"]["Response_PublicReservationResource_"];
                 };
             };
             /** @description Validation Error */
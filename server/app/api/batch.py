@@ -0,0 +1,52 @@
+from typing import Annotated, Any
+
+from fastapi import Depends, HTTPException, Query
+from sqlalchemy import Integer, Select, any_, literal
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+MAX_BATCH_SIZE = 100
+
+
+def batch_ids(
+    ids: Annotated[str, Query(description="Comma separated ids, at most 100")],
+) -> list[int]:
+    """Ids of the ids= parameter in the order given, without repeats."""
+    try:
+        parsed = [int(id) for id in ids.split(",") if id.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=422, detail="ids must be comma separated integers"
+        )
+
+    parsed = list(dict.fromkeys(parsed))
+    if not parsed:
+        raise HTTPException(status_code=422, detail="ids must not be empty")
+    if len(parsed) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=422, detail=f"At most {MAX_BATCH_SIZE} ids can be fetched"
+        )
+
+    return parsed
+
+
+BatchIds = Annotated[list[int], Depends(batch_ids)]
+
+
+def among(column, ids: list[int]):
+    """column = ANY(:ids), one array parameter however many ids there are."""
+    return column == any_(literal(ids, ARRAY(Integer)))
+
+
+async def fetch_batch(
+    session: AsyncSession, query: Select, ids: list[int]
+) -> dict[str, Any]:
+    """Entities selected by the query in the order of ids, and the ids that
+    were not found."""
+    result = await session.execute(query)
+    found = {entity.id: entity for entity in result.scalars()}
+
+    return {
+        "items": [found[id] for id in ids if id in found],
+        "missing": [id for id in ids if id not in found],
+    }
@@ -0,0 +1,82 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional
+
+
+class ReadCache:
+    """In-process LRU cache with a time to live.
+
+    Each worker keeps its own entries, keyed by the ETag of the data they
+    were rendered from. The ETags come from the versions the triggers bump
+    on every write, so a write through any worker is visible on the next
+    request. The time to live only bounds the memory held by entries of
+    stale versions, and invalidate frees them early.
+    """
+
+    def __init__(
+        self, name: str, tables: Iterable[str], maxsize: int = 256, ttl: float = 60.0
+    ):
+        self.name = name
+        self.tables = frozenset(tables)
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> Any:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+        }
+
+
+caches: dict[str, ReadCache] = {}
+
+
+def read_cache(name: str, tables: Iterable[str], **kwargs) -> ReadCache:
+    cache = caches[name] = ReadCache(name, tables, **kwargs)
+    return cache
+
+
+def invalidate(*tables: str):
+    """Drop the entries of every cache built from one of the given tables.
+
+    Only frees memory, the entries of older versions are never read again.
+    """
+    for cache in caches.values():
+        if cache.tables.intersection(tables):
+            cache.clear()
+
+
+def cache_stats() -> dict[str, dict[str, Any]]:
+    return {name: cache.stats() for name, cache in caches.items()}
@@ -1,11 +1,47 @@
+import asyncio
+import json
+from datetime import date, datetime, timedelta
 from typing import Annotated, Optional
 
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Header, Query, HTTPException, Request, WebSocket
+from fastapi import WebSocketDisconnect
+from fastapi import Response as HTTPResponse
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
 from sqlmodel import select
-
-from sqlalchemy.orm import selectinload
-
-from app.db.session import SessionDep
+from sqlalchemy import insert, literal, update
+
+from sqlalchemy.orm import contains_eager, selectinload
+
+from app.api.batch import BatchIds, among, fetch_batch
+from app.api.cache import invalidate, read_cache
+from app.api.expansion import page_adapter, parse_names, response_model, with_parents
+from app.api.etag import etag_headers, etag_matches, not_modified, table_etag
+from app.api.export import stream_export
+from app.api.ics import calendar_feed
+from app.api.pagination import paginate
+from app.api.rows import reservation_page
+from app.db.availability import (
+    aware,
+    free_gaps,
+    merge_intervals,
+    reservation_recurrence,
+    reservation_blocks,
+    reservations_in_window,
+    reservations_using,
+    time_overlaps,
+)
+from app.db.notifications import Subscriber, Topic, listener, notify_reservation_change
+from app.db.occupancy import sync_reservation_occupancy
+from app.db.recurrence import occurrences
+from app.db.search import TYPEAHEAD_MIN_LENGTH, reservation_search, typeahead
+from app.db.session import ReplicaSessionDep, SessionDep, read_session_factory
+from app.db.utilization import (
+    sync_reservation_utilization,
+    utilization_filters,
+    utilization_heatmap,
+    utilization_hours,
+)
 from app.models.models import (
     CreateUser,
     UpdateUser,
@@ -60,11 +96,13 @@ from app.models.models import (
 
 from app.models.models import (
     CreateReservation,
+    CreateReservationWithTimesAndResources,
     DBReservation,
     PublicReservation,
     PublicReservationWithUser,
     PublicReservationWithTimesAndResources,
     PublicReservationWithUserAndTimesAndResources,
+    PublicReservationSearchResult,
     UpdateReservation,
 )
 
@@ -79,37 +117,117 @@ from app.models.models import (
     CreateReservationResource,
     DBReservationResource,
     PublicReservationResource,
+    PublicReservationResourceWithResource,
     UpdateReservationResource,
 )
 
 from app.models.models import (
+    ExportFormat,
+    LiveAction,
+    LiveMessage,
+    TypeaheadKind,
+    TypeaheadMatch,
+    UtilizationDimension,
+    UtilizationHeatmap,
+    UtilizationHours,
+    ResourceAvailability,
+    TimeInterval,
+)
+
+from app.models.models import (
+    CalendarBlock,
+    CalendarGroup,
+    CalendarResource,
+    CollectionCalendar,
+)
+
+from app.models.models import (
+    Batch,
     Response,
 )
 
+orgs_cache = read_cache("orgs", [DBOrg.__tablename__])
+resourcetypes_cache = read_cache("resourcetypes", [DBResourceType.__tablename__])
+collections_cache = read_cache(
+    "collections",
+    [
+        DBCollection.__tablename__,
+        DBGroup.__tablename__,
+        DBResource.__tablename__,
+        DBResourceType.__tablename__,
+    ],
+)
+
+org_page = TypeAdapter(Response[PublicOrg])
+resourceType_page = TypeAdapter(Response[PublicResourceType])
+collection_tree = TypeAdapter(PublicCollectionWithGroups)
+
+
+resource_tables = [
+    DBResource.__tablename__,
+    DBGroup.__tablename__,
+    DBResourceType.__tablename__,
+]
+
+Expand = Annotated[
+    Optional[str],
+    Query(description="Comma separated relations to include, all when not given"),
+]
+Fields = Annotated[
+    Optional[str],
+    Query(description="Comma separated fields to include besides the id"),
+]
+
+IfNoneMatch = Annotated[Optional[str], Header()]
+IfModifiedSince = Annotated[Optional[str], Header()]
+
+calendar_feed_responses = {
+    200: {"content": {"text/calendar": {}}, "description": "iCalendar feed"},
+    304: {"description": "Not modified"},
+}
+
+
+def json_response(content: bytes, etag: str) -> HTTPResponse:
+    return HTTPResponse(
+        content=content, media_type="application/json", headers=etag_headers(etag)
+    )
+
+
 users_router = APIRouter(prefix="/users", tags=["Users"])
 
 
-@users_router.get("/", response_model=list[PublicUserWithOrg])
+@users_router.get("/", response_model=Response[PublicUserWithOrg])
 async def read_users(
-    session: SessionDep,
+    session: ReplicaSessionDep,
     org: Optional[int] = None,
-    offset: int = 0,
+    cursor: Optional[str] = None,
     limit: Annotated[int, Query(le=100)] = 100,
-) -> list[PublicUserWithOrg]:
+) -> Response[PublicUserWithOrg]:
     query = select(DBUser).where(DBUser.active).options(selectinload(DBUser.org))
 
     if org:
         query = query.where(DBUser.org_id == org)
 
-    query = query.offset(offset).limit(limit + 1)
-    result = await session.execute(query)
-    users: list[PublicUserWithOrg] = result.scalars().all()
+    return await paginate(session, query, (DBUser.username, DBUser.id), cursor, limit)
 
-    return users
+
+@users_router.get("/batch", response_model=Batch[PublicUserWithOrg])
+async def get_users_batch(
+    session: ReplicaSessionDep, ids: BatchIds
+) -> Batch[PublicUserWithOrg]:
+    query = (
+        select(DBUser)
+        .where(among(DBUser.id, ids))
+        .where(DBUser.active)
+        .options(selectinload(DBUser.org))
+    )
+    return await fetch_batch(session, query, ids)
 
 
 @users_router.get("/{user_id}", response_model=PublicUserWithOrg | None)
-async def get_one_user(session: SessionDep, user_id: int) -> PublicUserWithOrg | None:
+async def get_one_user(
+    session: ReplicaSessionDep, user_id: int
+) -> PublicUserWithOrg | None:
     query = (
         select(DBUser)
         .where(DBUser.id == user_id)
@@ -127,7 +245,6 @@ async def create_user(session: SessionDep, user: CreateUser):
     db_user = DBUser(username=user.username, hash=user.hash, org_id=user.org_id)
     session.add(db_user)
     await session.commit()
-    await session.refresh(db_user)
 
     public_user = PublicUser.from_orm(db_user)
 
@@ -136,14 +253,16 @@ async def create_user(session: SessionDep, user: CreateUser):
 
 @users_router.delete("/{user_id}", response_model=None)
 async def delete_user(session: SessionDep, user_id: int) -> None:
-    db_user = await session.get(DBUser, user_id)
-    if not db_user:
+    deleted_id = await session.scalar(
+        update(DBUser)
+        .where(DBUser.id == user_id)
+        .values(active=False)
+        .returning(DBUser.id)
+    )
+    if deleted_id is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    db_user.sqlmodel_update({"active": False})
-    session.add(db_user)
     await session.commit()
-    await session.refresh(db_user)
 
     return None
 
@@ -165,7 +284,8 @@ async def update_user(
 
     session.add(db_user)
     await session.commit()
-    await session.refresh(db_user)
+    if "org_id" in user_data:
+        await session.refresh(db_user, ["org"])
 
     public_user = PublicUserWithOrg.from_orm(db_user)
 
@@ -178,23 +298,43 @@ async def update_user(
 orgs_router = APIRouter(prefix="/orgs", tags=["Organizations"])
 
 
-@orgs_router.get("/", response_model=list[PublicOrg])
+@orgs_router.get("/", response_model=Response[PublicOrg])
 async def read_orgs(
-    session: SessionDep,
-    offset: int = 0,
+    session: ReplicaSessionDep,
+    if_none_match: IfNoneMatch = None,
+    cursor: Optional[str] = None,
     limit: Annotated[int, Query(le=100)] = 100,
-) -> list[PublicOrg]:
-    query = select(DBOrg).where(DBOrg.active).options(selectinload(DBOrg.users))
-    query = query.offset(offset).limit(limit + 1)
-    result = await session.execute(query)
+) -> Response[PublicOrg]:
+    etag = await table_etag(session, orgs_cache.tables, cursor, limit)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    content = orgs_cache.get(etag)
+    if content is None:
+        query = select(DBOrg).where(DBOrg.active)
+        page = await paginate(session, query, (DBOrg.name, DBOrg.id), cursor, limit)
+        content = orgs_cache.put(
+            etag, org_page.dump_json(org_page.validate_python(page))
+        )
 
-    orgs: list[PublicOrgWithUsers] = result.scalars().all()
+    return json_response(content, etag)
 
-    return orgs
+
+@orgs_router.get("/batch", response_model=Batch[PublicOrgWithUsers])
+async def get_orgs_batch(
+    session: ReplicaSessionDep, ids: BatchIds
+) -> Batch[PublicOrgWithUsers]:
+    query = (
+        select(DBOrg)
+        .where(among(DBOrg.id, ids))
+        .where(DBOrg.active)
+        .options(selectinload(DBOrg.users))
+    )
+    return await fetch_batch(session, query, ids)
 
 
 @orgs_router.get("/{org_id}", response_model=PublicOrgWithUsers)
-async def get_one_org(session: SessionDep, org_id: int) -> PublicOrgWithUsers:
+async def get_one_org(session: ReplicaSessionDep, org_id: int) -> PublicOrgWithUsers:
     query = (
         select(DBOrg)
         .where(DBOrg.id == org_id)
@@ -211,7 +351,7 @@ async def create_org(session: SessionDep, org: CreateOrg):
     db_org = DBOrg(name=org.name)
     session.add(db_org)
     await session.commit()
-    await session.refresh(db_org)
+    invalidate(DBOrg.__tablename__)
 
     public_org = PublicOrg.from_orm(db_org)
 
@@ -220,14 +360,14 @@ async def create_org(session: SessionDep, org: CreateOrg):
 
 @orgs_router.delete("/{org_id}", response_model=None)
 async def delete_org(session: SessionDep, org_id: int) -> list[None]:
-    db_org = await session.get(DBOrg, org_id)
-    if not db_org:
+    deleted_id = await session.scalar(
+        update(DBOrg).where(DBOrg.id == org_id).values(active=False).returning(DBOrg.id)
+    )
+    if deleted_id is None:
         raise HTTPException(status_code=404, detail="Organization not found")
 
-    db_org.sqlmodel_update({"active": False})
-    session.add(db_org)
     await session.commit()
-    await session.refresh(db_org)
+    invalidate(DBOrg.__tablename__)
 
     return None
 
@@ -248,7 +388,7 @@ async def update_org(
 
     session.add(db_org)
     await session.commit()
-    await session.refresh(db_org)
+    invalidate(DBOrg.__tablename__)
 
     public_org = PublicOrgWithUsers.from_orm(db_org)
 
@@ -260,14 +400,98 @@ async def update_org(
 collections_router = APIRouter(prefix="/collections", tags=["Collections"])
 
 
-@collections_router.get("/", response_model=list[PublicCollectionWithGroups])
+COLLECTION_EXPANSIONS = ["groups", "groups.resources", "groups.resources.resource_type"]
+
+
+def collection_model(expand: frozenset[str], fields: Optional[frozenset[str]]):
+    relations = ()
+    if "groups.resources.resource_type" in expand:
+        relations = (("groups", list[PublicGroupWithResources]),)
+    elif "groups.resources" in expand:
+        group = response_model(
+            "PublicGroupWithPlainResources",
+            PublicGroupWithResources,
+            frozenset(["name"]),
+            (("resources", list[PublicResource]),),
+        )
+        relations = (("groups", list[group]),)
+    elif "groups" in expand:
+        group = response_model(
+            "PublicCollectionGroup", PublicGroupWithResources, frozenset(["name"])
+        )
+        relations = (("groups", list[group]),)
+
+    return response_model(
+        "PublicCollectionExpanded", PublicCollection, fields, relations
+    )
+
+
+def collection_loads(expand: frozenset[str]) -> list:
+    if "groups.resources.resource_type" in expand:
+        return [
+            selectinload(DBCollection.groups)
+            .selectinload(DBGroup.resources)
+            .selectinload(DBResource.resource_type)
+        ]
+    if "groups.resources" in expand:
+        return [selectinload(DBCollection.groups).selectinload(DBGroup.resources)]
+    if "groups" in expand:
+        return [selectinload(DBCollection.groups)]
+
+    return []
+
+
+@collections_router.get("/", response_model=Response[PublicCollectionWithGroups])
 async def read_collections(
-    session: SessionDep,
-    offset: int = 0,
+    session: ReplicaSessionDep,
+    if_none_match: IfNoneMatch = None,
+    expand: Expand = None,
+    fields: Fields = None,
+    cursor: Optional[str] = None,
     limit: Annotated[int, Query(le=100)] = 100,
-) -> list[PublicCollectionWithGroups]:
+) -> Response[PublicCollectionWithGroups]:
+    expansions = parse_names(expand, COLLECTION_EXPANSIONS, "expansions")
+    expansions = with_parents(
+        frozenset(COLLECTION_EXPANSIONS) if expansions is None else expansions
+    )
+    field_names = parse_names(fields, PublicCollection.model_fields, "fields")
+
+    etag = await table_etag(
+        session,
+        collections_cache.tables,
+        cursor,
+        limit,
+        sorted(expansions),
+        sorted(field_names) if field_names is not None else None,
+    )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    content = collections_cache.get(etag)
+    if content is None:
+        query = (
+            select(DBCollection)
+            .where(DBCollection.active)
+            .options(*collection_loads(expansions))
+        )
+        page = await paginate(
+            session, query, (DBCollection.name, DBCollection.id), cursor, limit
+        )
+        adapter = page_adapter(collection_model(expansions, field_names))
+        content = collections_cache.put(
+            etag, adapter.dump_json(adapter.validate_python(page))
+        )
+
+    return json_response(content, etag)
+
+
+@collections_router.get("/batch", response_model=Batch[PublicCollectionWithGroups])
+async def get_collections_batch(
+    session: ReplicaSessionDep, ids: BatchIds
+) -> Batch[PublicCollectionWithGroups]:
     query = (
         select(DBCollection)
+        .where(among(DBCollection.id, ids))
         .where(DBCollection.active)
         .options(
             selectinload(DBCollection.groups)
@@ -275,31 +499,110 @@ async def read_collections(
             .selectinload(DBResource.resource_type)
         )
     )
-    query = query.offset(offset).limit(limit + 1)
-    result = await session.execute(query)
-    collections: list[PublicCollectionWithGroups] = result.scalars().all()
-
-    return collections
+    return await fetch_batch(session, query, ids)
 
 
 @collections_router.get("/{collection_id}", response_model=PublicCollectionWithGroups)
 async def get_one_collection(
-    session: SessionDep, collection_id: int
+    session: ReplicaSessionDep, collection_id: int, if_none_match: IfNoneMatch = None
 ) -> PublicCollectionWithGroups:
+    etag = await table_etag(session, collections_cache.tables, collection_id)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    content = collections_cache.get(etag)
+    if content is None:
+        query = (
+            select(DBCollection)
+            .where(DBCollection.id == collection_id)
+            .where(DBCollection.active)
+            .options(
+                selectinload(DBCollection.groups)
+                .selectinload(DBGroup.resources)
+                .selectinload(DBResource.resource_type)
+            )
+        )
+        result = await session.execute(query)
+        collection: PublicCollectionWithGroups = result.scalars().one()
+        content = collections_cache.put(
+            etag, collection_tree.dump_json(collection_tree.validate_python(collection))
+        )
+
+    return json_response(content, etag)
+
+
+@collections_router.get("/{collection_id}/calendar", response_model=CollectionCalendar)
+async def get_collection_calendar(
+    session: ReplicaSessionDep,
+    collection_id: int,
+    start: datetime,
+    days: Annotated[int, Query(ge=1, le=42)] = 7,
+) -> CollectionCalendar:
+    start = aware(start)
+    end = start + timedelta(days=days)
+
     query = (
-        select(DBCollection)
-        .where(DBCollection.id == collection_id)
-        .where(DBCollection.active)
-        .options(
-            selectinload(DBCollection.groups)
-            .selectinload(DBGroup.resources)
-            .selectinload(DBResource.resource_type)
+        select(
+            DBGroup.id,
+            DBGroup.name,
+            DBResource.id,
+            DBResource.name,
+            DBResourceType.id,
+            DBResourceType.name,
         )
+        .join(DBGroup, DBGroup.id == DBResource.group_id)
+        .join(DBCollection, DBCollection.id == DBGroup.collection_id)
+        .outerjoin(DBResourceType, DBResourceType.id == DBResource.resource_type_id)
+        .where(DBGroup.collection_id == collection_id)
+        .where(DBResource.active)
+        .where(DBGroup.active)
+        .where(DBCollection.active)
+        .order_by(DBGroup.name, DBGroup.id, DBResource.name, DBResource.id)
     )
     result = await session.execute(query)
-    collection: PublicCollectionWithGroups = result.scalars().one()
+    rows = result.all()
+
+    if not rows:
+        db_collection = await session.get(DBCollection, collection_id)
+        if not db_collection or not db_collection.active:
+            raise HTTPException(status_code=404, detail="Collection not found")
+
+    blocks: dict[int, list[CalendarBlock]] = {}
+    resource_ids = [row[2] for row in rows]
+    for block in await reservation_blocks(session, resource_ids, start, end):
+        blocks.setdefault(block.resource_id, []).append(
+            CalendarBlock(
+                reservation_id=block.reservation_id,
+                reservation_name=block.reservation_name,
+                start=block.start,
+                end=block.end,
+            )
+        )
 
-    return collection
+    groups: dict[int, CalendarGroup] = {}
+    for group_id, group_name, resource_id, resource_name, type_id, type_name in rows:
+        group = groups.setdefault(
+            group_id, CalendarGroup(id=group_id, name=group_name, resources=[])
+        )
+        group.resources.append(
+            CalendarResource(
+                id=resource_id,
+                name=resource_name,
+                resource_type=(
+                    PublicResourceType(id=type_id, name=type_name)
+                    if type_id is not None
+                    else None
+                ),
+                blocks=blocks.get(resource_id, []),
+            )
+        )
+
+    return CollectionCalendar(
+        collection_id=collection_id,
+        start=start,
+        end=end,
+        groups=list(groups.values()),
+    )
 
 
 @collections_router.post("/", response_model=PublicCollection)
@@ -307,7 +610,7 @@ async def create_collection(session: SessionDep, org: CreateCollection):
     db_collection = DBCollection(name=org.name)
     session.add(db_collection)
     await session.commit()
-    await session.refresh(db_collection)
+    invalidate(DBCollection.__tablename__)
 
     public_collection = PublicCollection.from_orm(db_collection)
 
@@ -316,14 +619,17 @@ async def create_collection(session: SessionDep, org: CreateCollection):
 
 @collections_router.delete("/{collection_id}", response_model=None)
 async def delete_collection(session: SessionDep, collection_id: int) -> None:
-    db_collection = await session.get(DBCollection, collection_id)
-    if not db_collection:
+    deleted_id = await session.scalar(
+        update(DBCollection)
+        .where(DBCollection.id == collection_id)
+        .values(active=False)
+        .returning(DBCollection.id)
+    )
+    if deleted_id is None:
         raise HTTPException(status_code=404, detail="Collection not found")
 
-    db_collection.sqlmodel_update({"active": False})
-    session.add(db_collection)
     await session.commit()
-    await session.refresh(db_collection)
+    invalidate(DBCollection.__tablename__)
 
     return None
 
@@ -344,25 +650,37 @@ async def update_collection(
 
     session.add(db_collection)
     await session.commit()
-    await session.refresh(db_collection)
+    invalidate(DBCollection.__tablename__)
 
     public_collection = PublicCollection.from_orm(db_collection)
 
     return public_collection
 
 
+@collections_router.get("/{collection_id}/feed.ics", responses=calendar_feed_responses)
+async def collection_feed(
+    session: ReplicaSessionDep,
+    collection_id: int,
+    if_none_match: IfNoneMatch = None,
+    if_modified_since: IfModifiedSince = None,
+) -> HTTPResponse:
+    return await calendar_feed(
+        session, "collection", collection_id, if_none_match, if_modified_since
+    )
+
+
 ## Groups ##
 
 
 groups_router = APIRouter(prefix="/groups", tags=["Groups"])
 
 
-@groups_router.get("/", response_model=list[PublicGroupWithCollection])
+@groups_router.get("/", response_model=Response[PublicGroupWithCollection])
 async def read_groups(
-    session: SessionDep,
-    offset: int = 0,
+    session: ReplicaSessionDep,
+    cursor: Optional[str] = None,
     limit: Annotated[int, Query(le=100)] = 100,
-) -> list[PublicGroupWithCollection]:
+) -> Response[PublicGroupWithCollection]:
     query = (
         select(DBGroup)
         .where(DBGroup.active)
@@ -371,16 +689,30 @@ async def read_groups(
             # selectinload(DBGroup.resources).selectinload(DBResource.resource_type),
         )
     )
-    query = query.offset(offset).limit(limit + 1)
-    result = await session.execute(query)
-    groups: list[PublicGroupWithCollection] = result.scalars().all()
+    return await paginate(session, query, (DBGroup.name, DBGroup.id), cursor, limit)
 
-    return groups
+
+@groups_router.get(
+    "/batch", response_model=Batch[PublicGroupWithCollectionAndResources]
+)
+async def get_groups_batch(
+    session: ReplicaSessionDep, ids: BatchIds
+) -> Batch[PublicGroupWithCollectionAndResources]:
+    query = (
+        select(DBGroup)
+        .where(among(DBGroup.id, ids))
+        .where(DBGroup.active)
+        .options(
+            selectinload(DBGroup.collection),
+            selectinload(DBGroup.resources).selectinload(DBResource.resource_type),
+        )
+    )
+    return await fetch_batch(session, query, ids)
 
 
 @groups_router.get("/{group_id}", response_model=PublicGroupWithCollectionAndResources)
 async def get_one_group(
-    session: SessionDep, group_id: int
+    session: ReplicaSessionDep, group_id: int
 ) -> PublicGroupWithCollectionAndResources:
     query = (
         select(DBGroup)
@@ -402,7 +734,7 @@ async def create_group(session: SessionDep, group: CreateGroup):
     db_group = DBGroup(name=group.name, collection_id=group.collection_id)
     session.add(db_group)
     await session.commit()
-    await session.refresh(db_group)
+    invalidate(DBGroup.__tablename__)
 
     public_group = PublicGroup.from_orm(db_group)
 
@@ -411,14 +743,17 @@ async def create_group(session: SessionDep, group: CreateGroup):
 
 @groups_router.delete("/{group_id}", response_model=None)
 async def delete_group(session: SessionDep, group_id: int) -> None:
-    db_group = await session.get(DBGroup, group_id)
-    if not db_group:
+    deleted_id = await session.scalar(
+        update(DBGroup)
+        .where(DBGroup.id == group_id)
+        .values(active=False)
+        .returning(DBGroup.id)
+    )
+    if deleted_id is None:
         raise HTTPException(status_code=404, detail="Group not found")
 
-    db_group.sqlmodel_update({"active": False})
-    session.add(db_group)
     await session.commit()
-    await session.refresh(db_group)
+    invalidate(DBGroup.__tablename__)
 
     return None
 
@@ -439,39 +774,77 @@ async def update_group(
 
     session.add(db_group)
     await session.commit()
-    await session.refresh(db_group)
+    invalidate(DBGroup.__tablename__)
 
     public_group = PublicGroup.from_orm(db_group)
 
     return public_group
 
 
+@groups_router.get("/{group_id}/feed.ics", responses=calendar_feed_responses)
+async def group_feed(
+    session: ReplicaSessionDep,
+    group_id: int,
+    if_none_match: IfNoneMatch = None,
+    if_modified_since: IfModifiedSince = None,
+) -> HTTPResponse:
+    return await calendar_feed(
+        session, "group", group_id, if_none_match, if_modified_since
+    )
+
+
 ## Resources ##
 
 
 resources_router = APIRouter(prefix="/resources", tags=["Resources"])
 
 
-@resources_router.get("/", response_model=list[PublicResourceWithGroupAndResourceType])
+@resources_router.get(
+    "/", response_model=Response[PublicResourceWithGroupAndResourceType]
+)
 async def read_resources(
-    session: SessionDep,
-) -> list[PublicResourceWithGroupAndResourceType]:
+    session: ReplicaSessionDep,
+    response: HTTPResponse,
+    if_none_match: IfNoneMatch = None,
+    cursor: Optional[str] = None,
+    limit: Annotated[int, Query(le=100)] = 100,
+) -> Response[PublicResourceWithGroupAndResourceType]:
+    etag = await table_etag(session, resource_tables, cursor, limit)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    response.headers.update(etag_headers(etag))
     query = (
         select(DBResource)
         .where(DBResource.active)
         .options(selectinload(DBResource.group), selectinload(DBResource.resource_type))
     )
-    result = await session.execute(query)
-    resources: list[PublicResourceWithGroupAndResourceType] = result.scalars().all()
 
-    return resources
+    return await paginate(
+        session, query, (DBResource.name, DBResource.id), cursor, limit
+    )
+
+
+@resources_router.get(
+    "/batch", response_model=Batch[PublicResourceWithGroupAndResourceType]
+)
+async def get_resources_batch(
+    session: ReplicaSessionDep, ids: BatchIds
+) -> Batch[PublicResourceWithGroupAndResourceType]:
+    query = (
+        select(DBResource)
+        .where(among(DBResource.id, ids))
+        .where(DBResource.active)
+        .options(selectinload(DBResource.group), selectinload(DBResource.resource_type))
+    )
+    return await fetch_batch(session, query, ids)
 
 
 @resources_router.get(
     "/{resource_id}", response_model=PublicResourceWithGroupAndResourceType
 )
 async def get_one_resource(
-    session: SessionDep, resource_id: int
+    session: ReplicaSessionDep, resource_id: int
 ) -> PublicResourceWithGroupAndResourceType:
     query = (
         select(DBResource)
@@ -485,6 +858,38 @@ async def get_one_resource(
     return resource
 
 
+@resources_router.get(
+    "/{resource_id}/availability", response_model=ResourceAvailability
+)
+async def get_resource_availability(
+    session: ReplicaSessionDep,
+    resource_id: int,
+    start: Annotated[datetime, Query(alias="from")],
+    end: Annotated[datetime, Query(alias="to")],
+) -> ResourceAvailability:
+    start, end = aware(start), aware(end)
+    if end <= start:
+        raise HTTPException(status_code=422, detail="'to' must be after 'from'")
+
+    blocks = await reservation_blocks(session, [resource_id], start, end)
+
+    if not blocks:
+        db_resource = await session.get(DBResource, resource_id)
+        if not db_resource or not db_resource.active:
+            raise HTTPException(status_code=404, detail="Resource not found")
+
+    busy = merge_intervals(((block.start, block.end) for block in blocks), start, end)
+    free = free_gaps(busy, start, end)
+
+    return ResourceAvailability(
+        resource_id=resource_id,
+        start=start,
+        end=end,
+        busy=[TimeInterval(start=s, end=e) for s, e in busy],
+        free=[TimeInterval(start=s, end=e) for s, e in free],
+    )
+
+
 @resources_router.post("/", response_model=PublicResource)
 async def create_resource(session: SessionDep, org: CreateResource):
     db_resource = DBResource(
@@ -492,7 +897,7 @@ async def create_resource(session: SessionDep, org: CreateResource):
     )
     session.add(db_resource)
     await session.commit()
-    await session.refresh(db_resource)
+    invalidate(DBResource.__tablename__)
 
     public_resource = PublicResource.from_orm(db_resource)
 
@@ -501,14 +906,17 @@ async def create_resource(session: SessionDep, org: CreateResource):
 
 @resources_router.delete("/{resource_id}", response_model=None)
 async def delete_resource(session: SessionDep, resource_id: int) -> None:
-    db_resource = await session.get(DBResource, resource_id)
-    if not db_resource:
+    deleted_id = await session.scalar(
+        update(DBResource)
+        .where(DBResource.id == resource_id)
+        .values(active=False)
+        .returning(DBResource.id)
+    )
+    if deleted_id is None:
         raise HTTPException(status_code=404, detail="Resource not found")
 
-    db_resource.sqlmodel_update({"active": False})
-    session.add(db_resource)
     await session.commit()
-    await session.refresh(db_resource)
+    invalidate(DBResource.__tablename__)
 
     return None
 
@@ -529,36 +937,70 @@ async def update_resource(
 
     session.add(db_resource)
     await session.commit()
-    await session.refresh(db_resource)
+    invalidate(DBResource.__tablename__)
 
     public_resource = PublicResource.from_orm(db_resource)
 
     return public_resource
 
 
+@resources_router.get("/{resource_id}/feed.ics", responses=calendar_feed_responses)
+async def resource_feed(
+    session: ReplicaSessionDep,
+    resource_id: int,
+    if_none_match: IfNoneMatch = None,
+    if_modified_since: IfModifiedSince = None,
+) -> HTTPResponse:
+    return await calendar_feed(
+        session, "resource", resource_id, if_none_match, if_modified_since
+    )
+
+
 ## ResourceTypes ##
 
 
 resourcetypes_router = APIRouter(prefix="/resourcetypes", tags=["ResourceTypes"])
 
 
-@resourcetypes_router.get("/", response_model=list[PublicResourceType])
+@resourcetypes_router.get("/", response_model=Response[PublicResourceType])
 async def read_resourceTypes(
-    session: SessionDep,
-    offset: int = 0,
+    session: ReplicaSessionDep,
+    if_none_match: IfNoneMatch = None,
+    cursor: Optional[str] = None,
     limit: Annotated[int, Query(le=100)] = 100,
-) -> list[PublicResourceType]:
-    query = select(DBResourceType).where(DBResourceType.active)
-    query = query.offset(offset).limit(limit + 1)
-    result = await session.execute(query)
-    resourceTypes: list[PublicResourceType] = result.scalars().all()
+) -> Response[PublicResourceType]:
+    etag = await table_etag(session, resourcetypes_cache.tables, cursor, limit)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    content = resourcetypes_cache.get(etag)
+    if content is None:
+        query = select(DBResourceType).where(DBResourceType.active)
+        page = await paginate(
+            session, query, (DBResourceType.name, DBResourceType.id), cursor, limit
+        )
+        content = resourcetypes_cache.put(
+            etag, resourceType_page.dump_json(resourceType_page.validate_python(page))
+        )
+
+    return json_response(content, etag)
 
-    return resourceTypes
+
+@resourcetypes_router.get("/batch", response_model=Batch[PublicResourceType])
+async def get_resourceTypes_batch(
+    session: ReplicaSessionDep, ids: BatchIds
+) -> Batch[PublicResourceType]:
+    query = (
+        select(DBResourceType)
+        .where(among(DBResourceType.id, ids))
+        .where(DBResourceType.active)
+    )
+    return await fetch_batch(session, query, ids)
 
 
 @resourcetypes_router.get("/{resourceType_id}", response_model=PublicResourceType)
 async def get_one_resourceType(
-    session: SessionDep, resourceType_id: int
+    session: ReplicaSessionDep, resourceType_id: int
 ) -> PublicResourceType:
     query = (
         select(DBResourceType)
@@ -576,7 +1018,7 @@ async def create_resourceType(session: SessionDep, resourcetype: CreateResourceT
     db_resourceType = DBResourceType(name=resourcetype.name)
     session.add(db_resourceType)
     await session.commit()
-    await session.refresh(db_resourceType)
+    invalidate(DBResourceType.__tablename__)
 
     public_resourceType = PublicResourceType.from_orm(db_resourceType)
 
@@ -585,14 +1027,17 @@ async def create_resourceType(session: SessionDep, resourcetype: CreateResourceT
 
 @resourcetypes_router.delete("/{resourceType_id}", response_model=None)
 async def delete_resourceType(session: SessionDep, resourceType_id: int) -> None:
-    db_resourceType = await session.get(DBResourceType, resourceType_id)
-    if not db_resourceType:
+    deleted_id = await session.scalar(
+        update(DBResourceType)
+        .where(DBResourceType.id == resourceType_id)
+        .values(active=False)
+        .returning(DBResourceType.id)
+    )
+    if deleted_id is None:
         raise HTTPException(status_code=404, detail="ResourceType not found")
 
-    db_resourceType.sqlmodel_update({"active": False})
-    session.add(db_resourceType)
     await session.commit()
-    await session.refresh(db_resourceType)
+    invalidate(DBResourceType.__tablename__)
 
     return None
 
@@ -613,7 +1058,7 @@ async def update_resourceType(
 
     session.add(db_resourceType)
     await session.commit()
-    await session.refresh(db_resourceType)
+    invalidate(DBResourceType.__tablename__)
 
     public_resourceType = PublicResourceType.from_orm(db_resourceType)
 
@@ -626,16 +1071,164 @@ async def update_resourceType(
 reservations_router = APIRouter(prefix="/reservations", tags=["Reservations"])
 
 
+RESERVATION_EXPANSIONS = [
+    "user",
+    "user.org",
+    "times",
+    "resources",
+    "resources.resource",
+]
+
+
+def reservation_model(
+    expand: frozenset[str], fields: Optional[frozenset[str]], ranked: bool = False
+):
+    relations = []
+    if "user" in expand:
+        relations.append(
+            ("user", PublicUserWithOrg if "user.org" in expand else PublicUser)
+        )
+    if "times" in expand:
+        relations.append(("times", list[PublicReservationTime]))
+    if "resources" in expand:
+        resource = PublicReservationResource
+        if "resources.resource" in expand:
+            resource = PublicReservationResourceWithResource
+        relations.append(("resources", list[resource]))
+    if ranked:
+        relations.append(("rank", float))
+
+    return response_model(
+        "PublicReservationExpanded",
+        PublicReservation,
+        fields,
+        tuple(relations),
+        ("user_id",) if "user" in expand else (),
+    )
+
+
 @reservations_router.get(
-    "/", response_model=list[PublicReservationWithUserAndTimesAndResources]
+    "/", response_model=Response[PublicReservationWithUserAndTimesAndResources]
 )
 async def read_reservations(
-    session: SessionDep,
-    offset: int = 0,
+    session: ReplicaSessionDep,
+    start: Annotated[Optional[datetime], Query(alias="from")] = None,
+    end: Annotated[Optional[datetime], Query(alias="to")] = None,
+    resource_id: Optional[int] = None,
+    collection_id: Optional[int] = None,
+    expand: Expand = None,
+    fields: Fields = None,
+    cursor: Optional[str] = None,
+    limit: Annotated[int, Query(le=100)] = 100,
+) -> Response[PublicReservationWithUserAndTimesAndResources]:
+    expansions = parse_names(expand, RESERVATION_EXPANSIONS, "expansions")
+    expansions = with_parents(
+        frozenset(RESERVATION_EXPANSIONS) if expansions is None else expansions
+    )
+    field_names = parse_names(fields, PublicReservation.model_fields, "fields")
+
+    conditions = []
+    if start or end:
+        conditions.append(DBReservation.id.in_(reservations_in_window(start, end)))
+    if resource_id or collection_id:
+        conditions.append(
+            DBReservation.id.in_(reservations_using(resource_id, collection_id))
+        )
+    # The window query matches whole recurring series, the ones whose
+    # occurrences all miss the window are dropped from the page.
+    window = (aware(start), aware(end)) if start and end else None
+
+    page = await reservation_page(
+        session, conditions, expansions, field_names, cursor, limit, window
+    )
+
+    adapter = page_adapter(reservation_model(expansions, field_names))
+    return HTTPResponse(
+        content=adapter.dump_json(adapter.validate_python(page)),
+        media_type="application/json",
+    )
+
+
+@reservations_router.get(
+    "/search", response_model=Response[PublicReservationSearchResult]
+)
+async def search_reservations(
+    session: ReplicaSessionDep,
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    start: Annotated[Optional[datetime], Query(alias="from")] = None,
+    end: Annotated[Optional[datetime], Query(alias="to")] = None,
+    resource_id: Optional[int] = None,
+    collection_id: Optional[int] = None,
+    expand: Expand = None,
+    fields: Fields = None,
+    cursor: Optional[str] = None,
     limit: Annotated[int, Query(le=100)] = 100,
-) -> list[PublicReservationWithUserAndTimesAndResources]:
+) -> Response[PublicReservationSearchResult]:
+    expansions = parse_names(expand, RESERVATION_EXPANSIONS, "expansions")
+    expansions = with_parents(
+        frozenset(RESERVATION_EXPANSIONS) if expansions is None else expansions
+    )
+    field_names = parse_names(fields, PublicReservation.model_fields, "fields")
+
+    matches, rank = reservation_search(q)
+    conditions = [matches]
+    if start or end:
+        conditions.append(DBReservation.id.in_(reservations_in_window(start, end)))
+    if resource_id or collection_id:
+        conditions.append(
+            DBReservation.id.in_(reservations_using(resource_id, collection_id))
+        )
+    window = (aware(start), aware(end)) if start and end else None
+
+    page = await reservation_page(
+        session, conditions, expansions, field_names, cursor, limit, window, rank
+    )
+
+    adapter = page_adapter(reservation_model(expansions, field_names, ranked=True))
+    return HTTPResponse(
+        content=adapter.dump_json(adapter.validate_python(page)),
+        media_type="application/json",
+    )
+
+
+@reservations_router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {"application/x-ndjson": {}, "text/csv": {}},
+            "description": "Every active reservation, streamed",
+        }
+    },
+)
+async def export_reservations(
+    request: Request,
+    format: ExportFormat = ExportFormat.ndjson,
+    start: Annotated[Optional[datetime], Query(alias="from")] = None,
+    end: Annotated[Optional[datetime], Query(alias="to")] = None,
+) -> StreamingResponse:
+    if format == ExportFormat.csv:
+        return StreamingResponse(
+            stream_export(read_session_factory(request), format, start, end),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="reservations.csv"'},
+        )
+
+    return StreamingResponse(
+        stream_export(read_session_factory(request), format, start, end),
+        media_type="application/x-ndjson",
+    )
+
+
+@reservations_router.get(
+    "/batch", response_model=Batch[PublicReservationWithUserAndTimesAndResources]
+)
+async def get_reservations_batch(
+    session: ReplicaSessionDep, ids: BatchIds
+) -> Batch[PublicReservationWithUserAndTimesAndResources]:
     query = (
         select(DBReservation)
+        .where(among(DBReservation.id, ids))
         .where(DBReservation.active)
         .options(
             selectinload(DBReservation.user).selectinload(DBUser.org),
@@ -645,20 +1238,14 @@ async def read_reservations(
             ),
         )
     )
-    query = query.offset(offset).limit(limit + 1)
-    result = await session.execute(query)
-    reservations: list[PublicReservationWithUserAndTimesAndResources] = (
-        result.scalars().all()
-    )
-
-    return reservations
+    return await fetch_batch(session, query, ids)
 
 
 @reservations_router.get(
     "/{reservation_id}", response_model=PublicReservationWithUserAndTimesAndResources
 )
 async def get_one_reservation(
-    session: SessionDep, reservation_id: int
+    session: ReplicaSessionDep, reservation_id: int
 ) -> PublicReservationWithUserAndTimesAndResources:
     query = (
         select(DBReservation)
@@ -685,26 +1272,134 @@ async def create_reservation(session: SessionDep, reservation: CreateReservation
         user_id=reservation.user_id,
         contact_info=reservation.contact_info,
         description=reservation.description,
+        recurrence_frequency=reservation.recurrence_frequency,
+        recurrence_interval=reservation.recurrence_interval,
+        recurrence_until=reservation.recurrence_until,
+        recurrence_exceptions=reservation.recurrence_exceptions,
     )
     session.add(db_reservation)
+    await session.flush()
+    await notify_reservation_change(session, db_reservation.id)
     await session.commit()
-    await session.refresh(db_reservation)
 
     public_reservation = PublicReservation.from_orm(db_reservation)
 
     return public_reservation
 
 
+@reservations_router.post(
+    "/composite", response_model=PublicReservationWithTimesAndResources
+)
+async def create_composite_reservation(
+    session: SessionDep, reservation: CreateReservationWithTimesAndResources
+) -> PublicReservationWithTimesAndResources:
+    # The referenced user and resources, checked up front so that missing
+    # ones are named instead of failing the foreign keys.
+    resource_ids = list(dict.fromkeys(reservation.resource_ids))
+    found = set(
+        await session.execute(
+            select(literal("user"), DBUser.id)
+            .where(DBUser.id == reservation.user_id)
+            .union_all(
+                select(literal("resource"), DBResource.id).where(
+                    among(DBResource.id, resource_ids)
+                )
+            )
+        )
+    )
+    missing_user_id = (
+        None if ("user", reservation.user_id) in found else reservation.user_id
+    )
+    missing_resource_ids = [id for id in resource_ids if ("resource", id) not in found]
+    if missing_user_id is not None or missing_resource_ids:
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "message": "User or resources not found",
+                "user_id": missing_user_id,
+                "resource_ids": missing_resource_ids,
+            },
+        )
+
+    db_reservation = await session.scalar(
+        insert(DBReservation).returning(DBReservation),
+        {
+            "name": reservation.name,
+            "user_id": reservation.user_id,
+            "contact_info": reservation.contact_info,
+            "description": reservation.description,
+            "recurrence_frequency": reservation.recurrence_frequency,
+            "recurrence_interval": reservation.recurrence_interval,
+            "recurrence_until": reservation.recurrence_until,
+            "recurrence_exceptions": reservation.recurrence_exceptions,
+        },
+    )
+
+    db_reservationTimes = []
+    if reservation.times:
+        db_reservationTimes = await session.scalars(
+            insert(DBReservationTime).returning(DBReservationTime),
+            [
+                {
+                    "reservation_id": db_reservation.id,
+                    "start": time.start,
+                    "end": time.end,
+                }
+                for time in reservation.times
+            ],
+        )
+
+    db_reservationResources = []
+    if resource_ids:
+        db_reservationResources = await session.scalars(
+            insert(DBReservationResource).returning(DBReservationResource),
+            [
+                {"reservation_id": db_reservation.id, "resource_id": resource_id}
+                for resource_id in resource_ids
+            ],
+        )
+
+    public_reservation = PublicReservationWithTimesAndResources(
+        id=db_reservation.id,
+        name=db_reservation.name,
+        contact_info=db_reservation.contact_info,
+        description=db_reservation.description,
+        recurrence_frequency=db_reservation.recurrence_frequency,
+        recurrence_interval=db_reservation.recurrence_interval,
+        recurrence_until=db_reservation.recurrence_until,
+        recurrence_exceptions=db_reservation.recurrence_exceptions,
+        times=[PublicReservationTime.from_orm(time) for time in db_reservationTimes],
+        resources=[
+            PublicReservationResource.from_orm(resource)
+            for resource in db_reservationResources
+        ],
+    )
+
+    await sync_reservation_occupancy(session, db_reservation.id)
+
+    await sync_reservation_utilization(session, db_reservation.id)
+    await notify_reservation_change(session, db_reservation.id)
+    await session.commit()
+
+    return public_reservation
+
+
 @reservations_router.delete("/{reservation_id}", response_model=None)
 async def delete_reservation(session: SessionDep, reservation_id: int) -> None:
-    db_reservation = await session.get(DBReservation, reservation_id)
-    if not db_reservation:
+    deleted_id = await session.scalar(
+        update(DBReservation)
+        .where(DBReservation.id == reservation_id)
+        .values(active=False)
+        .returning(DBReservation.id)
+    )
+    if deleted_id is None:
         raise HTTPException(status_code=404, detail="Reservation not found")
 
-    db_reservation.sqlmodel_update({"active": False})
-    session.add(db_reservation)
+    await sync_reservation_occupancy(session, deleted_id)
+
+    await sync_reservation_utilization(session, deleted_id)
+    await notify_reservation_change(session, deleted_id)
     await session.commit()
-    await session.refresh(db_reservation)
 
     return None
 
@@ -724,8 +1419,11 @@ async def update_reservation(
     db_reservation.sqlmodel_update(reservation_data)
 
     session.add(db_reservation)
+    await session.flush()
+    await sync_reservation_occupancy(session, reservation_id)
+    await sync_reservation_utilization(session, reservation_id)
+    await notify_reservation_change(session, reservation_id)
     await session.commit()
-    await session.refresh(db_reservation)
 
     public_reservation = PublicReservation.from_orm(db_reservation)
 
@@ -740,25 +1438,80 @@ reservationtimes_router = APIRouter(
 )
 
 
-@reservationtimes_router.get("/", response_model=list[PublicReservationTime])
+@reservationtimes_router.get("/", response_model=Response[PublicReservationTime])
 async def read_reservationTimes(
-    session: SessionDep,
-    offset: int = 0,
+    session: ReplicaSessionDep,
+    start: Annotated[Optional[datetime], Query(alias="from")] = None,
+    end: Annotated[Optional[datetime], Query(alias="to")] = None,
+    resource_id: Optional[int] = None,
+    collection_id: Optional[int] = None,
+    cursor: Optional[str] = None,
     limit: Annotated[int, Query(le=100)] = 100,
-) -> list[PublicReservationTime]:
-    query = select(DBReservationTime).where(DBReservationTime.active)
-    query = query.offset(offset).limit(limit + 1)
-    result = await session.execute(query)
-    reservationTimes: list[PublicReservationTime] = result.scalars().all()
+) -> Response[PublicReservationTime]:
+    query = (
+        select(DBReservationTime)
+        .join(DBReservation, DBReservation.id == DBReservationTime.reservation_id)
+        .where(DBReservationTime.active)
+        .where(*time_overlaps(start, end))
+        .options(contains_eager(DBReservationTime.reservation))
+    )
+
+    if resource_id or collection_id:
+        query = query.where(
+            DBReservationTime.reservation_id.in_(
+                reservations_using(resource_id, collection_id)
+            )
+        )
+
+    page = await paginate(
+        session,
+        query,
+        (DBReservationTime.start, DBReservationTime.id),
+        cursor,
+        limit,
+    )
 
-    return reservationTimes
+    if start and end:
+        # Times of recurring reservations are listed once per occurrence in
+        # the window. The cursor still points at the underlying time.
+        start, end = aware(start), aware(end)
+        page["items"] = [
+            PublicReservationTime(
+                id=time.id,
+                reservation_id=time.reservation_id,
+                start=occurrence_start,
+                end=occurrence_end,
+            )
+            for time in page["items"]
+            for occurrence_start, occurrence_end in occurrences(
+                time.start,
+                time.end,
+                reservation_recurrence(time.reservation),
+                start,
+                end,
+            )
+        ]
+
+    return page
+
+
+@reservationtimes_router.get("/batch", response_model=Batch[PublicReservationTime])
+async def get_reservationTimes_batch(
+    session: ReplicaSessionDep, ids: BatchIds
+) -> Batch[PublicReservationTime]:
+    query = (
+        select(DBReservationTime)
+        .where(among(DBReservationTime.id, ids))
+        .where(DBReservationTime.active)
+    )
+    return await fetch_batch(session, query, ids)
 
 
 @reservationtimes_router.get(
     "/{reservationTime_id}", response_model=PublicReservationTime
 )
 async def get_one_reservationTime(
-    session: SessionDep, reservationTime_id: int
+    session: ReplicaSessionDep, reservationTime_id: int
 ) -> PublicReservationTime:
     query = (
         select(DBReservationTime)
@@ -781,8 +1534,11 @@ async def create_reservationTime(
         end=reservationTime.end,
     )
     session.add(db_reservationTime)
+    await session.flush()
+    await sync_reservation_occupancy(session, db_reservationTime.reservation_id)
+    await sync_reservation_utilization(session, db_reservationTime.reservation_id)
+    await notify_reservation_change(session, db_reservationTime.reservation_id)
     await session.commit()
-    await session.refresh(db_reservationTime)
 
     public_reservationTime = PublicReservationTime.from_orm(db_reservationTime)
 
@@ -791,14 +1547,20 @@ async def create_reservationTime(
 
 @reservationtimes_router.delete("/{reservationTime_id}", response_model=None)
 async def delete_reservationTime(session: SessionDep, reservationTime_id: int) -> None:
-    db_reservationTime = await session.get(DBReservationTime, reservationTime_id)
-    if not db_reservationTime:
+    reservation_id = await session.scalar(
+        update(DBReservationTime)
+        .where(DBReservationTime.id == reservationTime_id)
+        .values(active=False)
+        .returning(DBReservationTime.reservation_id)
+    )
+    if reservation_id is None:
         raise HTTPException(status_code=404, detail="ReservationTime not found")
 
-    db_reservationTime.sqlmodel_update({"active": False})
-    session.add(db_reservationTime)
+    await sync_reservation_occupancy(session, reservation_id)
+
+    await sync_reservation_utilization(session, reservation_id)
+    await notify_reservation_change(session, reservation_id)
     await session.commit()
-    await session.refresh(db_reservationTime)
 
     return []
 
@@ -816,12 +1578,19 @@ async def update_reservationTime(
     if not db_reservationTime:
         raise HTTPException(status_code=404, detail="ReservationTime not found")
 
+    previous_reservation_id = db_reservationTime.reservation_id
     reservationTime_data = reservationTime.model_dump(exclude_unset=True)
     db_reservationTime.sqlmodel_update(reservationTime_data)
 
     session.add(db_reservationTime)
+    await session.flush()
+    for reservation_id in sorted(
+        {previous_reservation_id, db_reservationTime.reservation_id}
+    ):
+        await sync_reservation_occupancy(session, reservation_id)
+        await sync_reservation_utilization(session, reservation_id)
+        await notify_reservation_change(session, reservation_id)
     await session.commit()
-    await session.refresh(db_reservationTime)
 
     public_reservationTime = PublicReservationTime.from_orm(db_reservationTime)
 
@@ -836,25 +1605,37 @@ reservationresources_router = APIRouter(
 )
 
 
-@reservationresources_router.get("/", response_model=list[PublicReservationResource])
+@reservationresources_router.get(
+    "/", response_model=Response[PublicReservationResource]
+)
 async def read_reservationResources(
-    session: SessionDep,
-    offset: int = 0,
+    session: ReplicaSessionDep,
+    cursor: Optional[str] = None,
     limit: Annotated[int, Query(le=100)] = 100,
-) -> list[PublicReservationResource]:
+) -> Response[PublicReservationResource]:
     query = select(DBReservationResource).where(DBReservationResource.active)
-    query = query.offset(offset).limit(limit + 1)
-    result = await session.execute(query)
-    reservationResources: list[PublicReservationResource] = result.scalars().all()
+    return await paginate(session, query, (DBReservationResource.id,), cursor, limit)
 
-    return reservationResources
+
+@reservationresources_router.get(
+    "/batch", response_model=Batch[PublicReservationResource]
+)
+async def get_reservationResources_batch(
+    session: ReplicaSessionDep, ids: BatchIds
+) -> Batch[PublicReservationResource]:
+    query = (
+        select(DBReservationResource)
+        .where(among(DBReservationResource.id, ids))
+        .where(DBReservationResource.active)
+    )
+    return await fetch_batch(session, query, ids)
 
 
 @reservationresources_router.get(
     "/{reservationResource_id}", response_model=PublicReservationResource
 )
 async def get_one_reservationResource(
-    session: SessionDep, reservationResource_id: int
+    session: ReplicaSessionDep, reservationResource_id: int
 ) -> PublicReservationResource:
     query = (
         select(DBReservationResource)
@@ -876,8 +1657,11 @@ async def create_reservationResource(
         resource_id=reservationResource.resource_id,
     )
     session.add(db_reservationResource)
+    await session.flush()
+    await sync_reservation_occupancy(session, db_reservationResource.reservation_id)
+    await sync_reservation_utilization(session, db_reservationResource.reservation_id)
+    await notify_reservation_change(session, db_reservationResource.reservation_id)
     await session.commit()
-    await session.refresh(db_reservationResource)
 
     public_reservationResource = PublicReservationResource.from_orm(
         db_reservationResource
@@ -890,16 +1674,20 @@ async def create_reservationResource(
 async def delete_reservationResource(
     session: SessionDep, reservationResource_id: int
 ) -> None:
-    db_reservationResource = await session.get(
-        DBReservationResource, reservationResource_id
+    reservation_id = await session.scalar(
+        update(DBReservationResource)
+        .where(DBReservationResource.id == reservationResource_id)
+        .values(active=False)
+        .returning(DBReservationResource.reservation_id)
     )
-    if not db_reservationResource:
+    if reservation_id is None:
         raise HTTPException(status_code=404, detail="ReservationResource not found")
 
-    db_reservationResource.sqlmodel_update({"active": False})
-    session.add(db_reservationResource)
+    await sync_reservation_occupancy(session, reservation_id)
+
+    await sync_reservation_utilization(session, reservation_id)
+    await notify_reservation_change(session, reservation_id)
     await session.commit()
-    await session.refresh(db_reservationResource)
 
     return None
 
@@ -921,15 +1709,165 @@ async def update_reservationResource(
     if not db_reservationResource:
         raise HTTPException(status_code=404, detail="ReservationResource not found")
 
+    previous_reservation_id = db_reservationResource.reservation_id
+    previous_resource_id = db_reservationResource.resource_id
     reservationResource_data = reservationResource.model_dump(exclude_unset=True)
     db_reservationResource.sqlmodel_update(reservationResource_data)
 
     session.add(db_reservationResource)
+    await session.flush()
+    for reservation_id in sorted(
+        {previous_reservation_id, db_reservationResource.reservation_id}
+    ):
+        await sync_reservation_occupancy(session, reservation_id)
+        await sync_reservation_utilization(session, reservation_id)
+        await notify_reservation_change(session, reservation_id, [previous_resource_id])
     await session.commit()
-    await session.refresh(db_reservationResource)
 
     public_reservationResource = PublicReservationResource.from_orm(
         db_reservationResource
     )
 
     return public_reservationResource
+
+
+## Typeahead ##
+
+
+typeahead_router = APIRouter(prefix="/typeahead", tags=["Typeahead"])
+
+
+@typeahead_router.get("/", response_model=list[TypeaheadMatch])
+async def read_typeahead(
+    session: ReplicaSessionDep,
+    kind: TypeaheadKind,
+    q: Annotated[str, Query(min_length=TYPEAHEAD_MIN_LENGTH, max_length=100)],
+    limit: Annotated[int, Query(ge=1, le=50)] = 10,
+) -> list[TypeaheadMatch]:
+    result = await session.execute(typeahead(kind, q, limit))
+
+    return [TypeaheadMatch(id=id, name=name) for id, name in result]
+
+
+## Utilization ##
+
+
+utilization_router = APIRouter(prefix="/utilization", tags=["Utilization"])
+
+
+@utilization_router.get("/hours", response_model=list[UtilizationHours])
+async def get_utilization_hours(
+    session: ReplicaSessionDep,
+    by: Annotated[list[UtilizationDimension], Query()] = [
+        UtilizationDimension.resource
+    ],
+    start: Annotated[Optional[date], Query(alias="from")] = None,
+    end: Annotated[Optional[date], Query(alias="to")] = None,
+    resource_id: Optional[int] = None,
+    org_id: Optional[int] = None,
+    collection_id: Optional[int] = None,
+) -> list[UtilizationHours]:
+    """Booked hours grouped by resource, organization and/or month, for the
+    months from the month of from up to to."""
+    conditions = utilization_filters(start, end, resource_id, org_id, collection_id)
+    result = await session.execute(utilization_hours(by, conditions))
+
+    return [UtilizationHours(**row._asdict()) for row in result]
+
+
+@utilization_router.get("/heatmap", response_model=UtilizationHeatmap)
+async def get_utilization_heatmap(
+    session: ReplicaSessionDep,
+    start: Annotated[Optional[date], Query(alias="from")] = None,
+    end: Annotated[Optional[date], Query(alias="to")] = None,
+    resource_id: Optional[int] = None,
+    org_id: Optional[int] = None,
+    collection_id: Optional[int] = None,
+) -> UtilizationHeatmap:
+    """Booked hours by the weekday and hour of the day they fall on."""
+    conditions = utilization_filters(start, end, resource_id, org_id, collection_id)
+    hours = [[0.0] * 24 for _ in range(7)]
+    for weekday, hour, booked in await session.execute(utilization_heatmap(conditions)):
+        hours[weekday][hour] = float(booked)
+
+    return UtilizationHeatmap(hours=hours)
+
+
+## Live ##
+
+
+live_router = APIRouter(prefix="/live", tags=["Live"])
+
+
+def live_topics(collection_ids: list[int], resource_ids: list[int]) -> list[Topic]:
+    return [("collection", id) for id in collection_ids] + [
+        ("resource", id) for id in resource_ids
+    ]
+
+
+def subscribed(subscriber: Subscriber) -> str:
+    return json.dumps(
+        {
+            "event": "subscribed",
+            "collection_ids": sorted(
+                id for kind, id in subscriber.topics if kind == "collection"
+            ),
+            "resource_ids": sorted(
+                id for kind, id in subscriber.topics if kind == "resource"
+            ),
+        }
+    )
+
+
+async def forward(websocket: WebSocket, subscriber: Subscriber):
+    while True:
+        await websocket.send_text(await subscriber.queue.get())
+
+
+@live_router.websocket("/")
+async def live_updates(
+    websocket: WebSocket,
+    collection_id: Annotated[list[int], Query()] = [],
+    resource_id: Annotated[list[int], Query()] = [],
+):
+    """Changes to the reservations of the followed collections and resources.
+
+    Clients follow the collections and resources given in the query, and
+    change them by sending {"action": "subscribe" | "unsubscribe",
+    "collection_ids": [...], "resource_ids": [...]}. Every change is sent as
+    {"event": "reservation", "reservation_id", "resource_ids",
+    "collection_ids"}, and {"event": "resync"} when changes may have been
+    missed and the reservations have to be fetched again.
+    """
+    await websocket.accept()
+    subscriber = listener.subscriber()
+    listener.subscribe(subscriber, live_topics(collection_id, resource_id))
+    subscriber.send(subscribed(subscriber))
+
+    sender = asyncio.create_task(forward(websocket, subscriber))
+    try:
+        while True:
+            try:
+                message = LiveMessage.model_validate_json(
+                    await websocket.receive_text()
+                )
+            except ValidationError as error:
+                subscriber.send(
+                    json.dumps(
+                        {"event": "error", "detail": error.errors(include_url=False)}
+                    )
+                )
+                continue
+
+            topics = live_topics(message.collection_ids, message.resource_ids)
+            if message.action == LiveAction.subscribe:
+                listener.subscribe(subscriber, topics)
+            else:
+                listener.unsubscribe(subscriber, topics)
+            subscriber.send(subscribed(subscriber))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        listener.unsubscribe(subscriber)
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
@@ -0,0 +1,53 @@
+import hashlib
+from typing import Hashable, Iterable, Optional
+
+from fastapi import Response as HTTPResponse
+from sqlmodel import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import DBChangeVersion
+
+
+async def table_etag(
+    session: AsyncSession, tables: Iterable[str], *key: Hashable
+) -> str:
+    """Strong ETag of a response built from tables, for the given parameters.
+
+    Reads only the change versions of the tables, so it is cheap enough to
+    run before deciding whether the response has to be built at all.
+    """
+    tables = sorted(tables)
+    result = await session.execute(
+        select(DBChangeVersion.table_name, DBChangeVersion.version).where(
+            DBChangeVersion.table_name.in_(tables)
+        )
+    )
+    versions = dict(result.all())
+
+    return make_etag(key, [(table, versions.get(table, 0)) for table in tables])
+
+
+def make_etag(*parts: Hashable) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+
+    return False
+
+
+def etag_headers(etag: str) -> dict[str, str]:
+    # no-cache lets browsers keep the response but revalidate it every time.
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def not_modified(etag: str, headers: Optional[dict[str, str]] = None) -> HTTPResponse:
+    return HTTPResponse(status_code=304, headers=etag_headers(etag) | (headers or {}))
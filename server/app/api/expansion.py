@@ -0,0 +1,68 @@
+from functools import lru_cache
+from typing import Any, Iterable, Optional
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+
+from app.models.models import Response
+
+
+def parse_names(
+    value: Optional[str], allowed: Iterable[str], parameter: str
+) -> Optional[frozenset[str]]:
+    """Names of a comma separated expand= or fields= parameter, None when
+    the parameter was not given."""
+    if value is None:
+        return None
+
+    names = frozenset(name.strip() for name in value.split(",") if name.strip())
+    unknown = names.difference(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown {parameter} {', '.join(sorted(unknown))}, "
+            f"expected some of {', '.join(sorted(allowed))}",
+        )
+
+    return names
+
+
+def with_parents(expand: frozenset[str]) -> frozenset[str]:
+    """Expansions with the ones they are nested in, user.org implies user."""
+    parts = (name.split(".") for name in expand)
+    return frozenset(
+        ".".join(path[:depth]) for path in parts for depth in range(1, len(path) + 1)
+    )
+
+
+@lru_cache(maxsize=256)
+def response_model(
+    name: str,
+    base: type[BaseModel],
+    fields: Optional[frozenset[str]],
+    relations: tuple[tuple[str, Any], ...] = (),
+    replaces: tuple[str, ...] = (),
+) -> type[BaseModel]:
+    """Model with the fields of base, narrowed down to the given ones and the
+    id, and the given relations in place of the foreign keys they replace.
+
+    Models are cached, so every combination of parameters is only built once.
+    """
+    definitions: dict[str, Any] = {
+        field: (info.annotation, ...)
+        for field, info in base.model_fields.items()
+        if field == "id"
+        or (fields is None and field not in replaces)
+        or (fields is not None and field in fields)
+    }
+    for field, annotation in relations:
+        definitions[field] = (annotation, ...)
+
+    return create_model(
+        name, __config__=ConfigDict(from_attributes=True), **definitions
+    )
+
+
+@lru_cache(maxsize=256)
+def page_adapter(model: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(Response[model])
@@ -0,0 +1,191 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Optional
+
+from sqlmodel import select
+from sqlalchemy import JSON, func, literal_column
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.db.availability import reservations_in_window
+from app.models.models import (
+    DBOrg,
+    DBReservation,
+    DBReservationResource,
+    DBReservationTime,
+    DBResource,
+    DBUser,
+)
+
+# Rows fetched from the server side cursor per round trip.
+EXPORT_BATCH_SIZE = 500
+
+CSV_COLUMNS = [
+    "reservation_id",
+    "name",
+    "description",
+    "contact_info",
+    "user_id",
+    "username",
+    "org_id",
+    "org_name",
+    "recurrence_frequency",
+    "recurrence_interval",
+    "recurrence_until",
+    "recurrence_exceptions",
+    "start",
+    "end",
+    "resources",
+]
+
+
+def _json_list(query):
+    """Aggregate a correlated query of json objects into a json array."""
+    return func.coalesce(
+        query.scalar_subquery(), literal_column("'[]'::json"), type_=JSON
+    )
+
+
+def export_query(start: Optional[datetime], end: Optional[datetime]):
+    """One row per active reservation with its times and resources as json.
+
+    The times and resources are aggregated in the database so that a
+    reservation arrives as a single row, however many of them it has.
+    """
+    times = _json_list(
+        select(
+            func.json_agg(
+                aggregate_order_by(
+                    func.json_build_object(
+                        "id",
+                        DBReservationTime.id,
+                        "start",
+                        DBReservationTime.start,
+                        "end",
+                        DBReservationTime.end,
+                    ),
+                    DBReservationTime.start,
+                )
+            )
+        )
+        .where(DBReservationTime.reservation_id == DBReservation.id)
+        .where(DBReservationTime.active)
+    )
+    resources = _json_list(
+        select(
+            func.json_agg(
+                aggregate_order_by(
+                    func.json_build_object(
+                        "id", DBResource.id, "name", DBResource.name
+                    ),
+                    DBResource.name,
+                )
+            )
+        )
+        .select_from(DBReservationResource)
+        .join(DBResource, DBResource.id == DBReservationResource.resource_id)
+        .where(DBReservationResource.reservation_id == DBReservation.id)
+        .where(DBReservationResource.active)
+    )
+
+    query = (
+        select(
+            DBReservation.id.label("reservation_id"),
+            DBReservation.name,
+            DBReservation.description,
+            DBReservation.contact_info,
+            DBReservation.user_id,
+            DBUser.username,
+            DBUser.org_id,
+            DBOrg.name.label("org_name"),
+            DBReservation.recurrence_frequency,
+            DBReservation.recurrence_interval,
+            DBReservation.recurrence_until,
+            DBReservation.recurrence_exceptions,
+            times.label("times"),
+            resources.label("resources"),
+        )
+        .outerjoin(DBUser, DBUser.id == DBReservation.user_id)
+        .outerjoin(DBOrg, DBOrg.id == DBUser.org_id)
+        .where(DBReservation.active)
+        .order_by(DBReservation.id)
+    )
+    if start or end:
+        query = query.where(DBReservation.id.in_(reservations_in_window(start, end)))
+
+    return query
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot export {type(value).__name__}")
+
+
+def ndjson_lines(rows) -> str:
+    return "".join(
+        json.dumps(row._asdict(), default=_encode, ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+
+def csv_lines(rows, header: bool = False) -> str:
+    """One line per reservation time, with the resources of the reservation.
+
+    Reservations without times get a single line with empty start and end.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(CSV_COLUMNS)
+
+    for row in rows:
+        fields = [
+            row.reservation_id,
+            row.name,
+            row.description,
+            row.contact_info,
+            row.user_id,
+            row.username,
+            row.org_id,
+            row.org_name,
+            row.recurrence_frequency,
+            row.recurrence_interval,
+            row.recurrence_until.isoformat() if row.recurrence_until else None,
+            " ".join(day.isoformat() for day in row.recurrence_exceptions),
+        ]
+        resources = "; ".join(resource["name"] for resource in row.resources)
+        for time in row.times or [{"start": None, "end": None}]:
+            writer.writerow(fields + [time["start"], time["end"], resources])
+
+    return buffer.getvalue()
+
+
+async def stream_export(
+    session_factory: async_sessionmaker,
+    format: str,
+    start: Optional[datetime],
+    end: Optional[datetime],
+) -> AsyncIterator[str]:
+    """Render the export batch by batch while the rows are read.
+
+    Runs in its own session from session_factory: the response body is sent
+    after the request dependencies, and with them the request session, have
+    been closed.
+    """
+    async with session_factory() as session:
+        result = await session.stream(
+            export_query(start, end).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        first = True
+        async for rows in result.partitions():
+            if format == "csv":
+                yield csv_lines(rows, header=first)
+            else:
+                yield ndjson_lines(rows)
+            first = False
+
+        if first and format == "csv":
+            yield csv_lines([], header=True)
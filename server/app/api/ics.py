@@ -0,0 +1,301 @@
+from datetime import datetime, time, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from itertools import groupby
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi import Response as HTTPResponse
+from sqlmodel import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.cache import read_cache
+from app.api.etag import etag_headers, etag_matches, make_etag, not_modified
+from app.db.availability import RECURRENCE_COLUMNS, time_overlaps
+from app.db.recurrence import CALENDAR_TIMEZONE, Recurrence
+from app.models.models import (
+    DBChangeVersion,
+    DBCollection,
+    DBGroup,
+    DBReservation,
+    DBReservationResource,
+    DBReservationTime,
+    DBResource,
+    DBResourceVersion,
+)
+
+# Past reservations are kept in the feeds for this long.
+FEED_HISTORY = timedelta(days=180)
+
+# Names and group memberships of resources end up in the feeds too.
+FEED_TABLES = [
+    DBCollection.__tablename__,
+    DBGroup.__tablename__,
+    DBResource.__tablename__,
+]
+
+FEED_OWNERS = {"resource": DBResource, "group": DBGroup, "collection": DBCollection}
+
+# Rendered feeds, keyed by ETag.
+feeds_cache = read_cache("feeds", [], maxsize=512, ttl=3600.0)
+
+# Definition of CALENDAR_TIMEZONE for the clients, recurring events are
+# expressed in it so that they follow daylight saving like the series do.
+VTIMEZONE = [
+    "BEGIN:VTIMEZONE",
+    f"TZID:{CALENDAR_TIMEZONE.key}",
+    "BEGIN:STANDARD",
+    "DTSTART:19701025T040000",
+    "TZOFFSETFROM:+0300",
+    "TZOFFSETTO:+0200",
+    "TZNAME:EET",
+    "RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU",
+    "END:STANDARD",
+    "BEGIN:DAYLIGHT",
+    "DTSTART:19700329T030000",
+    "TZOFFSETFROM:+0200",
+    "TZOFFSETTO:+0300",
+    "TZNAME:EEST",
+    "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU",
+    "END:DAYLIGHT",
+    "END:VTIMEZONE",
+]
+
+
+def feed_resources(kind: str, owner_id: int):
+    """Subquery of the ids of the active resources shown in a feed."""
+    query = select(DBResource.id).where(DBResource.active)
+    if kind == "resource":
+        return query.where(DBResource.id == owner_id)
+    if kind == "group":
+        return query.where(DBResource.group_id == owner_id)
+
+    return (
+        query.join(DBGroup, DBGroup.id == DBResource.group_id)
+        .where(DBGroup.collection_id == owner_id)
+        .where(DBGroup.active)
+    )
+
+
+def escape(text: str) -> str:
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold(line: str) -> str:
+    """Split a content line into lines of at most 75 octets (RFC 5545 3.1)."""
+    parts = []
+    current = ""
+    size = 0
+    for char in line:
+        width = len(char.encode())
+        if size + width > 75:
+            parts.append(current)
+            current = " "
+            size = 1
+        current += char
+        size += width
+    parts.append(current)
+
+    return "\r\n".join(parts)
+
+
+def utc_stamp(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def local_stamp(value: datetime) -> str:
+    return value.astimezone(CALENDAR_TIMEZONE).strftime("%Y%m%dT%H%M%S")
+
+
+def event_lines(
+    time_id: int,
+    start: datetime,
+    end: datetime,
+    name: str,
+    description: Optional[str],
+    recurrence: Optional[Recurrence],
+    locations: list[str],
+    stamp: str,
+) -> list[str]:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:reservationtime-{time_id}@sitsit",
+        f"DTSTAMP:{stamp}",
+    ]
+    if recurrence is None:
+        lines += [f"DTSTART:{utc_stamp(start)}", f"DTEND:{utc_stamp(end)}"]
+    else:
+        tzid = CALENDAR_TIMEZONE.key
+        rule = (
+            f"FREQ={recurrence.frequency.value.upper()};INTERVAL={recurrence.interval}"
+        )
+        if recurrence.until is not None:
+            rule += f";UNTIL={utc_stamp(recurrence.until)}"
+        lines += [
+            f"DTSTART;TZID={tzid}:{local_stamp(start)}",
+            f"DTEND;TZID={tzid}:{local_stamp(end)}",
+            f"RRULE:{rule}",
+        ]
+        local_start = start.astimezone(CALENDAR_TIMEZONE).time()
+        lines += [
+            f"EXDATE;TZID={tzid}:"
+            + datetime.combine(day, local_start).strftime("%Y%m%dT%H%M%S")
+            for day in sorted(recurrence.exceptions)
+        ]
+
+    lines.append(f"SUMMARY:{escape(name or '')}")
+    if description:
+        lines.append(f"DESCRIPTION:{escape(description)}")
+    lines += [f"LOCATION:{escape(', '.join(locations))}", "END:VEVENT"]
+
+    return lines
+
+
+async def render_feed(
+    session: AsyncSession, name: str, resources, window_start: datetime
+) -> bytes:
+    query = (
+        select(
+            DBReservationTime.id,
+            DBReservationTime.start,
+            DBReservationTime.end,
+            DBReservation.name,
+            DBReservation.description,
+            *RECURRENCE_COLUMNS,
+            DBResource.name,
+        )
+        .join(DBReservation, DBReservation.id == DBReservationTime.reservation_id)
+        .join(
+            DBReservationResource,
+            DBReservationResource.reservation_id == DBReservationTime.reservation_id,
+        )
+        .join(DBResource, DBResource.id == DBReservationResource.resource_id)
+        .where(DBReservationResource.resource_id.in_(resources))
+        .where(DBReservationTime.active)
+        .where(DBReservationResource.active)
+        .where(DBReservation.active)
+        .where(*time_overlaps(window_start, None))
+        .order_by(DBReservationTime.start, DBReservationTime.id, DBResource.name)
+    )
+    result = await session.execute(query)
+
+    stamp = utc_stamp(datetime.now(timezone.utc))
+    events = []
+    recurring = False
+    for time_id, rows in groupby(result.all(), key=lambda row: row[0]):
+        rows = list(rows)
+        _, start, end, reservation_name, description, *rule, _ = rows[0]
+        recurrence = Recurrence.of(*rule)
+        recurring = recurring or recurrence is not None
+        events += event_lines(
+            time_id,
+            start,
+            end,
+            reservation_name,
+            description,
+            recurrence,
+            list(dict.fromkeys(row[-1] for row in rows)),
+            stamp,
+        )
+
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Sitsit//Reservations//FI",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape(name)}",
+        *(VTIMEZONE if recurring else []),
+        *events,
+        "END:VCALENDAR",
+    ]
+
+    return ("\r\n".join(fold(line) for line in lines) + "\r\n").encode()
+
+
+def modified_since(if_modified_since: Optional[str], last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return True
+
+    return since.tzinfo is None or last_modified.replace(microsecond=0) > since
+
+
+async def calendar_feed(
+    session: AsyncSession,
+    kind: str,
+    owner_id: int,
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str],
+) -> HTTPResponse:
+    """iCalendar feed of the reservations of the resources of an owner.
+
+    The feed is identified by the change versions of its resources, so
+    polling clients get a 304, and other clients a cached rendering, until
+    a reservation of one of those resources changes.
+    """
+    today = datetime.now(timezone.utc).date()
+    window_start = datetime.combine(today - FEED_HISTORY, time(), timezone.utc)
+    resources = feed_resources(kind, owner_id)
+
+    scope = resources.subquery()
+    result = await session.execute(
+        select(
+            scope.c.id, DBResourceVersion.version, DBResourceVersion.changed_at
+        ).outerjoin(DBResourceVersion, DBResourceVersion.resource_id == scope.c.id)
+    )
+    versions = sorted(result.all())
+    result = await session.execute(
+        select(
+            DBChangeVersion.table_name,
+            DBChangeVersion.version,
+            DBChangeVersion.changed_at,
+        ).where(DBChangeVersion.table_name.in_(FEED_TABLES))
+    )
+    table_versions = sorted(result.all())
+
+    etag = make_etag(
+        kind,
+        owner_id,
+        window_start,
+        [(resource_id, version) for resource_id, version, _ in versions],
+        [(table, version) for table, version, _ in table_versions],
+    )
+    changes = [changed_at for *_, changed_at in versions + table_versions]
+    last_modified = max(filter(None, changes), default=None)
+    headers = etag_headers(etag)
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(
+            last_modified.astimezone(timezone.utc), usegmt=True
+        )
+
+    if etag_matches(if_none_match, etag) or (
+        if_none_match is None
+        and if_modified_since is not None
+        and last_modified is not None
+        and not modified_since(if_modified_since, last_modified)
+    ):
+        return not_modified(etag, headers)
+
+    content = feeds_cache.get(etag)
+    if content is None:
+        owner = FEED_OWNERS[kind]
+        name = await session.scalar(
+            select(owner.name).where(owner.id == owner_id).where(owner.active)
+        )
+        if name is None:
+            raise HTTPException(status_code=404, detail=f"{kind.title()} not found")
+
+        content = feeds_cache.put(
+            etag, await render_feed(session, name, resources, window_start)
+        )
+
+    return HTTPResponse(
+        content=content, media_type="text/calendar; charset=utf-8", headers=headers
+    )
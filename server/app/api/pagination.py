@@ -0,0 +1,104 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import BigInteger, Integer, Select, String, TypeDecorator, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def encode_cursor(values: list[Any]) -> str:
+    payload = json.dumps(
+        [
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in values
+        ],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_value(value: Any, column) -> Any:
+    """The cursor value of a column as its Python type, a ValueError when it
+    does not fit the column, so that a tampered cursor never reaches the
+    database."""
+    column_type = column.type
+    if isinstance(column_type, TypeDecorator):
+        column_type = column_type.impl_instance
+    python_type = column_type.python_type
+    if value is None:
+        return value
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is float and type(value) is int:
+        return float(value)
+    if type(value) is not python_type:
+        raise ValueError(value)
+    if isinstance(column_type, Integer) and not isinstance(column_type, BigInteger):
+        if not -(2**31) <= value < 2**31:
+            raise ValueError(value)
+    if isinstance(column_type, String) and "\x00" in value:
+        raise ValueError(value)
+
+    return value
+
+
+def decode_cursor(cursor: str, columns: tuple) -> list[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+
+        return [decode_value(value, column) for value, column in zip(values, columns)]
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def paginate(
+    session: AsyncSession,
+    query: Select,
+    order_by: tuple,
+    cursor: Optional[str],
+    limit: int,
+    rows: bool = False,
+    descending: bool = False,
+) -> dict[str, Any]:
+    """Fetch one keyset page of query ordered by the order_by columns.
+
+    The last column must be unique (the primary key) so that the cursor,
+    which holds the order_by values of the last returned row, identifies
+    the page boundary exactly. Returns the fields of a Response envelope,
+    with the items as ORM objects, or as Rows of the selected columns when
+    rows is set.
+    """
+    if cursor:
+        boundary = tuple_(*decode_cursor(cursor, order_by))
+        query = query.where(
+            tuple_(*order_by) < boundary if descending else tuple_(*order_by) > boundary
+        )
+
+    if descending:
+        query = query.order_by(*(column.desc() for column in order_by))
+    else:
+        query = query.order_by(*order_by)
+    query = query.limit(limit + 1)
+    result = await session.execute(query)
+    items = list(result.all() if rows else result.scalars().all())
+
+    more_available = len(items) > limit
+    items = items[:limit]
+    next_cursor = None
+    if more_available:
+        next_cursor = encode_cursor(
+            [getattr(items[-1], column.key) for column in order_by]
+        )
+
+    return {
+        "status": True,
+        "more_available": more_available,
+        "next_cursor": next_cursor,
+        "items": items,
+    }
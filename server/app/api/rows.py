@@ -0,0 +1,194 @@
+from datetime import datetime
+from typing import Any, Iterable, Optional
+
+from sqlmodel import select
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.pagination import paginate
+from app.db.availability import RECURRENCE_COLUMNS, any_occurrence
+from app.db.recurrence import Recurrence
+from app.models.models import (
+    DBOrg,
+    DBReservation,
+    DBReservationResource,
+    DBReservationTime,
+    DBResource,
+    DBUser,
+    PublicReservation,
+)
+
+# List pages built from row tuples instead of ORM objects. The columns of
+# the page are selected as plain rows, every expanded relation is fetched
+# with one more query, and the dicts are validated by the cached
+# TypeAdapters of app.api.expansion, without hydrating the identity map.
+
+
+async def fetch(session: AsyncSession, query: Select) -> list[dict[str, Any]]:
+    result = await session.execute(query)
+    return [row._asdict() for row in result]
+
+
+def group_by(rows: Iterable[dict[str, Any]], key: str) -> dict[Any, list[dict]]:
+    groups: dict[Any, list[dict]] = {}
+    for row in rows:
+        groups.setdefault(row.pop(key), []).append(row)
+
+    return groups
+
+
+async def reservation_users(
+    session: AsyncSession, user_ids: Iterable[int], with_org: bool
+) -> dict[int, dict[str, Any]]:
+    query = select(DBUser.id, DBUser.username, DBUser.org_id).where(
+        DBUser.id.in_(set(user_ids))
+    )
+    if not with_org:
+        return {user["id"]: user for user in await fetch(session, query)}
+
+    query = query.add_columns(DBOrg.name.label("org_name")).outerjoin(
+        DBOrg, DBOrg.id == DBUser.org_id
+    )
+    users = {}
+    for user in await fetch(session, query):
+        org_id, org_name = user.pop("org_id"), user.pop("org_name")
+        user["org"] = None if org_id is None else {"id": org_id, "name": org_name}
+        users[user["id"]] = user
+
+    return users
+
+
+async def reservation_times(
+    session: AsyncSession, reservation_ids: list[int]
+) -> dict[int, list[dict[str, Any]]]:
+    query = (
+        select(
+            DBReservationTime.reservation_id.label("key"),
+            DBReservationTime.reservation_id,
+            DBReservationTime.id,
+            DBReservationTime.start,
+            DBReservationTime.end,
+            DBReservationTime.active,
+        )
+        .where(DBReservationTime.reservation_id.in_(reservation_ids))
+        .order_by(DBReservationTime.id)
+    )
+    return group_by(await fetch(session, query), "key")
+
+
+async def reservation_resources(
+    session: AsyncSession, reservation_ids: list[int], with_resource: bool
+) -> dict[int, list[dict[str, Any]]]:
+    query = (
+        select(
+            DBReservationResource.reservation_id.label("key"),
+            DBReservationResource.reservation_id,
+            DBReservationResource.id,
+            DBReservationResource.resource_id,
+        )
+        .where(DBReservationResource.reservation_id.in_(reservation_ids))
+        .order_by(DBReservationResource.id)
+    )
+    if not with_resource:
+        return group_by(await fetch(session, query), "key")
+
+    query = query.add_columns(
+        DBResource.name, DBResource.group_id, DBResource.resource_type_id
+    ).join(DBResource, DBResource.id == DBReservationResource.resource_id)
+    resources = await fetch(session, query)
+    for row in resources:
+        row["resource"] = {
+            "id": row.pop("resource_id"),
+            "name": row.pop("name"),
+            "group_id": row.pop("group_id"),
+            "resource_type_id": row.pop("resource_type_id"),
+        }
+
+    return group_by(resources, "key")
+
+
+async def reservation_page(
+    session: AsyncSession,
+    conditions: list,
+    expand: frozenset[str],
+    fields: Optional[frozenset[str]],
+    cursor: Optional[str],
+    limit: int,
+    window: Optional[tuple[datetime, datetime]] = None,
+    rank=None,
+) -> dict[str, Any]:
+    """One page of active reservations as dicts with the expanded relations.
+
+    Recurring reservations without an occurrence in the window are dropped
+    from the page, which needs their times and recurrence rule. Pages are
+    ordered by id, or by the rank expression, best first, when one is given,
+    with the rank of every reservation in its item.
+    """
+    columns = {
+        "id",
+        *(fields if fields is not None else PublicReservation.model_fields),
+    }
+    if "user" in expand:
+        columns.add("user_id")
+    if window is not None:
+        columns.update(column.key for column in RECURRENCE_COLUMNS)
+
+    selected = [getattr(DBReservation, column) for column in sorted(columns)]
+    order_by = (DBReservation.id,)
+    if rank is not None:
+        rank = rank.label("rank")
+        selected.append(rank)
+        order_by = (rank, DBReservation.id)
+
+    query = select(*selected).where(DBReservation.active).where(*conditions)
+    page = await paginate(
+        session,
+        query,
+        order_by,
+        cursor,
+        limit,
+        rows=True,
+        descending=rank is not None,
+    )
+    items = [row._asdict() for row in page["items"]]
+    ids = [item["id"] for item in items]
+
+    times = {}
+    if ids and ("times" in expand or window is not None):
+        times = await reservation_times(session, ids)
+    if window is not None:
+        start, end = window
+        items = [
+            item
+            for item in items
+            if any_occurrence(
+                Recurrence.of(*(item[column.key] for column in RECURRENCE_COLUMNS)),
+                [
+                    (time["start"], time["end"])
+                    for time in times.get(item["id"], [])
+                    if time["active"]
+                ],
+                start,
+                end,
+            )
+        ]
+        ids = [item["id"] for item in items]
+
+    if ids and "user" in expand:
+        users = await reservation_users(
+            session, (item["user_id"] for item in items), "user.org" in expand
+        )
+        for item in items:
+            item["user"] = users.get(item["user_id"])
+    if "times" in expand:
+        for item in items:
+            item["times"] = times.get(item["id"], [])
+    if ids and "resources" in expand:
+        resources = await reservation_resources(
+            session, ids, "resources.resource" in expand
+        )
+        for item in items:
+            item["resources"] = resources.get(item["id"], [])
+
+    page["items"] = items
+    return page
@@ -0,0 +1,90 @@
+from functools import lru_cache
+from typing import Literal, Optional
+
+from pydantic import Field, model_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """Settings read from the environment or from a .env file."""
+
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    postgres_db: Optional[str] = None
+    postgres_user: Optional[str] = None
+    postgres_password: Optional[str] = None
+    postgres_host: str = "db"
+    postgres_port: int = 5432
+    # Overrides the postgres_* settings when given.
+    database_url: Optional[str] = None
+    # Streaming replica serving GET requests, the primary when not given.
+    replica_database_url: Optional[str] = None
+    # Seconds a client reads from the primary after a write, so that it
+    # sees its own changes even while the replica lags behind.
+    replica_sticky_seconds: int = Field(default=5, ge=0)
+    # Origins of the web clients. Requests carry credentials, the sticky
+    # primary cookie among them, so the origins must be listed explicitly.
+    cors_origins: list[str] = ["http://localhost:5173"]
+
+    # Level of the loggers of the app, the request logs are INFO.
+    log_level: Literal["DEBUG", "INFO", "WARNING", "ERROR"] = "INFO"
+
+    # Log every statement, for development only.
+    db_echo: bool = False
+    # Connections kept open per worker, and extra ones opened under load.
+    db_pool_size: int = Field(default=5, ge=1)
+    db_max_overflow: int = Field(default=10, ge=0)
+    db_pool_timeout: float = Field(default=30.0, gt=0)
+    # Test connections before use, costs a round trip per checkout.
+    db_pool_pre_ping: bool = False
+    # Seconds after which connections are replaced, -1 never.
+    db_pool_recycle: int = 1800
+    # Prepared statements cached per connection. Set to 0 behind
+    # pgbouncer in transaction mode.
+    db_statement_cache_size: int = Field(default=100, ge=0)
+    # Milliseconds a statement may run before Postgres cancels it, 0 never.
+    db_statement_timeout: int = Field(default=0, ge=0)
+    db_application_name: str = "sitsit"
+    # Count the statements of every request, reported in Server-Timing
+    # headers and logs, and their durations in /metrics.
+    db_instrument: bool = True
+    # Statements run this many times in one request are logged as likely
+    # N+1 queries.
+    db_repeated_statement_threshold: int = Field(default=5, ge=2)
+
+    # Events buffered per WebSocket client before it is asked to resync.
+    live_queue_size: int = Field(default=100, ge=1)
+    # Seconds between attempts to listen for changes again.
+    live_retry_seconds: float = Field(default=5.0, gt=0)
+
+    # Hours between moving the utilization rollups of series without an end
+    # date forward to the horizon.
+    utilization_refresh_hours: float = Field(default=24.0, gt=0)
+
+    @model_validator(mode="after")
+    def check_database(self) -> "Settings":
+        if self.database_url is None and None in (
+            self.postgres_db,
+            self.postgres_user,
+            self.postgres_password,
+        ):
+            raise ValueError(
+                "Set either database_url or postgres_db, postgres_user and "
+                "postgres_password"
+            )
+        return self
+
+    @property
+    def sqlalchemy_database_url(self) -> str:
+        if self.database_url:
+            return self.database_url
+
+        return (
+            f"postgresql+asyncpg://{self.postgres_user}:{self.postgres_password}"
+            f"@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
+        )
+
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
@@ -0,0 +1,211 @@
+from datetime import datetime, timezone
+from typing import Iterable, NamedTuple, Optional
+
+from sqlmodel import select
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.recurrence import Recurrence, occurrences
+
+from app.models.models import (
+    DBGroup,
+    DBReservation,
+    DBReservationResource,
+    DBReservationTime,
+    DBResource,
+)
+
+
+class ReservationBlock(NamedTuple):
+    resource_id: int
+    reservation_id: int
+    reservation_name: str
+    start: datetime
+    end: datetime
+
+
+def aware(value: datetime) -> datetime:
+    """Treat naive datetimes as UTC, the same way asyncpg binds them."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+RECURRENCE_COLUMNS = (
+    DBReservation.recurrence_frequency,
+    DBReservation.recurrence_interval,
+    DBReservation.recurrence_until,
+    DBReservation.recurrence_exceptions,
+)
+
+
+def time_overlaps(start: Optional[datetime], end: Optional[datetime]) -> list:
+    """Conditions selecting reservation times that overlap [start, end).
+
+    Either bound may be left open. Served by the (start, end) index. The
+    query must join DBReservation: times of recurring reservations match
+    whenever some occurrence of the series may fall in the window, and are
+    narrowed down by expanding them with app.db.recurrence.occurrences.
+    """
+    conditions = []
+    if end is not None:
+        conditions.append(DBReservationTime.start < end)
+    if start is not None:
+        conditions.append(
+            or_(
+                DBReservationTime.end > start,
+                and_(
+                    DBReservation.recurrence_frequency.is_not(None),
+                    or_(
+                        DBReservation.recurrence_until.is_(None),
+                        DBReservation.recurrence_until
+                        + (DBReservationTime.end - DBReservationTime.start)
+                        > start,
+                    ),
+                ),
+            )
+        )
+
+    return conditions
+
+
+def reservations_in_window(start: Optional[datetime], end: Optional[datetime]):
+    """Subquery of ids of reservations with an active time in [start, end)."""
+    return (
+        select(DBReservationTime.reservation_id)
+        .join(DBReservation, DBReservation.id == DBReservationTime.reservation_id)
+        .where(DBReservationTime.active)
+        .where(*time_overlaps(start, end))
+    )
+
+
+def reservation_recurrence(db_reservation: DBReservation) -> Optional[Recurrence]:
+    return Recurrence.of(
+        db_reservation.recurrence_frequency,
+        db_reservation.recurrence_interval,
+        db_reservation.recurrence_until,
+        db_reservation.recurrence_exceptions,
+    )
+
+
+def any_occurrence(
+    recurrence: Optional[Recurrence],
+    times: Iterable[tuple[datetime, datetime]],
+    start: Optional[datetime],
+    end: Optional[datetime],
+) -> bool:
+    """Whether a series repeating any of the times has an occurrence in the
+    window."""
+    if recurrence is None or start is None or end is None:
+        return True
+
+    return any(
+        next(occurrences(time_start, time_end, recurrence, start, end), None)
+        for time_start, time_end in times
+    )
+
+
+def reservations_using(
+    resource_id: Optional[int] = None, collection_id: Optional[int] = None
+):
+    """Subquery of ids of reservations holding a resource or any resource of a
+    collection."""
+    query = select(DBReservationResource.reservation_id).where(
+        DBReservationResource.active
+    )
+    if resource_id is not None:
+        query = query.where(DBReservationResource.resource_id == resource_id)
+    if collection_id is not None:
+        query = (
+            query.join(DBResource, DBResource.id == DBReservationResource.resource_id)
+            .join(DBGroup, DBGroup.id == DBResource.group_id)
+            .where(DBGroup.collection_id == collection_id)
+        )
+
+    return query
+
+
+async def reservation_blocks(
+    session: AsyncSession,
+    resource_ids: Iterable[int],
+    start: datetime,
+    end: datetime,
+) -> list[ReservationBlock]:
+    """Reserved time blocks of the given resources overlapping [start, end).
+
+    Resolves reservation resources to their times in a single query so that
+    the resource_id and reservation_id indexes do the work, instead of loading
+    whole reservation graphs. Recurring reservations are expanded into their
+    occurrences inside the window only.
+    """
+    query = (
+        select(
+            DBReservationResource.resource_id,
+            DBReservationTime.reservation_id,
+            DBReservation.name,
+            DBReservationTime.start,
+            DBReservationTime.end,
+            *RECURRENCE_COLUMNS,
+        )
+        .join(
+            DBReservationTime,
+            DBReservationTime.reservation_id == DBReservationResource.reservation_id,
+        )
+        .join(DBReservation, DBReservation.id == DBReservationResource.reservation_id)
+        .where(DBReservationResource.resource_id.in_(list(resource_ids)))
+        .where(DBReservationResource.active)
+        .where(DBReservationTime.active)
+        .where(DBReservation.active)
+        .where(*time_overlaps(start, end))
+        .order_by(DBReservationTime.start, DBReservationTime.id)
+    )
+    result = await session.execute(query)
+
+    blocks = []
+    for resource_id, reservation_id, name, time_start, time_end, *rule in result:
+        recurrence = Recurrence.of(*rule)
+        for occurrence_start, occurrence_end in occurrences(
+            time_start, time_end, recurrence, start, end
+        ):
+            blocks.append(
+                ReservationBlock(
+                    resource_id, reservation_id, name, occurrence_start, occurrence_end
+                )
+            )
+    blocks.sort(key=lambda block: (block.start, block.end))
+
+    return blocks
+
+
+def merge_intervals(
+    intervals: Iterable[tuple[datetime, datetime]], start: datetime, end: datetime
+) -> list[tuple[datetime, datetime]]:
+    """Clip intervals to [start, end) and merge overlapping or adjacent ones."""
+    merged: list[tuple[datetime, datetime]] = []
+    for interval_start, interval_end in sorted(intervals):
+        interval_start = max(interval_start, start)
+        interval_end = min(interval_end, end)
+        if interval_start >= interval_end:
+            continue
+        if merged and interval_start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], interval_end))
+        else:
+            merged.append((interval_start, interval_end))
+
+    return merged
+
+
+def free_gaps(
+    busy: list[tuple[datetime, datetime]], start: datetime, end: datetime
+) -> list[tuple[datetime, datetime]]:
+    """Gaps of [start, end) not covered by the merged busy intervals."""
+    gaps: list[tuple[datetime, datetime]] = []
+    cursor = start
+    for busy_start, busy_end in busy:
+        if busy_start > cursor:
+            gaps.append((cursor, busy_start))
+        cursor = max(cursor, busy_end)
+    if cursor < end:
+        gaps.append((cursor, end))
+
+    return gaps
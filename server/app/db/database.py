@@ -1,14 +1,36 @@
-from sqlmodel import SQLModel
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 
-import os
+from app.config import Settings, get_settings
+from app.db.instrumentation import instrument
 
-POSTGRES_DB = os.getenv("POSTGRES_DB")
-POSTGRES_USER = os.getenv("POSTGRES_USER")
-POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
-DATABASE_URL = (
-    f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@db:5432/{POSTGRES_DB}"
+
+def create_engine(settings: Settings, url: str) -> AsyncEngine:
+    return create_async_engine(
+        url,
+        echo=settings.db_echo,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_recycle=settings.db_pool_recycle,
+        connect_args={
+            "statement_cache_size": settings.db_statement_cache_size,
+            "server_settings": {
+                "application_name": settings.db_application_name,
+                "statement_timeout": str(settings.db_statement_timeout),
+            },
+        },
+    )
+
+
+settings = get_settings()
+engine = create_engine(settings, settings.sqlalchemy_database_url)
+replica_engine = (
+    create_engine(settings, settings.replica_database_url)
+    if settings.replica_database_url
+    else engine
 )
 
-# engine = create_engine(DATABASE_URL, echo=True)
-engine = create_async_engine(DATABASE_URL, echo=True)
+if settings.db_instrument:
+    instrument(engine)
+    instrument(replica_engine)
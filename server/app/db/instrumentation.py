@@ -0,0 +1,111 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.metrics import statement_duration
+
+logger = logging.getLogger(__name__)
+
+# Runs of bind parameters, so that IN lists of any length and casts of the
+# parameters don't make otherwise identical statements look different.
+PARAMETERS = re.compile(r"\$\d+(?:::[\w\[\]]+)?(?:\s*,\s*\$\d+(?:::[\w\[\]]+)?)*")
+
+
+def statement_shape(statement: str) -> str:
+    return " ".join(PARAMETERS.sub("?", statement).split())
+
+
+@dataclass
+class QueryStats:
+    """Statements run on behalf of one request."""
+
+    statements: int = 0
+    duration: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statement shapes run at least threshold times, likely N+1 queries."""
+        return [
+            (shape, count)
+            for shape, count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+
+# Set per request by the middleware in app.main. SQLAlchemy runs the
+# cursor events in greenlets that share the context of the awaiting task.
+query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.query_started = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is None:
+        return
+
+    duration = time.perf_counter() - context.query_started
+    statement_duration.observe(duration)
+    stats = query_stats.get()
+    if stats is None:
+        return
+
+    stats.statements += 1
+    stats.duration += duration
+    stats.shapes[statement_shape(statement)] += 1
+
+
+def instrument(engine: AsyncEngine):
+    if event.contains(engine.sync_engine, "after_cursor_execute", after_cursor_execute):
+        return
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+
+
+def server_timing(stats: QueryStats, total: float) -> str:
+    return (
+        f'db;dur={stats.duration * 1000:.1f};desc="{stats.statements} statements", '
+        f"total;dur={total * 1000:.1f}"
+    )
+
+
+def log_request(
+    method: str,
+    path: str,
+    status: int,
+    stats: QueryStats,
+    total: float,
+    threshold: int,
+):
+    """Log the statements of a request as one JSON object.
+
+    Requests that repeat a statement at least threshold times are logged
+    as warnings, with the repeated statements.
+    """
+    repeated = stats.repeated(threshold)
+    record = {
+        "method": method,
+        "path": path,
+        "status": status,
+        "statements": stats.statements,
+        "db_ms": round(stats.duration * 1000, 3),
+        "total_ms": round(total * 1000, 3),
+    }
+    if repeated:
+        record["repeated_statements"] = [
+            {"statement": shape, "count": count} for shape, count in repeated
+        ]
+        logger.warning(json.dumps(record))
+    else:
+        logger.info(json.dumps(record))
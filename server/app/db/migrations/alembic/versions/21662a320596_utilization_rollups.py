@@ -0,0 +1,169 @@
+"""Utilization rollups
+
+Revision ID: 21662a320596
+Revises: 210027ecf1db
+Create Date: 2026-10-18 10:37:53.608612
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '21662a320596'
+down_revision: Union[str, None] = '210027ecf1db'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Shares of the existing reservations, counted the way
+# app.db.utilization.reservation_utilization counts them: occurrences of
+# recurring times step on the wall clock of Europe/Helsinki, series without
+# an end date run 366 days ahead of now, overlapping times of a reservation
+# are merged, and the seconds are cut into local months, weekdays (0 is
+# Monday) and hours. Ambiguous local times resolve to the earlier instant,
+# as Python does.
+BACKFILL_RESERVATION_UTILIZATION = """
+WITH times AS (
+    SELECT r.id AS reservation_id, u.org_id, t.start, t."end",
+           r.recurrence_frequency AS frequency,
+           make_interval(days => CASE r.recurrence_frequency WHEN 'daily' THEN 1 ELSE 7 END
+                                 * greatest(r.recurrence_interval, 1)) AS step,
+           r.recurrence_until AS until, r.recurrence_exceptions AS exceptions
+    FROM dbreservation AS r
+    JOIN dbuser AS u ON u.id = r.user_id
+    JOIN dbreservationtime AS t ON t.reservation_id = r.id
+    WHERE r.active AND t.active AND t.start < t."end"
+),
+windows AS (
+    SELECT reservation_id, min(start) AS window_start,
+           max(CASE WHEN frequency IS NULL THEN start
+                    WHEN until IS NOT NULL THEN until
+                    ELSE greatest(start, now()) + interval '366 days'
+               END + ("end" - start)) AS window_end
+    FROM times
+    GROUP BY reservation_id
+),
+occurrences AS (
+    SELECT times.reservation_id, times.org_id, window_start, window_end,
+           o.start, o.start + (times."end" - times.start) AS "end"
+    FROM times
+    JOIN windows USING (reservation_id)
+    CROSS JOIN LATERAL generate_series(
+        0,
+        CASE WHEN frequency IS NULL THEN 0
+             ELSE floor(extract(epoch FROM window_end - times.start)
+                        / extract(epoch FROM step))::integer + 1
+        END
+    ) AS n
+    CROSS JOIN LATERAL (
+        SELECT (times.start AT TIME ZONE 'Europe/Helsinki') + n * step AS local
+    ) AS l
+    CROSS JOIN LATERAL (SELECT local AT TIME ZONE 'Europe/Helsinki' AS later) AS a
+    CROSS JOIN LATERAL (
+        SELECT CASE
+            WHEN frequency IS NULL THEN times.start
+            WHEN (later - interval '1 hour') AT TIME ZONE 'Europe/Helsinki' = local
+                THEN later - interval '1 hour'
+            ELSE later
+        END AS start
+    ) AS o
+    WHERE frequency IS NULL
+       OR (o.start < window_end
+           AND (until IS NULL OR o.start <= until)
+           AND local::date <> ALL (exceptions))
+),
+merged AS (
+    SELECT reservation_id, org_id,
+           unnest(range_agg(tstzrange(start, "end"))
+                  * tstzmultirange(tstzrange(window_start, window_end))) AS during
+    FROM occurrences
+    GROUP BY reservation_id, org_id, window_start, window_end
+),
+slices AS (
+    SELECT reservation_id, org_id,
+           greatest(lower(during), h) AT TIME ZONE 'Europe/Helsinki' AS local,
+           round(extract(epoch FROM least(upper(during), h + interval '1 hour')
+                                    - greatest(lower(during), h))) AS seconds
+    FROM merged
+    CROSS JOIN LATERAL generate_series(
+        date_trunc('hour', lower(during), 'UTC'), upper(during), interval '1 hour'
+    ) AS h
+    WHERE h < upper(during)
+),
+resources AS (
+    SELECT DISTINCT reservation_id, resource_id
+    FROM dbreservationresource
+    WHERE active
+)
+INSERT INTO dbreservationutilization (reservation_id, resource_id, org_id, month, weekday, hour, seconds)
+SELECT reservation_id, resource_id, org_id,
+       date_trunc('month', local)::date, extract(isodow FROM local)::integer - 1,
+       extract(hour FROM local)::integer, sum(seconds)
+FROM slices
+JOIN resources USING (reservation_id)
+GROUP BY 1, 2, 3, 4, 5, 6
+"""
+
+BACKFILL_UTILIZATION = """
+INSERT INTO dbutilization (resource_id, org_id, month, weekday, hour, seconds)
+SELECT resource_id, org_id, month, weekday, hour, sum(seconds)
+FROM dbreservationutilization
+GROUP BY resource_id, org_id, month, weekday, hour
+HAVING sum(seconds) <> 0
+"""
+
+
+def upgrade() -> None:
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('dbreservationutilization',
+    sa.Column('resource_id', sa.Integer(), nullable=False),
+    sa.Column('org_id', sa.Integer(), nullable=True),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('weekday', sa.Integer(), nullable=False),
+    sa.Column('hour', sa.Integer(), nullable=False),
+    sa.Column('seconds', sa.BigInteger(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('reservation_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['org_id'], ['dborg.id'], ),
+    sa.ForeignKeyConstraint(['reservation_id'], ['dbreservation.id'], ),
+    sa.ForeignKeyConstraint(['resource_id'], ['dbresource.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_dbreservationutilization_reservation_id'), 'dbreservationutilization', ['reservation_id'], unique=False)
+    op.create_table('dbutilization',
+    sa.Column('resource_id', sa.Integer(), nullable=False),
+    sa.Column('org_id', sa.Integer(), nullable=True),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('weekday', sa.Integer(), nullable=False),
+    sa.Column('hour', sa.Integer(), nullable=False),
+    sa.Column('seconds', sa.BigInteger(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['org_id'], ['dborg.id'], ),
+    sa.ForeignKeyConstraint(['resource_id'], ['dbresource.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('resource_id', 'org_id', 'month', 'weekday', 'hour', name='uq_dbutilization_bucket', postgresql_nulls_not_distinct=True)
+    )
+    op.create_table('dbutilizationrefresh',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # ### end Alembic commands ###
+
+    op.execute(BACKFILL_RESERVATION_UTILIZATION)
+    op.execute(BACKFILL_UTILIZATION)
+    # The open series were just counted up to the horizon.
+    op.execute('INSERT INTO dbutilizationrefresh (id, refreshed_at) VALUES (1, now())')
+
+
+def downgrade() -> None:
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_table('dbutilizationrefresh')
+    op.drop_table('dbutilization')
+    op.drop_index(op.f('ix_dbreservationutilization_reservation_id'), table_name='dbreservationutilization')
+    op.drop_table('dbreservationutilization')
+    # ### end Alembic commands ###
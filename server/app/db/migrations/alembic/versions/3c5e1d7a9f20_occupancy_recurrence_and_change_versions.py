@@ -0,0 +1,183 @@
+"""Occupancy, recurrence and change versions
+
+Revision ID: 3c5e1d7a9f20
+Revises: bf8a1f9a08ad
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c5e1d7a9f20'
+down_revision: Union[str, None] = 'bf8a1f9a08ad'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BUMP_CHANGE_VERSION = """
+CREATE OR REPLACE FUNCTION bump_change_version() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO dbchangeversion (table_name, version, changed_at)
+    VALUES (TG_TABLE_NAME, 1, now())
+    ON CONFLICT (table_name) DO UPDATE
+    SET version = dbchangeversion.version + 1, changed_at = now();
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+BUMP_RESOURCE_VERSIONS = """
+CREATE OR REPLACE FUNCTION bump_resource_versions(resource_ids integer[])
+RETURNS void AS $$
+BEGIN
+    INSERT INTO dbresourceversion (resource_id, version, changed_at)
+    SELECT DISTINCT id, 1, now() FROM unnest(resource_ids) AS id
+    WHERE id IS NOT NULL
+    ORDER BY id
+    ON CONFLICT (resource_id) DO UPDATE
+    SET version = dbresourceversion.version + 1, changed_at = now();
+END
+$$ LANGUAGE plpgsql
+"""
+
+BUMP_RESERVATION_RESOURCE_VERSIONS = """
+CREATE OR REPLACE FUNCTION bump_reservation_resource_versions()
+RETURNS trigger AS $$
+DECLARE
+    resource_ids integer[] := '{}';
+    reservation_ids integer[] := '{}';
+BEGIN
+    IF TG_TABLE_NAME = 'dbreservationresource' THEN
+        IF TG_OP <> 'INSERT' THEN
+            resource_ids := resource_ids || OLD.resource_id;
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            resource_ids := resource_ids || NEW.resource_id;
+        END IF;
+    ELSE
+        IF TG_TABLE_NAME = 'dbreservation' THEN
+            reservation_ids := ARRAY[NEW.id];
+        ELSE
+            IF TG_OP <> 'INSERT' THEN
+                reservation_ids := reservation_ids || OLD.reservation_id;
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                reservation_ids := reservation_ids || NEW.reservation_id;
+            END IF;
+        END IF;
+        resource_ids := ARRAY(
+            SELECT resource_id FROM dbreservationresource
+            WHERE reservation_id = ANY(reservation_ids)
+        );
+    END IF;
+    PERFORM bump_resource_versions(resource_ids);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+CHANGE_VERSION_TABLES = ['dborg', 'dbcollection', 'dbgroup', 'dbresource', 'dbresourcetype']
+
+RESOURCE_VERSION_TRIGGERS = {
+    'dbreservation': 'UPDATE',
+    'dbreservationtime': 'INSERT OR UPDATE OR DELETE',
+    'dbreservationresource': 'INSERT OR UPDATE OR DELETE',
+}
+
+# Occupancy of the existing one-off reservations. Reservations that were
+# already double booked keep the rows of the first one only, the others
+# are reported as conflicting the next time they are edited.
+BACKFILL_OCCUPANCY = """
+INSERT INTO dbresourceoccupancy (resource_id, reservation_id, reservation_time_id, during)
+SELECT DISTINCT rr.resource_id, t.reservation_id, t.id, tstzrange(t.start, t."end", '[)')
+FROM dbreservationtime AS t
+JOIN dbreservationresource AS rr ON rr.reservation_id = t.reservation_id
+JOIN dbreservation AS r ON r.id = t.reservation_id
+WHERE t.active AND rr.active AND r.active AND t.start < t."end"
+ORDER BY t.reservation_id, t.id, rr.resource_id
+ON CONFLICT DO NOTHING
+"""
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('dbchangeversion',
+    sa.Column('table_name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    op.create_table('dbresourceversion',
+    sa.Column('resource_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('resource_id')
+    )
+    op.create_table('dbresourceoccupancy',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('resource_id', sa.Integer(), nullable=False),
+    sa.Column('reservation_id', sa.Integer(), nullable=False),
+    sa.Column('reservation_time_id', sa.Integer(), nullable=False),
+    sa.Column('during', postgresql.TSTZRANGE(), nullable=False),
+    postgresql.ExcludeConstraint((sa.column('resource_id'), '='), (sa.column('during'), '&&'), (sa.column('reservation_id'), '<>'), using='gist', name='ex_dbresourceoccupancy_resource_id_during'),
+    sa.ForeignKeyConstraint(['reservation_id'], ['dbreservation.id'], ),
+    sa.ForeignKeyConstraint(['reservation_time_id'], ['dbreservationtime.id'], ),
+    sa.ForeignKeyConstraint(['resource_id'], ['dbresource.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_dbresourceoccupancy_reservation_id'), 'dbresourceoccupancy', ['reservation_id'], unique=False)
+    op.add_column('dbreservation', sa.Column('recurrence_frequency', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+    op.add_column('dbreservation', sa.Column('recurrence_interval', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('dbreservation', sa.Column('recurrence_until', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('dbreservation', sa.Column('recurrence_exceptions', postgresql.ARRAY(sa.Date()), server_default='{}', nullable=False))
+    op.create_index('ix_dbreservationtime_start_end', 'dbreservationtime', ['start', 'end'], unique=False)
+    # ### end Alembic commands ###
+
+    op.execute(BACKFILL_OCCUPANCY)
+
+    op.execute(BUMP_CHANGE_VERSION)
+    for table in CHANGE_VERSION_TABLES:
+        op.execute(
+            f'CREATE TRIGGER {table}_change_version '
+            f'AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table} '
+            'FOR EACH STATEMENT EXECUTE FUNCTION bump_change_version()'
+        )
+
+    op.execute(BUMP_RESOURCE_VERSIONS)
+    op.execute(BUMP_RESERVATION_RESOURCE_VERSIONS)
+    for table, events in RESOURCE_VERSION_TRIGGERS.items():
+        op.execute(
+            f'CREATE TRIGGER {table}_resource_versions '
+            f'AFTER {events} ON {table} '
+            'FOR EACH ROW EXECUTE FUNCTION bump_reservation_resource_versions()'
+        )
+
+
+def downgrade() -> None:
+    for table in RESOURCE_VERSION_TRIGGERS:
+        op.execute(f'DROP TRIGGER {table}_resource_versions ON {table}')
+    op.execute('DROP FUNCTION bump_reservation_resource_versions()')
+    op.execute('DROP FUNCTION bump_resource_versions(integer[])')
+    for table in CHANGE_VERSION_TABLES:
+        op.execute(f'DROP TRIGGER {table}_change_version ON {table}')
+    op.execute('DROP FUNCTION bump_change_version()')
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_index('ix_dbreservationtime_start_end', table_name='dbreservationtime')
+    op.drop_column('dbreservation', 'recurrence_exceptions')
+    op.drop_column('dbreservation', 'recurrence_until')
+    op.drop_column('dbreservation', 'recurrence_interval')
+    op.drop_column('dbreservation', 'recurrence_frequency')
+    op.drop_index(op.f('ix_dbresourceoccupancy_reservation_id'), table_name='dbresourceoccupancy')
+    op.drop_table('dbresourceoccupancy')
+    op.drop_table('dbresourceversion')
+    op.drop_table('dbchangeversion')
+    # ### end Alembic commands ###
@@ -9,6 +9,7 @@ from typing import Sequence, Union
 
 from alembic import op
 import sqlalchemy as sa
+import sqlmodel
 
 
 # revision identifiers, used by Alembic.
@@ -20,63 +21,126 @@ depends_on: Union[str, Sequence[str], None] = None
 
 def upgrade() -> None:
     # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_index('ix_dbuser_username', table_name='dbuser')
-    op.drop_table('dbuser')
-    op.drop_index('ix_dbcollection_name', table_name='dbcollection')
-    op.drop_table('dbcollection')
-    op.drop_index('ix_dborg_name', table_name='dborg')
-    op.drop_table('dborg')
-    op.drop_index('ix_dbresource_name', table_name='dbresource')
-    op.drop_table('dbresource')
-    op.drop_index('ix_dbgroup_name', table_name='dbgroup')
-    op.drop_table('dbgroup')
-    # ### end Alembic commands ###
-
-
-def downgrade() -> None:
-    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('dbcollection',
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('active', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_dbcollection_name'), 'dbcollection', ['name'], unique=False)
+    op.create_table('dborg',
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('active', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_dborg_name'), 'dborg', ['name'], unique=False)
+    op.create_table('dbresourcetype',
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('active', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_dbresourcetype_name'), 'dbresourcetype', ['name'], unique=False)
     op.create_table('dbgroup',
-    sa.Column('name', sa.VARCHAR(), autoincrement=False, nullable=False),
-    sa.Column('id', sa.INTEGER(), server_default=sa.text("nextval('dbgroup_id_seq'::regclass)"), autoincrement=True, nullable=False),
-    sa.Column('collection_id', sa.INTEGER(), autoincrement=False, nullable=True),
-    sa.Column('active', sa.BOOLEAN(), autoincrement=False, nullable=False),
-    sa.ForeignKeyConstraint(['collection_id'], ['dbcollection.id'], name='dbgroup_collection_id_fkey'),
-    sa.PrimaryKeyConstraint('id', name='dbgroup_pkey'),
-    postgresql_ignore_search_path=False
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('collection_id', sa.Integer(), nullable=True),
+    sa.Column('active', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['collection_id'], ['dbcollection.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_dbgroup_name'), 'dbgroup', ['name'], unique=False)
+    op.create_table('dbuser',
+    sa.Column('username', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('hash', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('active', sa.Boolean(), nullable=False),
+    sa.Column('org_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['org_id'], ['dborg.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_dbuser_username'), 'dbuser', ['username'], unique=False)
+    op.create_table('dbreservation',
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('contact_info', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('description', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('active', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['dbuser.id'], ),
+    sa.PrimaryKeyConstraint('id')
     )
-    op.create_index('ix_dbgroup_name', 'dbgroup', ['name'], unique=False)
     op.create_table('dbresource',
-    sa.Column('name', sa.VARCHAR(), autoincrement=False, nullable=False),
-    sa.Column('id', sa.INTEGER(), autoincrement=True, nullable=False),
-    sa.Column('group_id', sa.INTEGER(), autoincrement=False, nullable=True),
-    sa.Column('active', sa.BOOLEAN(), autoincrement=False, nullable=False),
-    sa.ForeignKeyConstraint(['group_id'], ['dbgroup.id'], name='dbresource_group_id_fkey'),
-    sa.PrimaryKeyConstraint('id', name='dbresource_pkey')
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('group_id', sa.Integer(), nullable=True),
+    sa.Column('resource_type_id', sa.Integer(), nullable=True),
+    sa.Column('active', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['group_id'], ['dbgroup.id'], ),
+    sa.ForeignKeyConstraint(['resource_type_id'], ['dbresourcetype.id'], ),
+    sa.PrimaryKeyConstraint('id')
     )
-    op.create_index('ix_dbresource_name', 'dbresource', ['name'], unique=False)
-    op.create_table('dborg',
-    sa.Column('name', sa.VARCHAR(), autoincrement=False, nullable=False),
-    sa.Column('id', sa.INTEGER(), server_default=sa.text("nextval('dborg_id_seq'::regclass)"), autoincrement=True, nullable=False),
-    sa.Column('active', sa.BOOLEAN(), autoincrement=False, nullable=False),
-    sa.PrimaryKeyConstraint('id', name='dborg_pkey'),
-    postgresql_ignore_search_path=False
+    op.create_index(op.f('ix_dbresource_name'), 'dbresource', ['name'], unique=False)
+    op.create_table('dbreservationinfo',
+    sa.Column('reservation_id', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('reserver', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('contact', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('participants', sa.Integer(), nullable=True),
+    sa.Column('description', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('notes', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('active', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['reservation_id'], ['dbreservation.id'], ),
+    sa.PrimaryKeyConstraint('id')
     )
-    op.create_index('ix_dborg_name', 'dborg', ['name'], unique=False)
-    op.create_table('dbcollection',
-    sa.Column('name', sa.VARCHAR(), autoincrement=False, nullable=False),
-    sa.Column('id', sa.INTEGER(), autoincrement=True, nullable=False),
-    sa.Column('active', sa.BOOLEAN(), autoincrement=False, nullable=False),
-    sa.PrimaryKeyConstraint('id', name='dbcollection_pkey')
+    op.create_index(op.f('ix_dbreservationinfo_reservation_id'), 'dbreservationinfo', ['reservation_id'], unique=False)
+    op.create_index(op.f('ix_dbreservationinfo_reserver'), 'dbreservationinfo', ['reserver'], unique=False)
+    op.create_table('dbreservationresource',
+    sa.Column('reservation_id', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('resource_id', sa.Integer(), nullable=False),
+    sa.Column('active', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['reservation_id'], ['dbreservation.id'], ),
+    sa.ForeignKeyConstraint(['resource_id'], ['dbresource.id'], ),
+    sa.PrimaryKeyConstraint('id')
     )
-    op.create_index('ix_dbcollection_name', 'dbcollection', ['name'], unique=False)
-    op.create_table('dbuser',
-    sa.Column('username', sa.VARCHAR(), autoincrement=False, nullable=False),
-    sa.Column('id', sa.INTEGER(), autoincrement=True, nullable=False),
-    sa.Column('hash', sa.VARCHAR(), autoincrement=False, nullable=False),
-    sa.Column('active', sa.BOOLEAN(), autoincrement=False, nullable=False),
-    sa.Column('org_id', sa.INTEGER(), autoincrement=False, nullable=True),
-    sa.ForeignKeyConstraint(['org_id'], ['dborg.id'], name='dbuser_org_id_fkey'),
-    sa.PrimaryKeyConstraint('id', name='dbuser_pkey')
+    op.create_index(op.f('ix_dbreservationresource_reservation_id'), 'dbreservationresource', ['reservation_id'], unique=False)
+    op.create_index(op.f('ix_dbreservationresource_resource_id'), 'dbreservationresource', ['resource_id'], unique=False)
+    op.create_table('dbreservationtime',
+    sa.Column('reservation_id', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('start', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('end', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('active', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['reservation_id'], ['dbreservation.id'], ),
+    sa.PrimaryKeyConstraint('id')
     )
-    op.create_index('ix_dbuser_username', 'dbuser', ['username'], unique=False)
+    op.create_index(op.f('ix_dbreservationtime_reservation_id'), 'dbreservationtime', ['reservation_id'], unique=False)
+    # ### end Alembic commands ###
+
+
+def downgrade() -> None:
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_index(op.f('ix_dbreservationtime_reservation_id'), table_name='dbreservationtime')
+    op.drop_table('dbreservationtime')
+    op.drop_index(op.f('ix_dbreservationresource_resource_id'), table_name='dbreservationresource')
+    op.drop_index(op.f('ix_dbreservationresource_reservation_id'), table_name='dbreservationresource')
+    op.drop_table('dbreservationresource')
+    op.drop_index(op.f('ix_dbreservationinfo_reserver'), table_name='dbreservationinfo')
+    op.drop_index(op.f('ix_dbreservationinfo_reservation_id'), table_name='dbreservationinfo')
+    op.drop_table('dbreservationinfo')
+    op.drop_index(op.f('ix_dbresource_name'), table_name='dbresource')
+    op.drop_table('dbresource')
+    op.drop_table('dbreservation')
+    op.drop_index(op.f('ix_dbuser_username'), table_name='dbuser')
+    op.drop_table('dbuser')
+    op.drop_index(op.f('ix_dbgroup_name'), table_name='dbgroup')
+    op.drop_table('dbgroup')
+    op.drop_index(op.f('ix_dbresourcetype_name'), table_name='dbresourcetype')
+    op.drop_table('dbresourcetype')
+    op.drop_index(op.f('ix_dborg_name'), table_name='dborg')
+    op.drop_table('dborg')
+    op.drop_index(op.f('ix_dbcollection_name'), table_name='dbcollection')
+    op.drop_table('dbcollection')
     # ### end Alembic commands ###
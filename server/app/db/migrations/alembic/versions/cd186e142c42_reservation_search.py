@@ -0,0 +1,47 @@
+"""Reservation search
+
+Revision ID: cd186e142c42
+Revises: 8e4b2f6c1a57
+Create Date: 2026-10-18 10:22:53.718143
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'cd186e142c42'
+down_revision: Union[str, None] = '8e4b2f6c1a57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Generated from the name, description and contact info in the Finnish,
+# Swedish and simple configurations.
+SEARCH = (
+    "setweight(to_tsvector('finnish'::regconfig, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('swedish'::regconfig, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('finnish'::regconfig, coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('swedish'::regconfig, coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('finnish'::regconfig, coalesce(contact_info, '')), 'C') || "
+    "setweight(to_tsvector('swedish'::regconfig, coalesce(contact_info, '')), 'C') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(contact_info, '')), 'C')"
+)
+
+
+def upgrade() -> None:
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.add_column('dbreservation', sa.Column('search', postgresql.TSVECTOR(), sa.Computed(SEARCH, persisted=True), nullable=True))
+    op.create_index('ix_dbreservation_search', 'dbreservation', ['search'], unique=False, postgresql_using='gin')
+    # ### end Alembic commands ###
+
+
+def downgrade() -> None:
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_index('ix_dbreservation_search', table_name='dbreservation', postgresql_using='gin')
+    op.drop_column('dbreservation', 'search')
+    # ### end Alembic commands ###
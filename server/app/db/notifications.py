@@ -0,0 +1,194 @@
+import asyncio
+import json
+import logging
+from typing import Iterable, Optional
+
+import asyncpg
+from sqlmodel import select
+from sqlalchemy import Integer, Text, cast, func, literal, or_, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import settings
+from app.models.models import DBGroup, DBReservationResource, DBResource
+
+logger = logging.getLogger(__name__)
+
+# Changes to reservations are announced on this channel by the write
+# handlers, and fanned out to the WebSocket subscribers of every worker.
+CHANNEL = "sitsit_reservations"
+
+# Sent to subscribers that may have missed changes, after the listening
+# connection was lost or when they fell behind. They have to refetch.
+RESYNC = json.dumps({"event": "resync"})
+
+type Topic = tuple[str, int]
+
+
+async def notify_reservation_change(
+    session: AsyncSession, reservation_id: int, resource_ids: Iterable[int] = ()
+):
+    """Announce a change to a reservation to the subscribers of its resources
+    and of their collections.
+
+    Resources the reservation ever held are included, so that removing a
+    resource is announced too, as are the given resource_ids, which it held
+    before the change. Like any NOTIFY, it is only delivered if the
+    transaction commits.
+    """
+    resources = (
+        select(DBResource.id, DBGroup.collection_id)
+        .outerjoin(DBGroup, DBGroup.id == DBResource.group_id)
+        .where(
+            or_(
+                DBResource.id.in_(
+                    select(DBReservationResource.resource_id).where(
+                        DBReservationResource.reservation_id == reservation_id
+                    )
+                ),
+                DBResource.id.in_(list(resource_ids)),
+            )
+        )
+        .subquery()
+    )
+    payload = func.json_build_object(
+        "event",
+        "reservation",
+        "reservation_id",
+        cast(literal(reservation_id), Integer),
+        "resource_ids",
+        func.coalesce(func.json_agg(resources.c.id.distinct()), text("'[]'::json")),
+        "collection_ids",
+        func.coalesce(
+            func.json_agg(resources.c.collection_id.distinct()).filter(
+                resources.c.collection_id.is_not(None)
+            ),
+            text("'[]'::json"),
+        ),
+    )
+    await session.execute(
+        select(func.pg_notify(CHANNEL, cast(payload, Text))).select_from(resources)
+    )
+
+
+class Subscriber:
+    """Events waiting to be sent to one client, and the topics it follows."""
+
+    def __init__(self, queue_size: int):
+        self.topics: set[Topic] = set()
+        self.queue: asyncio.Queue[str] = asyncio.Queue(queue_size)
+
+    def send(self, message: str):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # The client fell behind, the events it has yet to receive are
+            # replaced by a request to refetch.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+class ChangeListener:
+    """Fans the change notifications out to the subscribers of this worker.
+
+    A single connection per worker listens on the channel, outside of the
+    pool, and every notification is sent once to each subscriber of any of
+    its resources or collections. The connection is opened again when it is
+    lost, after which every subscriber is asked to resync.
+    """
+
+    def __init__(self, url: str, queue_size: int = 100, retry_seconds: float = 5.0):
+        self.dsn = make_url(url).set(drivername="postgresql")
+        self.queue_size = queue_size
+        self.retry_seconds = retry_seconds
+        self._subscribers: dict[Topic, set[Subscriber]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def subscriber(self) -> Subscriber:
+        return Subscriber(self.queue_size)
+
+    def subscribe(self, subscriber: Subscriber, topics: Iterable[Topic]):
+        for topic in topics:
+            subscriber.topics.add(topic)
+            self._subscribers.setdefault(topic, set()).add(subscriber)
+
+    def unsubscribe(
+        self, subscriber: Subscriber, topics: Optional[Iterable[Topic]] = None
+    ):
+        """Stop sending the given topics to the subscriber, all when None."""
+        for topic in set(subscriber.topics if topics is None else topics):
+            subscriber.topics.discard(topic)
+            subscribers = self._subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[topic]
+
+    def subscriber_count(self) -> int:
+        return len(set().union(*self._subscribers.values()))
+
+    def _receive(self, connection, pid: int, channel: str, payload: str):
+        try:
+            change = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignored malformed notification %r", payload)
+            return
+
+        topics = [("resource", id) for id in change.get("resource_ids", ())]
+        topics += [("collection", id) for id in change.get("collection_ids", ())]
+        recipients = set().union(
+            *(self._subscribers.get(topic, ()) for topic in topics)
+        )
+        for subscriber in recipients:
+            subscriber.send(payload)
+
+    def _resync(self):
+        for subscriber in set().union(*self._subscribers.values()):
+            subscriber.send(RESYNC)
+
+    async def _run(self):
+        connected_before = False
+        while True:
+            try:
+                connection = await asyncpg.connect(
+                    self.dsn.render_as_string(hide_password=False)
+                )
+            except (OSError, asyncpg.PostgresError) as error:
+                logger.warning("Could not listen for changes: %s", error)
+                await asyncio.sleep(self.retry_seconds)
+                continue
+
+            lost = asyncio.Event()
+            connection.add_termination_listener(lambda _: lost.set())
+            try:
+                await connection.add_listener(CHANNEL, self._receive)
+                if connected_before:
+                    self._resync()
+                connected_before = True
+                await lost.wait()
+            except (OSError, asyncpg.PostgresError) as error:
+                logger.warning("Stopped listening for changes: %s", error)
+            finally:
+                if not connection.is_closed():
+                    await connection.close()
+
+            logger.warning("Lost the connection listening for changes")
+            await asyncio.sleep(self.retry_seconds)
+
+
+listener = ChangeListener(
+    settings.sqlalchemy_database_url,
+    settings.live_queue_size,
+    settings.live_retry_seconds,
+)
@@ -0,0 +1,238 @@
+from bisect import bisect_left
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from sqlmodel import select
+from sqlalchemy import case, delete, func, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.availability import RECURRENCE_COLUMNS, merge_intervals, reservation_blocks
+from app.db.recurrence import Recurrence, occurrences, series_end
+from app.models.models import (
+    DBReservation,
+    DBReservationResource,
+    DBReservationTime,
+    DBResourceOccupancy,
+)
+
+EXCLUSION_VIOLATION = "23P01"
+
+# First key of the advisory locks taken per resource while checking
+# recurring reservations, to keep them apart from other advisory locks.
+OCCUPANCY_LOCK_SPACE = 7001
+
+
+class Conflict(NamedTuple):
+    reservation_id: int
+    reservation_name: str
+    resource_id: int
+    start: datetime
+    end: datetime
+
+
+class ReservationConflict(Exception):
+    """Raised when a reservation would overlap another one on a resource."""
+
+    def __init__(self, conflicts: list[Conflict]):
+        super().__init__("Resource is already reserved for the requested time")
+        self.conflicts = conflicts
+
+
+def _occupancy_source(reservation_id: int):
+    return (
+        select(
+            DBReservationResource.resource_id,
+            DBReservationTime.reservation_id,
+            DBReservationTime.id,
+            func.tstzrange(DBReservationTime.start, DBReservationTime.end, "[)"),
+        )
+        .join(
+            DBReservationResource,
+            DBReservationResource.reservation_id == DBReservationTime.reservation_id,
+        )
+        .join(DBReservation, DBReservation.id == DBReservationTime.reservation_id)
+        .where(DBReservationTime.reservation_id == reservation_id)
+        .where(DBReservationTime.active)
+        .where(DBReservationResource.active)
+        .where(DBReservation.active)
+        .where(DBReservation.recurrence_frequency.is_(None))
+        .where(DBReservationTime.start < DBReservationTime.end)
+        .distinct()
+    )
+
+
+async def find_conflicts(session: AsyncSession, reservation_id: int) -> list[Conflict]:
+    """Occupancy of other reservations overlapping the given reservation."""
+    candidate = _occupancy_source(reservation_id).subquery()
+    resource_id, _, _, during = candidate.c
+    query = (
+        select(
+            DBResourceOccupancy.reservation_id,
+            DBReservation.name,
+            DBResourceOccupancy.resource_id,
+            func.lower(DBResourceOccupancy.during),
+            func.upper(DBResourceOccupancy.during),
+        )
+        .join(DBReservation, DBReservation.id == DBResourceOccupancy.reservation_id)
+        .join(
+            candidate,
+            (resource_id == DBResourceOccupancy.resource_id)
+            & DBResourceOccupancy.during.op("&&")(during),
+        )
+        .where(DBResourceOccupancy.reservation_id != reservation_id)
+        .distinct()
+        .order_by(func.lower(DBResourceOccupancy.during))
+    )
+    result = await session.execute(query)
+
+    return [Conflict(*row) for row in result.all()]
+
+
+async def latest_booking_end(
+    session: AsyncSession, resource_ids: list[int], reservation_id: int
+) -> Optional[datetime]:
+    """End of the last time other reservations hold one of the resources for,
+    up to the end of their series. Series without an end date are left out,
+    they are checked up to the horizon."""
+    last_end = case(
+        (DBReservation.recurrence_frequency.is_(None), DBReservationTime.end),
+        else_=DBReservation.recurrence_until
+        + (DBReservationTime.end - DBReservationTime.start),
+    )
+    return await session.scalar(
+        select(func.max(last_end))
+        .select_from(DBReservationTime)
+        .join(DBReservation, DBReservation.id == DBReservationTime.reservation_id)
+        .join(
+            DBReservationResource,
+            DBReservationResource.reservation_id == DBReservationTime.reservation_id,
+        )
+        .where(DBReservationResource.resource_id.in_(resource_ids))
+        .where(DBReservationTime.reservation_id != reservation_id)
+        .where(DBReservationTime.active)
+        .where(DBReservationResource.active)
+        .where(DBReservation.active)
+    )
+
+
+async def find_recurring_conflicts(
+    session: AsyncSession, reservation_id: int
+) -> list[Conflict]:
+    """Overlaps with or between recurring reservations.
+
+    Recurring series are not materialized into occupancy rows, so the
+    exclusion constraint cannot see them. Their occurrences are expanded
+    within the span of the reservation instead, while holding an advisory
+    lock per resource so that concurrent checks on a resource run one at a
+    time.
+    """
+    resource_ids = sorted(
+        await session.scalars(
+            select(DBReservationResource.resource_id)
+            .where(DBReservationResource.reservation_id == reservation_id)
+            .where(DBReservationResource.active)
+            .distinct()
+        )
+    )
+    result = await session.execute(
+        select(DBReservationTime.start, DBReservationTime.end, *RECURRENCE_COLUMNS)
+        .join(DBReservation, DBReservation.id == DBReservationTime.reservation_id)
+        .where(DBReservationTime.reservation_id == reservation_id)
+        .where(DBReservationTime.active)
+        .where(DBReservation.active)
+        .where(DBReservationTime.start < DBReservationTime.end)
+    )
+    times = [(start, end, Recurrence.of(*rule)) for start, end, *rule in result.all()]
+    if not resource_ids or not times:
+        return []
+
+    for resource_id in resource_ids:
+        await session.execute(
+            select(func.pg_advisory_xact_lock(OCCUPANCY_LOCK_SPACE, resource_id))
+        )
+
+    window_start = min(start for start, _, _ in times)
+    window_end = max(
+        series_end(start, recurrence) + (end - start)
+        for start, end, recurrence in times
+    )
+    if any(
+        recurrence is not None and recurrence.until is None
+        for _, _, recurrence in times
+    ):
+        # An open ended series runs past the horizon, into any booking made
+        # further ahead on its resources.
+        latest = await latest_booking_end(session, resource_ids, reservation_id)
+        if latest is not None:
+            window_end = max(window_end, latest)
+    own = merge_intervals(
+        (
+            occurrence
+            for start, end, recurrence in times
+            for occurrence in occurrences(
+                start, end, recurrence, window_start, window_end
+            )
+        ),
+        window_start,
+        window_end,
+    )
+    own_starts = [start for start, _ in own]
+
+    conflicts = []
+    for block in await reservation_blocks(
+        session, resource_ids, window_start, window_end
+    ):
+        if block.reservation_id == reservation_id:
+            continue
+        index = bisect_left(own_starts, block.end) - 1
+        if index >= 0 and own[index][1] > block.start:
+            conflicts.append(
+                Conflict(
+                    block.reservation_id,
+                    block.reservation_name,
+                    block.resource_id,
+                    block.start,
+                    block.end,
+                )
+            )
+
+    return conflicts
+
+
+async def sync_reservation_occupancy(session: AsyncSession, reservation_id: int):
+    """Rebuild the occupancy rows of a reservation from its times and resources.
+
+    Must run in the same transaction as the write that changed the
+    reservation. Raises ReservationConflict if another reservation already
+    holds one of the resources for an overlapping time.
+    """
+    # Serialize concurrent writers of the same reservation so that a time
+    # and a resource added in parallel cannot both miss their pairing.
+    await session.execute(
+        select(DBReservation.id)
+        .where(DBReservation.id == reservation_id)
+        .with_for_update()
+    )
+    await session.execute(
+        delete(DBResourceOccupancy).where(
+            DBResourceOccupancy.reservation_id == reservation_id
+        )
+    )
+
+    try:
+        async with session.begin_nested():
+            await session.execute(
+                insert(DBResourceOccupancy).from_select(
+                    ["resource_id", "reservation_id", "reservation_time_id", "during"],
+                    _occupancy_source(reservation_id),
+                )
+            )
+    except IntegrityError as error:
+        if getattr(error.orig, "pgcode", None) != EXCLUSION_VIOLATION:
+            raise
+        raise ReservationConflict(await find_conflicts(session, reservation_id))
+
+    conflicts = await find_recurring_conflicts(session, reservation_id)
+    if conflicts:
+        raise ReservationConflict(conflicts)
@@ -0,0 +1,92 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Iterator, NamedTuple, Optional
+from zoneinfo import ZoneInfo
+
+from app.models.models import RecurrenceFrequency
+
+# Recurring reservations repeat on the wall clock of the venue, so a weekly
+# 18:00 booking stays at 18:00 across daylight saving changes.
+CALENDAR_TIMEZONE = ZoneInfo("Europe/Helsinki")
+
+# How far ahead series without an end date are checked for conflicts.
+RECURRENCE_HORIZON = timedelta(days=366)
+
+
+STEP_DAYS = {RecurrenceFrequency.daily: 1, RecurrenceFrequency.weekly: 7}
+
+
+class Recurrence(NamedTuple):
+    frequency: RecurrenceFrequency
+    interval: int
+    until: Optional[datetime]
+    exceptions: frozenset[date]
+
+    @classmethod
+    def of(
+        cls,
+        frequency: Optional[str],
+        interval: Optional[int],
+        until: Optional[datetime],
+        exceptions: Optional[Iterable[date]],
+    ) -> Optional["Recurrence"]:
+        if frequency is None:
+            return None
+
+        return cls(
+            RecurrenceFrequency(frequency),
+            max(interval or 1, 1),
+            until,
+            frozenset(exceptions or ()),
+        )
+
+    @property
+    def step(self) -> timedelta:
+        return timedelta(days=STEP_DAYS[self.frequency] * self.interval)
+
+
+def occurrences(
+    start: datetime,
+    end: datetime,
+    recurrence: Optional[Recurrence],
+    window_start: datetime,
+    window_end: datetime,
+) -> Iterator[tuple[datetime, datetime]]:
+    """Occurrences of the time [start, end) that overlap [window_start, window_end).
+
+    Only the occurrences inside the window are generated, so the cost does
+    not depend on how long the series runs.
+    """
+    if recurrence is None:
+        if start < window_end and end > window_start:
+            yield start, end
+        return
+
+    duration = end - start
+    local_start = start.astimezone(CALENDAR_TIMEZONE)
+
+    # Skip whole steps that end before the window. Daylight saving can move
+    # an occurrence by an hour, so start one step early to be safe.
+    index = max(0, (window_start - end) // recurrence.step - 1)
+    while True:
+        local = local_start + index * recurrence.step
+        occurrence_start = local.astimezone(timezone.utc)
+        if occurrence_start >= window_end:
+            return
+        if recurrence.until is not None and occurrence_start > recurrence.until:
+            return
+
+        occurrence_end = occurrence_start + duration
+        if occurrence_end > window_start and local.date() not in recurrence.exceptions:
+            yield occurrence_start, occurrence_end
+
+        index += 1
+
+
+def series_end(start: datetime, recurrence: Optional[Recurrence]) -> datetime:
+    """Start of the last occurrence that is considered for conflicts."""
+    if recurrence is None:
+        return start
+    if recurrence.until is not None:
+        return recurrence.until
+
+    return max(start, datetime.now(timezone.utc)) + RECURRENCE_HORIZON
@@ -0,0 +1,67 @@
+from sqlmodel import select
+from sqlalchemy import Float, func, literal
+
+from app.models.models import (
+    SEARCH_CONFIGS,
+    DBCollection,
+    DBGroup,
+    DBOrg,
+    DBReservation,
+    DBResource,
+    DBUser,
+    TypeaheadKind,
+)
+
+
+def reservation_search(q: str) -> tuple:
+    """Condition matching the reservations found by a web search style
+    query, and the relevance of each match.
+
+    The query is parsed in every configuration the reservations are indexed
+    in, a reservation matches when it matches in any of them. Served by the
+    GIN index on the generated search column.
+    """
+    search = DBReservation.__table__.c.search
+    text = literal(q)
+    query = func.websearch_to_tsquery(SEARCH_CONFIGS[0], text)
+    for config in SEARCH_CONFIGS[1:]:
+        query = query.op("||")(func.websearch_to_tsquery(config, text))
+
+    return search.op("@@")(query), func.ts_rank_cd(search, query, type_=Float)
+
+
+TYPEAHEAD_COLUMNS = {
+    TypeaheadKind.user: DBUser.username,
+    TypeaheadKind.org: DBOrg.name,
+    TypeaheadKind.resource: DBResource.name,
+    TypeaheadKind.group: DBGroup.name,
+    TypeaheadKind.collection: DBCollection.name,
+}
+
+# Shortest q holding a trigram the index can look up.
+TYPEAHEAD_MIN_LENGTH = 3
+
+
+def typeahead(kind: TypeaheadKind, q: str, limit: int):
+    """Active rows of a kind whose name contains q, names starting with it
+    first, then the ones most similar to it.
+
+    The substring match is served by the trigram index of the name, which
+    needs q to hold a whole trigram, so q must be at least
+    TYPEAHEAD_MIN_LENGTH characters long. Shorter queries would scan and
+    sort nearly every active row.
+    """
+    name = TYPEAHEAD_COLUMNS[kind]
+    model = name.class_
+    return (
+        select(model.id, name.label("name"))
+        .where(model.active)
+        .where(name.icontains(q, autoescape=True))
+        .order_by(
+            name.istartswith(q, autoescape=True).desc(),
+            func.word_similarity(q, name).desc(),
+            name,
+            model.id,
+        )
+        .limit(limit)
+    )
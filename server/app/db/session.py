@@ -1,15 +1,43 @@
 from typing import Annotated
 
-from fastapi import Depends
+from fastapi import Depends, Request
 from sqlmodel import Session
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from app.db.database import engine
+from app.db.database import engine, replica_engine
+
+# Set on clients that just wrote, to keep their reads on the primary.
+PRIMARY_COOKIE = "sitsit_primary"
+
+# Objects keep their loaded state after commit, so handlers can return
+# them without reading them back.
+session_factory = async_sessionmaker(
+    engine, class_=AsyncSession, expire_on_commit=False
+)
+replica_session_factory = async_sessionmaker(
+    replica_engine, class_=AsyncSession, expire_on_commit=False
+)
 
 
 async def get_session():
-    async with AsyncSession(engine) as session:
+    async with session_factory() as session:
+        yield session
+
+
+def read_session_factory(request: Request) -> async_sessionmaker:
+    """Sessions for the reads of a request, on the replica when one is
+    configured, unless the client has just written."""
+    if PRIMARY_COOKIE in request.cookies:
+        return session_factory
+
+    return replica_session_factory
+
+
+async def get_replica_session(request: Request):
+    """Session for read only handlers, on the replica when one is configured."""
+    async with read_session_factory(request)() as session:
         yield session
 
 
 SessionDep = Annotated[Session, Depends(get_session)]
+ReplicaSessionDep = Annotated[Session, Depends(get_replica_session)]
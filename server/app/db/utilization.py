@@ -0,0 +1,391 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from sqlmodel import select
+from sqlalchemy import delete, func, insert, or_, text
+from sqlalchemy.dialects.postgresql import insert as upsert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.availability import RECURRENCE_COLUMNS, merge_intervals
+from app.db.recurrence import CALENDAR_TIMEZONE, Recurrence, occurrences, series_end
+from app.db.database import engine
+from app.db.session import session_factory
+from app.models.models import (
+    DBGroup,
+    DBReservation,
+    DBReservationResource,
+    DBReservationTime,
+    DBReservationUtilization,
+    DBResource,
+    DBUser,
+    DBUtilization,
+    DBUtilizationRefresh,
+    UtilizationDimension,
+)
+
+logger = logging.getLogger(__name__)
+
+HOUR = timedelta(hours=1)
+
+# (month, weekday, hour) in the calendar timezone.
+type Bucket = tuple[date, int, int]
+# (resource_id, org_id, month, weekday, hour), the unique key of DBUtilization.
+type Key = tuple[int, Optional[int], date, int, int]
+
+KEY_COLUMNS = ("resource_id", "org_id", "month", "weekday", "hour")
+
+# Advisory lock held by the process refreshing the open series.
+REFRESH_LOCK = 7_308_531_003
+
+# Seconds between checks whether the open series are due a refresh.
+REFRESH_CHECK_SECONDS = 3600
+
+
+def lock_order(key: Key) -> tuple:
+    resource_id, org_id, *bucket = key
+    return resource_id, org_id is not None, org_id or 0, *bucket
+
+
+def buckets(intervals: Iterable[tuple[datetime, datetime]]) -> Counter[Bucket]:
+    """Seconds of the intervals falling in each local month, weekday and hour.
+
+    The calendar timezone is a whole number of hours off UTC, so the hours
+    are cut on UTC hour boundaries.
+    """
+    seconds: Counter[Bucket] = Counter()
+    for start, end in intervals:
+        cursor = start.astimezone(timezone.utc)
+        while cursor < end:
+            slice_end = min(
+                end, cursor.replace(minute=0, second=0, microsecond=0) + HOUR
+            )
+            local = cursor.astimezone(CALENDAR_TIMEZONE)
+            bucket = (local.date().replace(day=1), local.weekday(), local.hour)
+            seconds[bucket] += round((slice_end - cursor).total_seconds())
+            cursor = slice_end
+
+    return seconds
+
+
+async def reservation_utilization(
+    session: AsyncSession, reservation_id: int
+) -> Counter[Key]:
+    """Seconds the reservation books each of its resources for, by bucket.
+
+    Overlapping times of the reservation are counted once. Series without
+    an end date are counted up to the horizon ahead of now, which
+    refresh_open_series keeps moving forward.
+    """
+    reservation = (
+        await session.execute(
+            select(DBUser.org_id, *RECURRENCE_COLUMNS)
+            .join(DBUser, DBUser.id == DBReservation.user_id)
+            .where(DBReservation.id == reservation_id)
+            .where(DBReservation.active)
+        )
+    ).one_or_none()
+    if reservation is None:
+        return Counter()
+
+    org_id, *rule = reservation
+    recurrence = Recurrence.of(*rule)
+    times = (
+        await session.execute(
+            select(DBReservationTime.start, DBReservationTime.end)
+            .where(DBReservationTime.reservation_id == reservation_id)
+            .where(DBReservationTime.active)
+            .where(DBReservationTime.start < DBReservationTime.end)
+        )
+    ).all()
+    resource_ids = (
+        await session.scalars(
+            select(DBReservationResource.resource_id)
+            .where(DBReservationResource.reservation_id == reservation_id)
+            .where(DBReservationResource.active)
+            .distinct()
+        )
+    ).all()
+    if not times or not resource_ids:
+        return Counter()
+
+    window_start = min(start for start, _ in times)
+    window_end = max(
+        series_end(start, recurrence) + (end - start) for start, end in times
+    )
+    booked = buckets(
+        merge_intervals(
+            (
+                occurrence
+                for start, end in times
+                for occurrence in occurrences(
+                    start, end, recurrence, window_start, window_end
+                )
+            ),
+            window_start,
+            window_end,
+        )
+    )
+
+    return Counter(
+        {
+            (resource_id, org_id, *bucket): seconds
+            for resource_id in resource_ids
+            for bucket, seconds in booked.items()
+        }
+    )
+
+
+async def sync_reservation_utilization(session: AsyncSession, reservation_id: int):
+    """Bring DBUtilization up to date with a change to a reservation.
+
+    The previous share of the reservation is replaced by its current one,
+    and only the difference is added to the rollup. Must run in the same
+    transaction as the write, after sync_reservation_occupancy, which locks
+    the reservation.
+    """
+    previous = await session.execute(
+        delete(DBReservationUtilization)
+        .where(DBReservationUtilization.reservation_id == reservation_id)
+        .returning(
+            *(getattr(DBReservationUtilization, column) for column in KEY_COLUMNS),
+            DBReservationUtilization.seconds,
+        )
+    )
+    current = await reservation_utilization(session, reservation_id)
+
+    changes = Counter(current)
+    for *key, seconds in previous:
+        changes[tuple(key)] -= seconds
+
+    if current:
+        await session.execute(
+            insert(DBReservationUtilization),
+            [
+                {"reservation_id": reservation_id, **dict(zip(KEY_COLUMNS, key))}
+                | {"seconds": seconds}
+                for key, seconds in current.items()
+            ],
+        )
+
+    # In key order, so that concurrent writers lock the buckets in the same
+    # order and cannot deadlock.
+    rows = [
+        dict(zip(KEY_COLUMNS, key)) | {"seconds": seconds}
+        for key, seconds in sorted(
+            changes.items(), key=lambda item: lock_order(item[0])
+        )
+        if seconds
+    ]
+    if rows:
+        statement = upsert(DBUtilization)
+        await session.execute(
+            statement.on_conflict_do_update(
+                constraint="uq_dbutilization_bucket",
+                set_={"seconds": DBUtilization.seconds + statement.excluded.seconds},
+            ),
+            rows,
+        )
+
+
+def utilization_filters(
+    start: Optional[date],
+    end: Optional[date],
+    resource_id: Optional[int],
+    org_id: Optional[int],
+    collection_id: Optional[int],
+) -> list:
+    """Conditions on DBUtilization for the months from start up to end, and
+    the given resource, organization or collection."""
+    conditions = []
+    if start is not None:
+        conditions.append(DBUtilization.month >= start.replace(day=1))
+    if end is not None:
+        conditions.append(DBUtilization.month < end)
+    if resource_id is not None:
+        conditions.append(DBUtilization.resource_id == resource_id)
+    if org_id is not None:
+        conditions.append(DBUtilization.org_id == org_id)
+    if collection_id is not None:
+        conditions.append(
+            DBUtilization.resource_id.in_(
+                select(DBResource.id)
+                .join(DBGroup, DBGroup.id == DBResource.group_id)
+                .where(DBGroup.collection_id == collection_id)
+            )
+        )
+
+    return conditions
+
+
+DIMENSION_COLUMNS = {
+    UtilizationDimension.resource: DBUtilization.resource_id,
+    UtilizationDimension.org: DBUtilization.org_id,
+    UtilizationDimension.month: DBUtilization.month,
+}
+
+
+def utilization_hours(dimensions: Iterable[UtilizationDimension], conditions: list):
+    columns = [DIMENSION_COLUMNS[dimension] for dimension in dict.fromkeys(dimensions)]
+    return (
+        select(*columns, (func.sum(DBUtilization.seconds) / 3600.0).label("hours"))
+        .where(*conditions)
+        .group_by(*columns)
+        .having(func.sum(DBUtilization.seconds) > 0)
+        .order_by(*columns)
+    )
+
+
+def utilization_heatmap(conditions: list):
+    return (
+        select(
+            DBUtilization.weekday,
+            DBUtilization.hour,
+            (func.sum(DBUtilization.seconds) / 3600.0).label("hours"),
+        )
+        .where(*conditions)
+        .group_by(DBUtilization.weekday, DBUtilization.hour)
+    )
+
+
+async def resync(session: AsyncSession, reservation_id: int):
+    """Count the reservation again in a transaction of its own, holding the
+    lock on it like a write would."""
+    await session.execute(
+        select(DBReservation.id)
+        .where(DBReservation.id == reservation_id)
+        .with_for_update()
+    )
+    await sync_reservation_utilization(session, reservation_id)
+    await session.commit()
+
+
+async def refresh_open_series() -> int:
+    """Count series without an end date up to the current horizon.
+
+    Each series is synced in its own transaction, holding the lock on the
+    reservation like a write would. Returns the number of series synced.
+    """
+    async with session_factory() as session:
+        reservation_ids = (
+            await session.scalars(
+                select(DBReservation.id)
+                .where(DBReservation.active)
+                .where(DBReservation.recurrence_frequency.is_not(None))
+                .where(DBReservation.recurrence_until.is_(None))
+                .order_by(DBReservation.id)
+            )
+        ).all()
+
+        for reservation_id in reservation_ids:
+            await resync(session, reservation_id)
+
+    return len(reservation_ids)
+
+
+async def refresh_if_due(interval: float) -> Optional[int]:
+    """Run refresh_open_series unless it ran within the last interval seconds
+    or another process is running it. Returns the number of series synced,
+    None when skipped.
+    """
+    async with engine.connect() as connection:
+        # A session level lock, so it is held across the transactions of
+        # the refresh. It is released before the connection goes back to
+        # the pool.
+        if not await connection.scalar(select(func.pg_try_advisory_lock(REFRESH_LOCK))):
+            return None
+        try:
+            due = await connection.scalar(
+                select(
+                    func.coalesce(
+                        func.max(DBUtilizationRefresh.refreshed_at)
+                        < func.now() - timedelta(seconds=interval),
+                        True,
+                    )
+                )
+            )
+            await connection.commit()
+            if not due:
+                return None
+
+            count = await refresh_open_series()
+            statement = upsert(DBUtilizationRefresh).values(
+                id=1, refreshed_at=func.now()
+            )
+            await connection.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[DBUtilizationRefresh.id],
+                    set_={"refreshed_at": statement.excluded.refreshed_at},
+                )
+            )
+            await connection.commit()
+            return count
+        finally:
+            await connection.execute(select(func.pg_advisory_unlock(REFRESH_LOCK)))
+            await connection.commit()
+
+
+async def refresh_periodically(interval: float):
+    """Refresh the open series every interval seconds, started with the app.
+
+    Every worker checks hourly, starting an hour after it starts, whether a
+    refresh is due, so that restarts neither repeat nor put off the
+    refresh. Only one process at a time runs it.
+    """
+    while True:
+        await asyncio.sleep(min(interval, REFRESH_CHECK_SECONDS))
+        try:
+            count = await refresh_if_due(interval)
+            if count is not None:
+                logger.info("Refreshed the utilization of %d open series", count)
+        except Exception:
+            logger.exception("Could not refresh the utilization of open series")
+
+
+async def rebuild_utilization():
+    """Count every reservation again and replace the totals by the sums of
+    the shares, to repair the rollups. Safe to run while the app serves.
+
+        python -m app.db.utilization
+    """
+    async with session_factory() as session:
+        reservation_ids = (
+            await session.scalars(
+                select(DBReservation.id)
+                .where(
+                    or_(
+                        DBReservation.active,
+                        DBReservation.id.in_(
+                            select(DBReservationUtilization.reservation_id)
+                        ),
+                    )
+                )
+                .order_by(DBReservation.id)
+            )
+        ).all()
+        for reservation_id in reservation_ids:
+            await resync(session, reservation_id)
+
+        # Writers change the totals after their shares, so while they are
+        # kept out the shares of every committed write are in place, and
+        # writes still in progress add their difference afterwards.
+        await session.execute(
+            text("LOCK TABLE dbutilization IN SHARE ROW EXCLUSIVE MODE")
+        )
+        await session.execute(delete(DBUtilization))
+        columns = [getattr(DBReservationUtilization, column) for column in KEY_COLUMNS]
+        await session.execute(
+            insert(DBUtilization).from_select(
+                [*KEY_COLUMNS, "seconds"],
+                select(*columns, func.sum(DBReservationUtilization.seconds))
+                .group_by(*columns)
+                .having(func.sum(DBReservationUtilization.seconds) != 0),
+            )
+        )
+        await session.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_utilization())
@@ -1,8 +1,22 @@
-from fastapi import FastAPI, APIRouter
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, APIRouter, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.db.database import engine
+from app import metrics
+from app.api.cache import cache_stats
+from app.db.database import engine, replica_engine, settings
+from app.db.notifications import listener
+from app.db.utilization import refresh_periodically
+from app.db.instrumentation import QueryStats, log_request, query_stats, server_timing
+from app.db.session import PRIMARY_COOKIE
+from app.db.occupancy import ReservationConflict
 from app.api.endpoints import users_router
 from app.api.endpoints import orgs_router
 from app.api.endpoints import collections_router
@@ -12,8 +26,20 @@ from app.api.endpoints import resourcetypes_router
 from app.api.endpoints import reservations_router
 from app.api.endpoints import reservationtimes_router
 from app.api.endpoints import reservationresources_router
+from app.api.endpoints import typeahead_router
+from app.api.endpoints import utilization_router
+from app.api.endpoints import live_router
 
-from sqlmodel import SQLModel
+# Uvicorn only configures its own loggers. Without a handler of their own,
+# the records of the app would reach the bare root logger, which drops
+# everything below WARNING.
+app_logger = logging.getLogger("app")
+app_logger.setLevel(settings.log_level)
+if not app_logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(levelname)s:     %(name)s %(message)s"))
+    app_logger.addHandler(handler)
+    app_logger.propagate = False
 
 tags_metadata = [
     {"name": "Users", "description": "Operations related to user management"},
@@ -35,24 +61,142 @@ tags_metadata = [
         "name": "ResourceTypes",
         "description": "Operations related to management of resource types",
     },
+    {
+        "name": "Typeahead",
+        "description": "Name completion for users, organizations, resources, "
+        "groups and collections",
+    },
+    {
+        "name": "Utilization",
+        "description": "Booked hours of resources for analytics",
+    },
+    {
+        "name": "Live",
+        "description": "Changes to reservations pushed over a WebSocket",
+    },
 ]
 
-app = FastAPI(title="Sitsit", openapi_tags=tags_metadata, description="Sitsit API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    listener.start()
+    refresh = asyncio.create_task(
+        refresh_periodically(settings.utilization_refresh_hours * 3600)
+    )
+    yield
+    refresh.cancel()
+    await asyncio.gather(refresh, return_exceptions=True)
+    await listener.stop()
+
+
+app = FastAPI(
+    title="Sitsit",
+    openapi_tags=tags_metadata,
+    description="Sitsit API",
+    lifespan=lifespan,
+)
 
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Your Vite dev server
+    allow_origins=settings.cors_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
 
-@app.on_event("startup")
-async def on_startup():
-    async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    response = await call_next(request)
+    if (
+        replica_engine is not engine
+        and request.method not in ("GET", "HEAD", "OPTIONS")
+        and response.status_code < 400
+    ):
+        response.set_cookie(
+            PRIMARY_COOKIE,
+            "1",
+            max_age=settings.replica_sticky_seconds,
+            httponly=True,
+            samesite="lax",
+        )
+
+    return response
+
+
+metrics.pool_metrics(
+    {"primary": engine}
+    if replica_engine is engine
+    else {"primary": engine, "replica": replica_engine}
+)
+metrics.Gauge(
+    "sitsit_live_subscribers",
+    "WebSocket clients following changes.",
+    collect=lambda: {(): listener.subscriber_count()},
+)
+
+
+@app.middleware("http")
+async def request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    metrics.requests_in_flight.inc(request.method)
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        metrics.requests_in_flight.dec(request.method)
+        # The route template, the path would make a series per id.
+        route = request.scope.get("route")
+        route = route.path if route is not None else "unmatched"
+        metrics.request_duration.observe(
+            time.perf_counter() - started, request.method, route
+        )
+        metrics.responses.inc(request.method, route, str(status))
+
+    return response
+
+
+if settings.db_instrument:
+
+    @app.middleware("http")
+    async def sql_instrumentation(request: Request, call_next):
+        started = time.perf_counter()
+        stats = QueryStats()
+        token = query_stats.set(stats)
+        try:
+            response = await call_next(request)
+        finally:
+            query_stats.reset(token)
+
+        total = time.perf_counter() - started
+        response.headers["Server-Timing"] = server_timing(stats, total)
+        log_request(
+            request.method,
+            request.url.path,
+            response.status_code,
+            stats,
+            total,
+            settings.db_repeated_statement_threshold,
+        )
+
+        return response
+
+
+@app.exception_handler(ReservationConflict)
+async def reservation_conflict_handler(request: Request, exc: ReservationConflict):
+    return JSONResponse(
+        status_code=409,
+        content=jsonable_encoder(
+            {
+                "detail": {
+                    "message": str(exc),
+                    "conflicts": [conflict._asdict() for conflict in exc.conflicts],
+                }
+            }
+        ),
+    )
 
 
 status_router = APIRouter(tags=["Status"])
@@ -63,6 +207,16 @@ async def status():
     return {"status": "ok"}
 
 
+@status_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics_status():
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@status_router.get("/cache")
+async def cache_status():
+    return cache_stats()
+
+
 app.include_router(status_router)
 app.include_router(users_router)
 app.include_router(orgs_router)
@@ -73,3 +227,6 @@ app.include_router(resourcetypes_router)
 app.include_router(reservations_router)
 app.include_router(reservationtimes_router)
 app.include_router(reservationresources_router)
+app.include_router(typeahead_router)
+app.include_router(utilization_router)
+app.include_router(live_router)
@@ -0,0 +1,183 @@
+import math
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Metrics in the Prometheus text exposition format, served by GET /metrics.
+# Like the read caches, every worker keeps its own values, so each worker
+# has to be scraped as a target of its own.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+type Labels = tuple[str, ...]
+
+registry: list["Metric"] = []
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{escape(str(value))}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: dict[Labels, float] = {}
+        registry.append(self)
+
+    def samples(self) -> Iterable[tuple[str, Labels, Labels, float]]:
+        for values, value in sorted(self._values.items()):
+            yield self.name, self.labels, values, value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for name, label_names, label_values, value in self.samples():
+            labels = format_labels(label_names, label_values)
+            lines.append(f"{name}{labels} {format_value(value)}")
+
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    """Gauge set by the application, or read from collect when scraped."""
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Iterable[str] = (),
+        collect: Optional[Callable[[], dict[Labels, float]]] = None,
+    ):
+        super().__init__(name, help, labels)
+        self.collect = collect
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def samples(self):
+        if self.collect is not None:
+            self._values = self.collect()
+        return super().samples()
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Iterable[str] = (),
+        buckets: Iterable[float] = (),
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: dict[Labels, list[int]] = {}
+
+    def observe(self, value: float, *labels: str):
+        counts = self._counts.get(labels)
+        if counts is None:
+            counts = self._counts[labels] = [0] * len(self.buckets)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+        self._values[labels] = self._values.get(labels, 0) + value
+
+    def samples(self):
+        bucket_labels = self.labels + ("le",)
+        for values, counts in sorted(self._counts.items()):
+            for bound, count in zip(self.buckets, counts):
+                yield (
+                    f"{self.name}_bucket",
+                    bucket_labels,
+                    values + (format_value(bound),),
+                    count,
+                )
+            yield f"{self.name}_sum", self.labels, values, self._values[values]
+            yield f"{self.name}_count", self.labels, values, counts[-1]
+
+
+def render() -> str:
+    return "\n".join(line for metric in registry for line in metric.render()) + "\n"
+
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+request_duration = Histogram(
+    "sitsit_http_request_duration_seconds",
+    "Time to respond to a request, by route.",
+    ["method", "route"],
+    REQUEST_BUCKETS,
+)
+requests_in_flight = Gauge(
+    "sitsit_http_requests_in_flight",
+    "Requests being handled.",
+    ["method"],
+)
+responses = Counter(
+    "sitsit_http_responses_total",
+    "Responses sent, by route and status code.",
+    ["method", "route", "status"],
+)
+statement_duration = Histogram(
+    "sitsit_db_statement_duration_seconds",
+    "Time to execute a SQL statement.",
+    buckets=STATEMENT_BUCKETS,
+)
+
+
+def pool_metrics(engines: dict[str, AsyncEngine]):
+    """Gauges of the connection pools of the named engines."""
+
+    def read(method: str) -> Callable[[], dict[Labels, float]]:
+        return lambda: {
+            (name,): getattr(engine.pool, method)() for name, engine in engines.items()
+        }
+
+    Gauge(
+        "sitsit_db_pool_size",
+        "Connections kept open by the pool.",
+        ["engine"],
+        read("size"),
+    )
+    Gauge(
+        "sitsit_db_pool_checked_out",
+        "Connections in use.",
+        ["engine"],
+        read("checkedout"),
+    )
+    Gauge(
+        "sitsit_db_pool_overflow",
+        "Connections open above the pool size, negative while below it.",
+        ["engine"],
+        read("overflow"),
+    )
@@ -1,20 +1,54 @@
 # from sqlalchemy import Column, Integer, String
 from sqlmodel import Field, SQLModel, Relationship
-from sqlalchemy import Column, DateTime, func
-from pydantic import BaseModel
-from datetime import datetime, timezone
-from typing import Optional
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Computed,
+    Date,
+    DateTime,
+    Index,
+    UniqueConstraint,
+    func,
+    text,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, TSTZRANGE, TSVECTOR, ExcludeConstraint
+from pydantic import BaseModel, model_validator
+from datetime import date, datetime, timezone
+from enum import Enum
+from typing import Any, Optional
 
 
 class Response[T](BaseModel):
     status: bool
     more_available: bool
+    next_cursor: Optional[str] = None
     items: list[T]
 
 
+class Batch[T](BaseModel):
+    """Entities fetched by id, in the order asked for, and the ids that
+    were not found."""
+
+    items: list[T]
+    missing: list[int]
+
+
 class BaseResponse(BaseModel):
     status: bool
     more_available: bool
+    next_cursor: Optional[str] = None
+
+
+def trigram_index(table: str, column: str) -> Index:
+    """GIN index of the trigrams of a column of the active rows, serving
+    ILIKE substring matches and similarity ordering."""
+    return Index(
+        f"ix_{table}_active_{column}_trgm",
+        column,
+        postgresql_using="gin",
+        postgresql_ops={column: "gin_trgm_ops"},
+        postgresql_where=text("active"),
+    )
 
 
 ## Organizations ##
@@ -25,6 +59,11 @@ class BaseOrg(SQLModel):
 
 
 class DBOrg(BaseOrg, table=True):
+    __table_args__ = (
+        Index("ix_dborg_active_name", "name", "id", postgresql_where=text("active")),
+        trigram_index("dborg", "name"),
+    )
+
     id: int = Field(default=None, primary_key=True)
     active: bool = Field(default=True)
     users: list["DBUser"] = Relationship(back_populates="org")
@@ -44,6 +83,7 @@ class PublicOrg(BaseOrg):
 
 
 class PublicOrgWithUsers(BaseOrg):
+    id: int
     name: str
     users: list["PublicUser"]
 
@@ -60,10 +100,20 @@ class BaseUser(SQLModel):
 
 
 class DBUser(BaseUser, table=True):
+    __table_args__ = (
+        Index(
+            "ix_dbuser_active_username",
+            "username",
+            "id",
+            postgresql_where=text("active"),
+        ),
+        trigram_index("dbuser", "username"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     hash: str = Field(default=None)
     active: bool = Field(default=True)
-    org_id: Optional[int] = Field(default=None, foreign_key="dborg.id")
+    org_id: Optional[int] = Field(default=None, index=True, foreign_key="dborg.id")
     org: DBOrg = Relationship(back_populates="users")
     reservations: "DBReservation" = Relationship(back_populates="user")
 
@@ -100,6 +150,13 @@ class BaseCollection(SQLModel):
 
 
 class DBCollection(BaseCollection, table=True):
+    __table_args__ = (
+        Index(
+            "ix_dbcollection_active_name", "name", "id", postgresql_where=text("active")
+        ),
+        trigram_index("dbcollection", "name"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     active: bool = Field(default=True)
     groups: list["DBGroup"] = Relationship(back_populates="collection")
@@ -134,8 +191,15 @@ class BaseGroup(SQLModel):
 
 
 class DBGroup(BaseGroup, table=True):
+    __table_args__ = (
+        Index("ix_dbgroup_active_name", "name", "id", postgresql_where=text("active")),
+        trigram_index("dbgroup", "name"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    collection_id: Optional[int] = Field(default=None, foreign_key="dbcollection.id")
+    collection_id: Optional[int] = Field(
+        default=None, index=True, foreign_key="dbcollection.id"
+    )
     collection: DBCollection = Relationship(back_populates="groups")
     resources: list["DBResource"] = Relationship(back_populates="group")
     active: bool = Field(default=True)
@@ -182,6 +246,15 @@ class BaseResourceType(SQLModel):
 
 
 class DBResourceType(BaseResourceType, table=True):
+    __table_args__ = (
+        Index(
+            "ix_dbresourcetype_active_name",
+            "name",
+            "id",
+            postgresql_where=text("active"),
+        ),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     active: bool = Field(default=True)
     resources: list["DBResource"] = Relationship(back_populates="resource_type")
@@ -212,11 +285,18 @@ class BaseResource(SQLModel):
 
 
 class DBResource(BaseResource, table=True):
+    __table_args__ = (
+        Index(
+            "ix_dbresource_active_name", "name", "id", postgresql_where=text("active")
+        ),
+        trigram_index("dbresource", "name"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    group_id: Optional[int] = Field(default=None, foreign_key="dbgroup.id")
+    group_id: Optional[int] = Field(default=None, index=True, foreign_key="dbgroup.id")
     group: Optional[DBGroup] = Relationship(back_populates="resources")
     resource_type_id: Optional[int] = Field(
-        default=None, foreign_key="dbresourcetype.id"
+        default=None, index=True, foreign_key="dbresourcetype.id"
     )
     resource_type: DBResourceType = Relationship(back_populates="resources")
     reservation_resources: list["DBReservationResource"] = Relationship(
@@ -265,13 +345,37 @@ class ResourceResponse(BaseResource):
 ## Reservations ##
 
 
+class RecurrenceFrequency(str, Enum):
+    daily = "daily"
+    weekly = "weekly"
+
+
 class BaseReservation(SQLModel):
     name: str = Field(default=None)
 
 
+# Text search configurations the reservations are indexed in, and the
+# weight of each searched column.
+SEARCH_CONFIGS = ("finnish", "swedish", "simple")
+SEARCH_WEIGHTS = {"name": "A", "description": "B", "contact_info": "C"}
+
+RESERVATION_SEARCH = " || ".join(
+    f"setweight(to_tsvector('{config}'::regconfig, coalesce({column}, '')), '{weight}')"
+    for column, weight in SEARCH_WEIGHTS.items()
+    for config in SEARCH_CONFIGS
+)
+
+
 class DBReservation(BaseReservation, table=True):
+    __table_args__ = (
+        Index("ix_dbreservation_active_id", "id", postgresql_where=text("active")),
+        Index("ix_dbreservation_search", "search", postgresql_using="gin"),
+    )
+    # Only read by the search queries, through __table__.c.search.
+    __mapper_args__ = {"exclude_properties": ["search"]}
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: Optional[int] = Field(default=None, foreign_key="dbuser.id")
+    user_id: Optional[int] = Field(default=None, index=True, foreign_key="dbuser.id")
     user: DBUser = Relationship(back_populates="reservations")
     times: list["DBReservationTime"] = Relationship(back_populates="reservation")
     resources: list["DBReservationResource"] = Relationship(
@@ -279,19 +383,45 @@ class DBReservation(BaseReservation, table=True):
     )
     contact_info: Optional[str] = Field()
     description: Optional[str] = Field()
+    recurrence_frequency: Optional[str] = Field(default=None)
+    recurrence_interval: int = Field(default=1)
+    recurrence_until: Optional[datetime] = Field(
+        default=None, sa_column=Column(DateTime(timezone=True))
+    )
+    recurrence_exceptions: list[date] = Field(
+        default_factory=list,
+        sa_column=Column(ARRAY(Date), nullable=False, server_default="{}"),
+    )
     active: bool = Field(default=True)
+    search: Optional[Any] = Field(
+        default=None,
+        sa_column=Column(TSVECTOR, Computed(RESERVATION_SEARCH, persisted=True)),
+    )
 
 
 class CreateReservation(BaseReservation):
     user_id: int
     contact_info: Optional[str]
     description: Optional[str]
+    recurrence_frequency: Optional[RecurrenceFrequency] = None
+    recurrence_interval: int = Field(default=1, ge=1)
+    recurrence_until: Optional[datetime] = None
+    recurrence_exceptions: list[date] = []
+
+
+class CreateReservationWithTimesAndResources(CreateReservation):
+    times: list["TimeInterval"]
+    resource_ids: list[int]
 
 
 class UpdateReservation(BaseReservation):
     user_id: int
     contact_info: Optional[str]
     description: Optional[str]
+    recurrence_frequency: Optional[RecurrenceFrequency] = None
+    recurrence_interval: int = Field(default=1, ge=1)
+    recurrence_until: Optional[datetime] = None
+    recurrence_exceptions: list[date] = []
 
 
 class PublicReservation(BaseReservation):
@@ -299,6 +429,10 @@ class PublicReservation(BaseReservation):
     user_id: int
     contact_info: Optional[str]
     description: Optional[str]
+    recurrence_frequency: Optional[RecurrenceFrequency]
+    recurrence_interval: int
+    recurrence_until: Optional[datetime]
+    recurrence_exceptions: list[date]
 
 
 class PublicReservationWithUser(BaseReservation):
@@ -306,6 +440,10 @@ class PublicReservationWithUser(BaseReservation):
     user: PublicUserWithOrg
     contact_info: Optional[str]
     description: Optional[str]
+    recurrence_frequency: Optional[RecurrenceFrequency]
+    recurrence_interval: int
+    recurrence_until: Optional[datetime]
+    recurrence_exceptions: list[date]
 
 
 class PublicReservationWithTimesAndResources(BaseReservation):
@@ -314,6 +452,10 @@ class PublicReservationWithTimesAndResources(BaseReservation):
     resources: list["PublicReservationResource"]
     contact_info: Optional[str]
     description: Optional[str]
+    recurrence_frequency: Optional[RecurrenceFrequency]
+    recurrence_interval: int
+    recurrence_until: Optional[datetime]
+    recurrence_exceptions: list[date]
 
 
 class PublicReservationWithUserAndTimesAndResources(BaseReservation):
@@ -324,6 +466,14 @@ class PublicReservationWithUserAndTimesAndResources(BaseReservation):
     resources: list["PublicReservationResourceWithResource"]
     contact_info: Optional[str]
     description: Optional[str]
+    recurrence_frequency: Optional[RecurrenceFrequency]
+    recurrence_interval: int
+    recurrence_until: Optional[datetime]
+    recurrence_exceptions: list[date]
+
+
+class PublicReservationSearchResult(PublicReservationWithUserAndTimesAndResources):
+    rank: float
 
 
 class ReservationResponse(BaseResponse):
@@ -386,6 +536,17 @@ class ReservationInfoResponse(BaseResponse):
 ## ReservationTime ##
 
 
+class TimeInterval(SQLModel):
+    start: datetime
+    end: datetime
+
+    @model_validator(mode="after")
+    def check_order(self):
+        if self.end <= self.start:
+            raise ValueError("Times must end after they start")
+        return self
+
+
 class BaseReservationTime(SQLModel):
     reservation_id: int = Field(
         default=None, index=True, foreign_key="dbreservation.id"
@@ -393,6 +554,16 @@ class BaseReservationTime(SQLModel):
 
 
 class DBReservationTime(BaseReservationTime, table=True):
+    __table_args__ = (
+        Index("ix_dbreservationtime_start_end", "start", "end"),
+        Index(
+            "ix_dbreservationtime_active_start",
+            "start",
+            "id",
+            postgresql_where=text("active"),
+        ),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     start: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc),
@@ -406,14 +577,12 @@ class DBReservationTime(BaseReservationTime, table=True):
     active: bool = Field(default=True)
 
 
-class CreateReservationTime(BaseReservationTime):
-    start: datetime
-    end: datetime
+class CreateReservationTime(BaseReservationTime, TimeInterval):
+    pass
 
 
-class UpdateReservationTime(BaseReservationTime):
-    start: datetime
-    end: datetime
+class UpdateReservationTime(BaseReservationTime, TimeInterval):
+    pass
 
 
 class PublicReservationTime(BaseReservationTime):
@@ -436,6 +605,15 @@ class BaseReservationResource(SQLModel):
 
 
 class DBReservationResource(BaseReservationResource, table=True):
+    __table_args__ = (
+        Index(
+            "ix_dbreservationresource_active_resource_id",
+            "resource_id",
+            "reservation_id",
+            postgresql_where=text("active"),
+        ),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     resource_id: int = Field(default=None, index=True, foreign_key="dbresource.id")
     resource: DBResource = Relationship(back_populates="reservation_resources")
@@ -458,8 +636,234 @@ class PublicReservationResource(BaseReservationResource):
 
 class PublicReservationResourceWithResource(BaseReservationResource):
     id: int
-    resource: DBResource
+    resource: PublicResource
 
 
 class ReservationResourceResponse(BaseResponse):
     resources: list[PublicReservationResource]
+
+
+## ResourceOccupancy ##
+
+
+class DBResourceOccupancy(SQLModel, table=True):
+    """Denormalized (resource, time range) pairs of active reservations.
+
+    Maintained by app.db.occupancy. The exclusion constraint rejects two
+    reservations holding the same resource for overlapping ranges, which
+    keeps double bookings out even under concurrent writes.
+    """
+
+    __table_args__ = (
+        ExcludeConstraint(
+            ("resource_id", "="),
+            ("during", "&&"),
+            ("reservation_id", "<>"),
+            name="ex_dbresourceoccupancy_resource_id_during",
+            using="gist",
+        ),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    resource_id: int = Field(foreign_key="dbresource.id")
+    reservation_id: int = Field(index=True, foreign_key="dbreservation.id")
+    reservation_time_id: int = Field(foreign_key="dbreservationtime.id")
+    during: Any = Field(sa_column=Column(TSTZRANGE(), nullable=False))
+
+
+## ChangeVersions ##
+
+
+class DBChangeVersion(SQLModel, table=True):
+    """Number of write statements run against each tracked table.
+
+    Bumped by a statement level trigger, so every writer is counted, and
+    used to derive ETags of responses built from those tables. The triggers
+    are created by migration 3c5e1d7a9f20.
+    """
+
+    table_name: str = Field(primary_key=True)
+    version: int = Field(default=0)
+    changed_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=False)
+    )
+
+
+class DBResourceVersion(SQLModel, table=True):
+    """Number of changes to the reservations holding each resource.
+
+    Bumped by row level triggers on reservations, their times and their
+    resources, and used to tell whether the calendar feed of a resource
+    has to be rendered again. The triggers are created by migration
+    3c5e1d7a9f20.
+    """
+
+    resource_id: int = Field(primary_key=True)
+    version: int = Field(default=0)
+    changed_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=False)
+    )
+
+
+## Utilization ##
+
+
+class BaseUtilization(SQLModel):
+    """Seconds a resource was booked by an organization, by the month, the
+    weekday (0 is Monday) and the hour they fell in, in the calendar
+    timezone. The organization is that of the booking user when the
+    reservation was last written.
+    """
+
+    resource_id: int = Field(foreign_key="dbresource.id")
+    org_id: Optional[int] = Field(default=None, foreign_key="dborg.id")
+    month: date
+    weekday: int
+    hour: int
+    seconds: int = Field(sa_type=BigInteger)
+
+
+class DBReservationUtilization(BaseUtilization, table=True):
+    """What each reservation adds to DBUtilization, so that its share can be
+    taken back when it changes. Maintained by app.db.utilization.
+    """
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    reservation_id: int = Field(index=True, foreign_key="dbreservation.id")
+
+
+class DBUtilization(BaseUtilization, table=True):
+    """Booked time of every active reservation, summed up per bucket.
+
+    Updated by the difference in the share of a reservation whenever it is
+    written, so analytics never read the reservations themselves.
+    """
+
+    __table_args__ = (
+        UniqueConstraint(
+            "resource_id",
+            "org_id",
+            "month",
+            "weekday",
+            "hour",
+            name="uq_dbutilization_bucket",
+            postgresql_nulls_not_distinct=True,
+        ),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+
+
+class DBUtilizationRefresh(SQLModel, table=True):
+    """When the series without an end date were last counted up to the
+    horizon, in a single row."""
+
+    id: int = Field(default=1, primary_key=True)
+    refreshed_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=False)
+    )
+
+
+## Availability ##
+
+
+class ResourceAvailability(SQLModel):
+    resource_id: int
+    start: datetime
+    end: datetime
+    busy: list[TimeInterval]
+    free: list[TimeInterval]
+
+
+## Calendar ##
+
+
+class CalendarBlock(SQLModel):
+    reservation_id: int
+    reservation_name: str
+    start: datetime
+    end: datetime
+
+
+class CalendarResource(SQLModel):
+    id: int
+    name: str
+    resource_type: PublicResourceType | None
+    blocks: list[CalendarBlock]
+
+
+class CalendarGroup(SQLModel):
+    id: int
+    name: str
+    resources: list[CalendarResource]
+
+
+class CollectionCalendar(SQLModel):
+    collection_id: int
+    start: datetime
+    end: datetime
+    groups: list[CalendarGroup]
+
+
+## Utilization ##
+
+
+class UtilizationDimension(str, Enum):
+    resource = "resource"
+    org = "org"
+    month = "month"
+
+
+class UtilizationHours(SQLModel):
+    """Booked hours, with the values of the dimensions they are grouped by."""
+
+    resource_id: Optional[int] = None
+    org_id: Optional[int] = None
+    month: Optional[date] = None
+    hours: float
+
+
+class UtilizationHeatmap(SQLModel):
+    """Booked hours indexed by the weekday, 0 being Monday, and the hour."""
+
+    hours: list[list[float]]
+
+
+## Export ##
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+## Typeahead ##
+
+
+class TypeaheadKind(str, Enum):
+    user = "user"
+    org = "org"
+    resource = "resource"
+    group = "group"
+    collection = "collection"
+
+
+class TypeaheadMatch(SQLModel):
+    id: int
+    name: str
+
+
+## Live ##
+
+
+class LiveAction(str, Enum):
+    subscribe = "subscribe"
+    unsubscribe = "unsubscribe"
+
+
+class LiveMessage(SQLModel):
+    """Message of a WebSocket client changing the topics it follows."""
+
+    action: LiveAction
+    collection_ids: list[int] = []
+    resource_ids: list[int] = []
@@ -0,0 +1,507 @@
+"""Load test the hot API endpoints.
+
+Seeds a dataset of orgs, users, collections, groups, resources and
+reservations into the database configured in the environment (see
+app/config.py), which must be migrated to head, and drives the API in
+process through httpx with a number of concurrent clients. Reports the
+latency percentiles, throughput and SQL statements per request of every
+scenario. The seeded rows, and the reservations created by the run, are
+deleted afterwards unless --keep is given.
+
+    python benchmarks/load_test.py [--requests N] [--concurrency N]
+        [--scenario NAME ...] [--output results.json]
+        [--compare baseline.json]
+
+The same --seed and sizes always produce the same dataset and request
+sequence, so results saved with --output on two commits can be compared
+with --compare.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx  # noqa: E402
+from sqlalchemy import delete, event, func, insert, select  # noqa: E402
+
+from app.api.batch import among  # noqa: E402
+from app.db.database import engine, replica_engine, settings  # noqa: E402
+from app.db.session import session_factory  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.models import (  # noqa: E402
+    DBCollection,
+    DBGroup,
+    DBOrg,
+    DBReservation,
+    DBReservationResource,
+    DBReservationTime,
+    DBReservationUtilization,
+    DBResource,
+    DBResourceOccupancy,
+    DBResourceType,
+    DBResourceVersion,
+    DBUser,
+    DBUtilization,
+)
+
+# Seeded reservations are laid out from here on, one after the other in
+# each group, so that none of them overlap.
+SEED_START = datetime(2090, 1, 6, 8, tzinfo=timezone.utc)
+
+# Reservations created by the run start here, an hour apart.
+CREATE_START = datetime(2095, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass
+class Sizes:
+    orgs: int = 20
+    users_per_org: int = 10
+    collections: int = 5
+    groups_per_collection: int = 4
+    resources_per_group: int = 5
+    reservations: int = 5000
+
+
+@dataclass
+class Dataset:
+    org_ids: list[int]
+    user_ids: list[int]
+    resource_type_ids: list[int]
+    collection_ids: list[int]
+    group_ids: list[int]
+    resource_ids: list[int]
+    reservation_ids: list[int]
+    start: datetime
+    end: datetime
+
+
+class Statements:
+    """Count the statements sent to the primary and the replica."""
+
+    def __init__(self):
+        self.count = 0
+        for counted in {engine, replica_engine}:
+            event.listen(counted.sync_engine, "before_cursor_execute", self.statement)
+
+    def statement(self, *args):
+        self.count += 1
+
+    def reset(self) -> int:
+        count, self.count = self.count, 0
+        return count
+
+
+async def insert_ids(session, model, rows: list[dict]) -> list[int]:
+    result = await session.scalars(insert(model).returning(model.id), rows)
+    return list(result)
+
+
+async def seed(sizes: Sizes, rng: random.Random) -> Dataset:
+    tag = uuid.uuid4().hex[:8]
+    async with session_factory() as session:
+        org_ids = await insert_ids(
+            session,
+            DBOrg,
+            [{"name": f"load {tag} org {index}"} for index in range(sizes.orgs)],
+        )
+        user_ids = await insert_ids(
+            session,
+            DBUser,
+            [
+                {"username": f"load {tag} user {index}", "hash": "x", "org_id": org_id}
+                for org_id in org_ids
+                for index in range(sizes.users_per_org)
+            ],
+        )
+        resource_type_ids = await insert_ids(
+            session,
+            DBResourceType,
+            [{"name": f"load {tag} {name}"} for name in ("room", "kitchen", "item")],
+        )
+        collection_ids = await insert_ids(
+            session,
+            DBCollection,
+            [
+                {"name": f"load {tag} collection {index}"}
+                for index in range(sizes.collections)
+            ],
+        )
+        group_ids = await insert_ids(
+            session,
+            DBGroup,
+            [
+                {"name": f"load {tag} group {index}", "collection_id": collection_id}
+                for collection_id in collection_ids
+                for index in range(sizes.groups_per_collection)
+            ],
+        )
+        group_resources: dict[int, list[int]] = {}
+        for group_id in group_ids:
+            group_resources[group_id] = await insert_ids(
+                session,
+                DBResource,
+                [
+                    {
+                        "name": f"load {tag} resource {index}",
+                        "group_id": group_id,
+                        "resource_type_id": rng.choice(resource_type_ids),
+                    }
+                    for index in range(sizes.resources_per_group)
+                ],
+            )
+
+        reservation_ids = await insert_ids(
+            session,
+            DBReservation,
+            [
+                {
+                    "name": f"load {tag} reservation {index}",
+                    "user_id": rng.choice(user_ids),
+                    "contact_info": None,
+                    "description": None,
+                }
+                for index in range(sizes.reservations)
+            ],
+        )
+        # Each reservation holds one to three resources of a group for one
+        # to three times, after the previous reservation of that group.
+        clocks = dict.fromkeys(group_ids, SEED_START)
+        times, resources = [], []
+        for reservation_id in reservation_ids:
+            group_id = rng.choice(group_ids)
+            for resource_id in rng.sample(group_resources[group_id], rng.randint(1, 3)):
+                resources.append(
+                    {"reservation_id": reservation_id, "resource_id": resource_id}
+                )
+            for _ in range(rng.randint(1, 3)):
+                start = clocks[group_id] + timedelta(hours=rng.randint(0, 12))
+                end = start + timedelta(hours=rng.randint(1, 4))
+                times.append(
+                    {"reservation_id": reservation_id, "start": start, "end": end}
+                )
+                clocks[group_id] = end
+        await session.execute(insert(DBReservationResource), resources)
+        await session.execute(insert(DBReservationTime), times)
+        await session.execute(
+            insert(DBResourceOccupancy).from_select(
+                ["resource_id", "reservation_id", "reservation_time_id", "during"],
+                select(
+                    DBReservationResource.resource_id,
+                    DBReservationTime.reservation_id,
+                    DBReservationTime.id,
+                    func.tstzrange(
+                        DBReservationTime.start, DBReservationTime.end, "[)"
+                    ),
+                )
+                .join(
+                    DBReservationResource,
+                    DBReservationResource.reservation_id
+                    == DBReservationTime.reservation_id,
+                )
+                .where(among(DBReservationTime.reservation_id, reservation_ids)),
+            )
+        )
+        await session.commit()
+
+    return Dataset(
+        org_ids=org_ids,
+        user_ids=user_ids,
+        resource_type_ids=resource_type_ids,
+        collection_ids=collection_ids,
+        group_ids=group_ids,
+        resource_ids=[id for ids in group_resources.values() for id in ids],
+        reservation_ids=reservation_ids,
+        start=SEED_START,
+        end=max(clocks.values()),
+    )
+
+
+async def clean_up(dataset: Dataset, created_ids: list[int]):
+    reservation_ids = dataset.reservation_ids + created_ids
+    async with session_factory() as session:
+        for model in (
+            DBResourceOccupancy,
+            DBReservationUtilization,
+            DBReservationResource,
+            DBReservationTime,
+        ):
+            await session.execute(
+                delete(model).where(among(model.reservation_id, reservation_ids))
+            )
+        await session.execute(
+            delete(DBReservation).where(among(DBReservation.id, reservation_ids))
+        )
+        for model in (DBResourceVersion, DBUtilization):
+            await session.execute(
+                delete(model).where(among(model.resource_id, dataset.resource_ids))
+            )
+        for model, ids in (
+            (DBResource, dataset.resource_ids),
+            (DBGroup, dataset.group_ids),
+            (DBCollection, dataset.collection_ids),
+            (DBResourceType, dataset.resource_type_ids),
+            (DBUser, dataset.user_ids),
+            (DBOrg, dataset.org_ids),
+        ):
+            await session.execute(delete(model).where(among(model.id, ids)))
+        await session.commit()
+
+
+type Call = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+def scenarios(dataset: Dataset, seed: int, created_ids: list[int]) -> dict[str, Call]:
+    """Requests of every scenario, the same ones for the same seed."""
+    rng = random.Random(seed)
+    span = (dataset.end - dataset.start).total_seconds()
+
+    def window(days: int) -> dict:
+        start = dataset.start + timedelta(seconds=rng.uniform(0, span))
+        return {
+            "from": start.isoformat(),
+            "to": (start + timedelta(days=days)).isoformat(),
+        }
+
+    def list_reservations(client, index):
+        return client.get("/reservations/", params=window(7))
+
+    def list_reservations_by_collection(client, index):
+        return client.get(
+            "/reservations/",
+            params=window(7) | {"collection_id": rng.choice(dataset.collection_ids)},
+        )
+
+    def list_collections(client, index):
+        return client.get("/collections/")
+
+    def collection_tree(client, index):
+        return client.get(f"/collections/{rng.choice(dataset.collection_ids)}")
+
+    def get_resource(client, index):
+        return client.get(f"/resources/{rng.choice(dataset.resource_ids)}")
+
+    def resource_availability(client, index):
+        return client.get(
+            f"/resources/{rng.choice(dataset.resource_ids)}/availability",
+            params=window(14),
+        )
+
+    # Every created reservation gets an hour of its own, so concurrent
+    # requests only contend on the database, never conflict.
+    hours = iter(range(10**9))
+
+    async def create_reservation(client, index):
+        start = CREATE_START + timedelta(hours=next(hours))
+        response = await client.post(
+            "/reservations/composite",
+            json={
+                "name": "load test",
+                "user_id": rng.choice(dataset.user_ids),
+                "contact_info": None,
+                "description": None,
+                "times": [
+                    {
+                        "start": start.isoformat(),
+                        "end": (start + timedelta(hours=1)).isoformat(),
+                    }
+                ],
+                "resource_ids": [rng.choice(dataset.resource_ids)],
+            },
+        )
+        if response.status_code == 200:
+            created_ids.append(response.json()["id"])
+        return response
+
+    return {
+        "list reservations": list_reservations,
+        "list reservations by collection": list_reservations_by_collection,
+        "list collections": list_collections,
+        "collection tree": collection_tree,
+        "get resource": get_resource,
+        "resource availability": resource_availability,
+        "create reservation": create_reservation,
+    }
+
+
+def percentile(values: list[float], percent: int) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    name: str,
+    call: Call,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    statements: Statements,
+) -> dict:
+    async def drive(count: int) -> tuple[list[float], Counter]:
+        latencies: list[float] = []
+        statuses: Counter = Counter()
+        indexes = iter(range(count))
+
+        async def worker():
+            for index in indexes:
+                started = time.perf_counter()
+                response = await call(client, index)
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[response.status_code] += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return latencies, statuses
+
+    await drive(warmup)
+    statements.reset()
+    started = time.perf_counter()
+    latencies, statuses = await drive(requests)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "scenario": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "mean_ms": statistics.fmean(latencies),
+        "max_ms": max(latencies),
+        "throughput_rps": requests / elapsed,
+        "statements_per_request": statements.reset() / requests,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args, sizes: Sizes) -> dict:
+    statements = Statements()
+    dataset = await seed(sizes, random.Random(args.seed))
+    created_ids: list[int] = []
+    calls = scenarios(dataset, args.seed, created_ids)
+    results = []
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            for name in args.scenario or calls:
+                results.append(
+                    await run_scenario(
+                        client,
+                        name,
+                        calls[name],
+                        args.requests,
+                        args.concurrency,
+                        args.warmup,
+                        statements,
+                    )
+                )
+    finally:
+        if not args.keep:
+            await clean_up(dataset, created_ids)
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "seed": args.seed,
+        "sizes": asdict(sizes),
+        "pool": {
+            "size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+        },
+        "results": results,
+    }
+
+
+COLUMNS = [
+    ("p50_ms", "p50 ms", ".2f"),
+    ("p95_ms", "p95 ms", ".2f"),
+    ("p99_ms", "p99 ms", ".2f"),
+    ("throughput_rps", "req/s", ".1f"),
+    ("statements_per_request", "stmts/req", ".1f"),
+    ("errors", "errors", "d"),
+]
+
+
+def print_table(report: dict, baseline: dict | None = None):
+    previous = {}
+    if baseline is not None:
+        previous = {result["scenario"]: result for result in baseline["results"]}
+        print(f"commit {report['commit']} against {baseline['commit']}")
+
+    print(f"{'scenario':<34}" + "".join(f"{title:>18}" for _, title, _ in COLUMNS))
+    for result in report["results"]:
+        line = f"{result['scenario']:<34}"
+        for key, _, spec in COLUMNS:
+            cell = format(result[key], spec)
+            before = previous.get(result["scenario"], {}).get(key)
+            if before:
+                cell += f" {(result[key] - before) / before:+6.0%}"
+            line += f"{cell:>18}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--scenario", action="append", help="run only this scenario, repeatable"
+    )
+    for field, default in asdict(Sizes()).items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=int, default=default)
+    parser.add_argument("--keep", action="store_true", help="keep the seeded rows")
+    parser.add_argument("--json", action="store_true", help="print the report as json")
+    parser.add_argument("--output", help="also write the report to this json file")
+    parser.add_argument("--compare", help="report saved with --output to compare to")
+    args = parser.parse_args()
+
+    sizes = Sizes(**{field: getattr(args, field) for field in asdict(Sizes())})
+    report = asyncio.run(run(args, sizes))
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    print_table(report, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Compare the CPU cost of building a reservation list page.
+
+Seeds reservations like load_test.py does and builds full pages of them
+(user and org, times, resources) in two ways:
+
+    orm   select(DBReservation) with selectinload chains, validated into
+          PublicReservationWithUserAndTimesAndResources from attributes
+    rows  app.api.rows.reservation_page, row tuples validated as dicts by
+          the cached TypeAdapter of the expanded response model
+
+Both are serialized to JSON. The process CPU time, which includes the
+driver but not Postgres, and the wall time per page are reported.
+
+    python benchmarks/serialization.py [--iterations N] [--page-size N] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pydantic import TypeAdapter  # noqa: E402
+from sqlmodel import select  # noqa: E402
+from sqlalchemy.orm import selectinload  # noqa: E402
+
+from app.api.endpoints import RESERVATION_EXPANSIONS, reservation_model  # noqa: E402
+from app.api.expansion import page_adapter, with_parents  # noqa: E402
+from app.api.pagination import paginate  # noqa: E402
+from app.api.rows import reservation_page  # noqa: E402
+from app.db.session import session_factory  # noqa: E402
+from app.models.models import (  # noqa: E402
+    DBReservation,
+    DBReservationResource,
+    DBUser,
+    PublicReservationWithUserAndTimesAndResources,
+    Response,
+)
+from load_test import Sizes, Statements, clean_up, seed  # noqa: E402
+
+orm_page = TypeAdapter(Response[PublicReservationWithUserAndTimesAndResources])
+
+
+async def build_orm(session, ids: list[int], limit: int) -> bytes:
+    query = (
+        select(DBReservation)
+        .where(DBReservation.active)
+        .where(DBReservation.id.between(ids[0], ids[-1]))
+        .options(
+            selectinload(DBReservation.user).selectinload(DBUser.org),
+            selectinload(DBReservation.times),
+            selectinload(DBReservation.resources).selectinload(
+                DBReservationResource.resource
+            ),
+        )
+    )
+    page = await paginate(session, query, (DBReservation.id,), None, limit)
+    return orm_page.dump_json(orm_page.validate_python(page))
+
+
+async def build_rows(session, ids: list[int], limit: int) -> bytes:
+    expand = with_parents(frozenset(RESERVATION_EXPANSIONS))
+    page = await reservation_page(
+        session,
+        [DBReservation.id.between(ids[0], ids[-1])],
+        expand,
+        None,
+        None,
+        limit,
+    )
+    adapter = page_adapter(reservation_model(expand, None))
+    return adapter.dump_json(adapter.validate_python(page))
+
+
+async def measure(name, build, ids, limit, iterations, statements) -> dict:
+    # Once to warm up the statement caches and compile the models.
+    async with session_factory() as session:
+        size = len(await build(session, ids, limit))
+
+    statements.reset()
+    cpu, wall = time.process_time(), time.perf_counter()
+    for _ in range(iterations):
+        async with session_factory() as session:
+            await build(session, ids, limit)
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+
+    return {
+        "path": name,
+        "page_size": limit,
+        "iterations": iterations,
+        "cpu_ms_per_page": cpu / iterations * 1000,
+        "wall_ms_per_page": wall / iterations * 1000,
+        "statements_per_page": statements.reset() / iterations,
+        "response_bytes": size,
+    }
+
+
+async def run(iterations: int, page_size: int, keep: bool) -> list[dict]:
+    statements = Statements()
+    sizes = Sizes(orgs=5, collections=2, reservations=page_size)
+    dataset = await seed(sizes, random.Random(1))
+    try:
+        ids = sorted(dataset.reservation_ids)
+        async with session_factory() as session:
+            if json.loads(await build_orm(session, ids, page_size)) != json.loads(
+                await build_rows(session, ids, page_size)
+            ):
+                raise RuntimeError("The two paths built different pages")
+
+        return [
+            await measure(name, build, ids, page_size, iterations, statements)
+            for name, build in (("orm", build_orm), ("rows", build_rows))
+        ]
+    finally:
+        if not keep:
+            await clean_up(dataset, [])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--keep", action="store_true", help="keep the seeded rows")
+    parser.add_argument("--json", action="store_true", help="print json lines")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.iterations, args.page_size, args.keep))
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+        return
+
+    print(f"{'path':<8}{'cpu ms':>10}{'wall ms':>10}{'statements':>12}{'bytes':>10}")
+    for result in results:
+        print(
+            f"{result['path']:<8}{result['cpu_ms_per_page']:>10.2f}"
+            f"{result['wall_ms_per_page']:>10.2f}"
+            f"{result['statements_per_page']:>12.1f}{result['response_bytes']:>10}"
+        )
+    orm, rows = results
+    saving = 1 - rows["cpu_ms_per_page"] / orm["cpu_ms_per_page"]
+    print(f"rows saves {saving:.0%} of the CPU time per {args.page_size} item page")
+
+
+if __name__ == "__main__":
+    main()
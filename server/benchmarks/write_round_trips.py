@@ -0,0 +1,331 @@
+"""Count the database round trips of the write endpoints.
+
+Runs the API in process against the database configured in the
+environment (see app/config.py), which must be migrated to head. Every
+endpoint is called a number of times and the statements, transaction
+begins and commits it causes are counted. Rows created by the run are
+deleted afterwards.
+
+The run fails when an operation takes more round trips than
+MAX_ROUND_TRIPS allows, so that a change adding one, like reading the
+written rows back after the commit, is caught.
+
+    python benchmarks/write_round_trips.py [--iterations N] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx  # noqa: E402
+from sqlalchemy import delete, event, select  # noqa: E402
+
+from app.api.batch import among  # noqa: E402
+from app.db.database import engine  # noqa: E402
+from app.db.session import session_factory  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.models import (  # noqa: E402
+    DBCollection,
+    DBGroup,
+    DBOrg,
+    DBReservation,
+    DBReservationResource,
+    DBReservationTime,
+    DBReservationUtilization,
+    DBResource,
+    DBResourceOccupancy,
+    DBResourceType,
+    DBResourceVersion,
+    DBUser,
+    DBUtilization,
+)
+
+# Round trips per call of each operation: statements, BEGINs, COMMITs and
+# ROLLBACKs. Lower them when an operation gets cheaper.
+MAX_ROUND_TRIPS = {
+    "create org": 3,
+    "update org": 5,
+    "delete org": 3,
+    "create reservation": 4,
+    "update reservation": 16,
+    "create reservation resource": 15,
+    "create reservation time": 19,
+    "delete reservation time": 16,
+    "delete reservation": 13,
+}
+
+
+class RoundTrips:
+    def __init__(self):
+        self.counts = Counter()
+        sync_engine = engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", self.statement)
+        event.listen(sync_engine, "begin", self.begin)
+        event.listen(sync_engine, "commit", self.commit)
+        event.listen(sync_engine, "rollback", self.rollback)
+
+    def statement(self, *args):
+        self.counts["statements"] += 1
+
+    def begin(self, *args):
+        self.counts["begins"] += 1
+
+    def commit(self, *args):
+        self.counts["commits"] += 1
+
+    def rollback(self, *args):
+        self.counts["rollbacks"] += 1
+
+    def reset(self) -> Counter:
+        counts, self.counts = self.counts, Counter()
+        return counts
+
+
+async def check(response: httpx.Response) -> dict:
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.request.url}: {response.text}")
+    return response.json() if response.content else None
+
+
+async def clean_up(created: dict[type, list[int]]):
+    """Delete the rows created by the run, the reservations being those of
+    its users."""
+    async with session_factory() as session:
+        reservation_ids = (
+            await session.scalars(
+                select(DBReservation.id).where(
+                    among(DBReservation.user_id, created[DBUser])
+                )
+            )
+        ).all()
+        for model in (
+            DBResourceOccupancy,
+            DBReservationUtilization,
+            DBReservationResource,
+            DBReservationTime,
+        ):
+            await session.execute(
+                delete(model).where(among(model.reservation_id, reservation_ids))
+            )
+        await session.execute(
+            delete(DBReservation).where(among(DBReservation.id, reservation_ids))
+        )
+        for model in (DBResourceVersion, DBUtilization):
+            await session.execute(
+                delete(model).where(among(model.resource_id, created[DBResource]))
+            )
+        for model in (DBResource, DBGroup, DBCollection, DBResourceType, DBUser, DBOrg):
+            await session.execute(delete(model).where(among(model.id, created[model])))
+        await session.commit()
+
+
+async def run(iterations: int) -> list[dict]:
+    trips = RoundTrips()
+    results = []
+    created: dict[type, list[int]] = defaultdict(list)
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            await measure_writes(client, trips, results, created, iterations)
+    finally:
+        await clean_up(created)
+
+    return results
+
+
+async def measure_writes(
+    client: httpx.AsyncClient,
+    trips: RoundTrips,
+    results: list[dict],
+    created: dict[type, list[int]],
+    iterations: int,
+):
+    def record(model, value: dict) -> dict:
+        created[model].append(value["id"])
+        return value
+
+    suffix = uuid.uuid4().hex[:8]
+    org = record(
+        DBOrg,
+        await check(await client.post("/orgs/", json={"name": f"bench {suffix}"})),
+    )
+    user = record(
+        DBUser,
+        await check(
+            await client.post(
+                "/users/",
+                json={"username": f"bench {suffix}", "hash": "x", "org_id": org["id"]},
+            )
+        ),
+    )
+    collection = record(
+        DBCollection,
+        await check(
+            await client.post("/collections/", json={"name": f"bench {suffix}"})
+        ),
+    )
+    group = record(
+        DBGroup,
+        await check(
+            await client.post(
+                "/groups/",
+                json={"name": f"bench {suffix}", "collection_id": collection["id"]},
+            )
+        ),
+    )
+    resource_type = record(
+        DBResourceType,
+        await check(
+            await client.post("/resourcetypes/", json={"name": f"bench {suffix}"})
+        ),
+    )
+    resource = record(
+        DBResource,
+        await check(
+            await client.post(
+                "/resources/",
+                json={
+                    "name": f"bench {suffix}",
+                    "group_id": group["id"],
+                    "resource_type_id": resource_type["id"],
+                },
+            )
+        ),
+    )
+
+    # Reservations are found by their user when cleaning up, the other
+    # rows are recorded as they are created.
+    async def measure(name, call, model=None):
+        trips.reset()
+        values = []
+        started = time.perf_counter()
+        for index in range(iterations):
+            value = await check(await call(index))
+            values.append(value if model is None else record(model, value))
+        elapsed = time.perf_counter() - started
+        counts = trips.reset()
+        results.append(
+            {
+                "operation": name,
+                "iterations": iterations,
+                "statements": counts["statements"] / iterations,
+                "round_trips": sum(counts.values()) / iterations,
+                "max_round_trips": MAX_ROUND_TRIPS[name],
+                "mean_ms": elapsed / iterations * 1000,
+            }
+        )
+        return values
+
+    reservation_body = {
+        "name": "bench",
+        "user_id": user["id"],
+        "contact_info": None,
+        "description": None,
+    }
+
+    orgs = await measure(
+        "create org",
+        lambda index: client.post("/orgs/", json={"name": f"bench {index}"}),
+        DBOrg,
+    )
+    await measure(
+        "update org",
+        lambda index: client.patch(
+            f"/orgs/{orgs[index]['id']}", json={"name": f"bench {index}!"}
+        ),
+    )
+    await measure(
+        "delete org", lambda index: client.delete(f"/orgs/{orgs[index]['id']}")
+    )
+    reservations = await measure(
+        "create reservation",
+        lambda index: client.post("/reservations/", json=reservation_body),
+    )
+    await measure(
+        "update reservation",
+        lambda index: client.patch(
+            f"/reservations/{reservations[index]['id']}",
+            json=reservation_body | {"name": f"bench {index}"},
+        ),
+    )
+    await measure(
+        "create reservation resource",
+        lambda index: client.post(
+            "/reservationResources/",
+            json={
+                "reservation_id": reservations[index]["id"],
+                "resource_id": resource["id"],
+            },
+        ),
+    )
+    # Far in the future and a day apart, so that runs never overlap.
+    base = 10_000 + int(suffix, 16) % 100_000 * iterations
+    times = await measure(
+        "create reservation time",
+        lambda index: client.post(
+            "/reservationTimes/",
+            json={"reservation_id": reservations[index]["id"]}
+            | day_offset(base + index),
+        ),
+    )
+    await measure(
+        "delete reservation time",
+        lambda index: client.delete(f"/reservationTimes/{times[index]['id']}"),
+    )
+    await measure(
+        "delete reservation",
+        lambda index: client.delete(f"/reservations/{reservations[index]['id']}"),
+    )
+
+
+def day_offset(days: int) -> dict:
+    start = datetime(2100, 1, 1, tzinfo=timezone.utc) + timedelta(days=days)
+    return {
+        "start": start.isoformat(),
+        "end": (start + timedelta(hours=1)).isoformat(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--json", action="store_true", help="print json lines")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.iterations))
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+    else:
+        print(
+            f"{'operation':<30}{'statements':>12}{'round trips':>13}"
+            f"{'max':>6}{'mean ms':>10}"
+        )
+        for result in results:
+            print(
+                f"{result['operation']:<30}{result['statements']:>12.1f}"
+                f"{result['round_trips']:>13.1f}{result['max_round_trips']:>6}"
+                f"{result['mean_ms']:>10.2f}"
+            )
+
+    over = [
+        result["operation"]
+        for result in results
+        if result["round_trips"] > result["max_round_trips"]
+    ]
+    if over:
+        parser.exit(1, f"More round trips than allowed: {', '.join(over)}\n")
+
+
+if __name__ == "__main__":
+    main()